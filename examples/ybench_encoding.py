@@ -0,0 +1,60 @@
+import timeit
+from yaks import Value, Encoding
+from yaks.encoding import JSON_CODECS, register_codec, get_codec
+import argparse
+
+ap = argparse.ArgumentParser()
+ap.add_argument("-n", "--samples", required=False, default=20000,
+                help="Number of values encoded and decoded per test")
+
+args = vars(ap.parse_args())
+n = int(args['samples'])
+
+
+class ZInfo(object):
+    def __init__(self, encoding):
+        self.encoding = encoding
+
+
+document = {
+    'id': 'robot42',
+    'position': {'x': 12.5, 'y': -3.25, 'z': 0.0},
+    'sensors': [{'name': 'temp{}'.format(i), 'value': i * 1.5}
+                for i in range(0, 16)],
+    'status': 'running'
+}
+
+samples = [
+    ('RAW', Encoding.RAW, b'x' * 1024),
+    ('STRING', Encoding.STRING, 'x' * 1024),
+    ('PROPERTY', Encoding.PROPERTY,
+     {'k{}'.format(i): 'v{}'.format(i) for i in range(0, 16)}),
+    ('JSON', Encoding.JSON, document)
+]
+
+
+def bench(name, encoding, data):
+    info = ZInfo(Encoding.to_z_encoding(encoding))
+    payload = Value(data, encoding).as_z_payload()
+    encode = min(timeit.repeat(
+        lambda: Value(data, encoding).as_z_payload(), number=n, repeat=3))
+    value = Value(data, encoding)
+    encode_once = min(timeit.repeat(
+        lambda: value.as_z_payload(), number=n, repeat=3))
+    decode = min(timeit.repeat(
+        lambda: Value.from_z_resource(payload, info).get_value(),
+        number=n, repeat=3))
+    print("{:16} : {:9.0f} encodes/sec, {:9.0f} cached encodes/sec, "
+          "{:9.0f} decodes/sec, {} bytes".format(
+              name, n / encode, n / encode_once, n / decode, len(payload)))
+
+
+for (name, encoding, data) in samples:
+    if encoding != Encoding.JSON:
+        bench(name, encoding, data)
+
+default = get_codec(Encoding.JSON)
+for codec in JSON_CODECS:
+    register_codec(Encoding.JSON, codec)
+    bench('JSON ({})'.format(codec), Encoding.JSON, document)
+register_codec(Encoding.JSON, default)
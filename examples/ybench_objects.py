@@ -0,0 +1,41 @@
+import timeit
+import tracemalloc
+from yaks import Value, Change, ChangeKind, Encoding
+from yaks.entry import Entry
+import argparse
+
+ap = argparse.ArgumentParser()
+ap.add_argument("-n", "--objects", required=False, default=100000,
+                help="Number of objects created per type")
+
+args = vars(ap.parse_args())
+n = int(args['objects'])
+
+
+class ZInfo(object):
+    def __init__(self, encoding):
+        self.encoding = encoding
+
+
+payload = b'01234567'
+info = ZInfo(Encoding.to_z_encoding(Encoding.STRING))
+
+builders = [
+    ('Value', lambda i: Value.from_z_resource(payload, info)),
+    ('Change', lambda i: Change('/ylatp/sample', 0, i)),
+    ('Entry', lambda i: Entry('/ylatp/sample', None, i))
+]
+
+for (name, build) in builders:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [build(i) for i in range(0, n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    size = (after - before) / n
+    del objects
+
+    delta = min(timeit.repeat(lambda: build(0), number=n, repeat=5))
+
+    print("{:6} : {:6.1f} bytes/object, {:10.0f} objects/sec".format(
+        name, size, n / delta))
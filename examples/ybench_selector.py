@@ -0,0 +1,64 @@
+import time
+import random
+from yaks.selector import Selector, SelectorIndex, compile_matcher
+import argparse
+
+ap = argparse.ArgumentParser()
+ap.add_argument("-s", "--selectors", required=False, default=500,
+                help="Number of selectors to index")
+ap.add_argument("-p", "--paths", required=False, default=10000,
+                help="Number of paths to match")
+
+args = vars(ap.parse_args())
+n_selectors = int(args['selectors'])
+n_paths = int(args['paths'])
+
+random.seed(0)
+segments = ['fleet', 'robot{}'.format, 'sensor', 'temp', 'pos', 'status']
+
+
+def segment(i):
+    s = random.choice(segments)
+    return s(i) if callable(s) else s
+
+
+def random_path():
+    return '/' + '/'.join(segment(random.randint(0, 50))
+                          for _ in range(random.randint(2, 6)))
+
+
+def random_selector():
+    parts = []
+    for _ in range(random.randint(2, 6)):
+        r = random.random()
+        parts.append('*' if r < 0.1 else '**' if r < 0.15
+                     else segment(random.randint(0, 50)))
+    return '/' + '/'.join(parts)
+
+
+selectors = [random_selector() for _ in range(n_selectors)]
+paths = [random_path() for _ in range(n_paths)]
+
+# one compiled regex per selector, tested in turn for each path
+regexes = [(s, compile_matcher(s)) for s in selectors]
+start = time.time()
+naive_matches = 0
+for p in paths:
+    naive_matches += len([s for (s, match) in regexes if match(p)])
+naive = time.time() - start
+
+index = SelectorIndex()
+for s in selectors:
+    index.add(Selector(s))
+start = time.time()
+index_matches = 0
+for p in paths:
+    index_matches += len(index.match(p))
+indexed = time.time() - start
+
+print("{} selectors, {} paths".format(n_selectors, n_paths))
+print("Naive regex   : {} matches in {} sec ({} paths/sec)".format(
+    naive_matches, naive, n_paths / naive))
+print("SelectorIndex : {} matches in {} sec ({} paths/sec)".format(
+    index_matches, indexed, n_paths / indexed))
+print("Speedup       : {}".format(naive / indexed))
@@ -0,0 +1,40 @@
+from yaks import Value, Encoding
+from yaks.delta import diff, apply
+import argparse
+
+ap = argparse.ArgumentParser()
+ap.add_argument("-k", "--keys", required=False, default=100,
+                help="Number of keys of the updated documents")
+
+args = vars(ap.parse_args())
+keys = int(args['keys'])
+
+document = {'key{}'.format(i): {'value': i, 'unit': 'm', 'label': 'x' * 16}
+            for i in range(0, keys)}
+updated = dict(document)
+updated['key0'] = {'value': -1, 'unit': 'm', 'label': 'x' * 16}
+
+properties = {'key{}'.format(i): 'value{}'.format(i)
+              for i in range(0, keys)}
+updated_properties = dict(properties)
+updated_properties['key0'] = 'changed'
+
+raw = bytes(range(0, 256)) * keys
+updated_raw = bytearray(raw)
+updated_raw[len(raw) // 2] ^= 0xff
+
+samples = [
+    ('JSON', Value(document, Encoding.JSON),
+     Value(updated, Encoding.JSON)),
+    ('PROPERTY', Value(properties, Encoding.PROPERTY),
+     Value(updated_properties, Encoding.PROPERTY)),
+    ('RAW', Value(raw), Value(bytes(updated_raw)))
+]
+
+for (name, base, value) in samples:
+    delta = diff(base, value)
+    assert apply(base, delta) == value
+    full = len(value.as_z_payload())
+    sent = len(delta.as_z_payload())
+    print("{:8} : put {:7} bytes, update {:5} bytes ({:.1f}% saved)".format(
+        name, full, sent, 100.0 * (full - sent) / full))
@@ -10,10 +10,15 @@ ap.add_argument("-z", "--zenoh", required=False,
 ap.add_argument("-s", "--samples", required=True,
                 help="Samples to be sent as part of the test")
 
+ap.add_argument("-b", "--batch", required=False, default=0,
+                help="Use a write batch of the given size instead of "
+                     "one put per sample")
+
 args = vars(ap.parse_args())
 zlocator = args['zenoh']
 
 samples = int(args['samples'])
+batch = int(args['batch'])
 
 y = Yaks.login(zlocator)
 ws = y.workspace('/')
@@ -21,8 +26,13 @@ ws = y.workspace('/')
 
 start = time.time()
 path = '/ylatp/sample'
-for i in range(0, samples):
-    ws.put(path, Value('01234567', Encoding.STRING))
+if batch > 0:
+    with ws.batch(max_size=batch) as b:
+        for i in range(0, samples):
+            b.put(path, Value('01234567', Encoding.STRING))
+else:
+    for i in range(0, samples):
+        ws.put(path, Value('01234567', Encoding.STRING))
 stop = time.time()
 delta = stop - start
 
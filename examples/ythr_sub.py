@@ -9,8 +9,16 @@ ap = argparse.ArgumentParser()
 ap.add_argument("-z", "--zenoh", required=False,
                 help="ip:port for the zenoh router")
 
+ap.add_argument("-b", "--batch", required=False, default=None,
+                help="Deliver the changes by lists of at most this size")
+
+ap.add_argument("-d", "--delay", required=False, default=None,
+                help="Maximum delay (in seconds) before a list is delivered")
+
 args = vars(ap.parse_args())
 zlocator = args['zenoh']
+max_batch = int(args['batch']) if args['batch'] is not None else None
+max_delay = float(args['delay']) if args['delay'] is not None else None
 
 y = Yaks.login(zlocator)
 ws = y.workspace('/')
@@ -19,8 +27,8 @@ count = 0
 start = 0
 
 
-def listener(kvs):
-    for (k, v) in kvs:
+def listener(changes):
+    for change in changes:
         global count
         global start
         global N
@@ -37,6 +45,6 @@ def listener(kvs):
 
 
 path = '/ylatp/sample'
-ws.subscribe(path, listener)
+ws.subscribe(path, listener, max_batch=max_batch, max_delay=max_delay)
 
 time.sleep(60)
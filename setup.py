@@ -24,10 +24,11 @@ setup(
     author='ADLINK Advance Technology Office',
     description='Python API to access the YAKS service',
     long_description=read('README.md'),
-    packages=['yaks'],
+    packages=['yaks', 'yaks.bench'],
     url='https://github.com/atolab/yaks-python',
     authon_email='gabriele.baldoni@adlinktech.com',
     install_requires=['hexdump', 'mvar', 'papero==0.2.7'],
+    python_requires='>=3.5',
     license='Apache 2.O or EPL 2.0',
     classifiers=[
           'Development Status :: 2 - Pre-Alpha',
@@ -14,9 +14,15 @@
 
 from yaks.yaks import Yaks
 from yaks.workspace import Workspace
+from yaks.batch import WriteBatch
+from yaks.asyncworkspace import AsyncWorkspace
+from yaks.cache import CachedWorkspace
 from yaks.admin import Admin
 from yaks.encoding import *
 from yaks import exceptions
-from yaks.selector import Selector
+from yaks.selector import Selector, SelectorIndex
 from yaks.value import Value, Change, ChangeKind
 from yaks.path import Path
+from yaks.results import ResultSet
+from yaks.series import Series
+from yaks.columns import Columns
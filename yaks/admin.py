@@ -14,20 +14,36 @@
 
 from yaks.value import Value
 from yaks.encoding import Encoding
+from yaks.cache import CachedWorkspace
 import zenoh
 
 
 class Admin(object):
     '''
     The Administration helper class.
+
+    If its workspace is a :class:`~yaks.cache.CachedWorkspace`, the
+    backends and storages are queried once and then kept up to date by
+    subscriptions: the gets are served locally and see the changes once
+    received.
     '''
 
     PREFIX = '@'
 
-    def __init__(self, ws):
+    def __init__(self, ws, local=None):
         self.ws = ws
-        self.local = ''.join('{:02x}'.format(x) for x in
-                             ws.rt.info()[zenoh.Z_INFO_PEER_PID_KEY])
+        if local is None:
+            local = ''.join('{:02x}'.format(x) for x in
+                            ws.rt.info()[zenoh.Z_INFO_PEER_PID_KEY])
+        self.local = local
+        self.cached = isinstance(ws, CachedWorkspace)
+
+    def __storage_paths(self, yaks):
+        # stid -> admin path of the storages of a Yaks instance
+        s = '/{}/{}/plugins/yaks/backend/*/storage/*'.format(
+            Admin.PREFIX, yaks)
+        return {e.get_path().split('/')[-1]: e.get_path()
+                for e in self.ws.get(s)}
 
     def add_backend(self, beid, properties, yaks=None):
         '''
@@ -141,6 +157,8 @@ class Admin(object):
         '''
         if(yaks is None):
             yaks = self.local
+        if self.cached:
+            return dict(self.get_storages(yaks=yaks)).get(stid)
         s = '/{}/{}/plugins/yaks/backend/*/storage/{}'.format(
             Admin.PREFIX, yaks, stid)
         entries = self.ws.get(s)
@@ -158,6 +176,9 @@ class Admin(object):
         '''
         if(yaks is None):
             yaks = self.local
+        if self.cached:
+            p = self.__storage_paths(yaks).get(stid)
+            return False if p is None else self.ws.remove(p)
         s = '/{}/{}/plugins/yaks/backend/*/storage/{}'.format(
             Admin.PREFIX, yaks, stid)
         entries = self.ws.get(s)
@@ -165,3 +186,99 @@ class Admin(object):
             p = entries[0].get_path()
             return self.ws.remove(p)
         return False
+
+    def add_storages(self, storages, yaks=None):
+        '''
+        Adds several storages in the specified Yaks at once.
+
+        :param storages: an iterable of (stid, properties) or (stid,
+            properties, beid) tuples, as the parameters of
+            :func:`add_storage`.
+        :param yaks: the UUID of the Yaks instance. If ``None``, the local
+            Yaks instance.
+        :returns: the number of storages added.
+        '''
+        if(yaks is None):
+            yaks = self.local
+        values = {}
+
+        def entries():
+            for storage in storages:
+                (stid, properties) = storage[:2]
+                beid = storage[2] if len(storage) > 2 else None
+                p = '/{}/{}/plugins/yaks/backend/{}/storage/{}'.format(
+                    Admin.PREFIX, yaks, beid or 'auto', stid)
+                # the storages sharing the same properties object share
+                # the same value, encoded once
+                v = values.get(id(properties))
+                if v is None:
+                    v = (Value(properties, encoding=Encoding.PROPERTY),
+                         properties)
+                    values[id(properties)] = v
+                yield (p, v[0])
+        return self.ws.put_many(entries())
+
+    def remove_storages(self, stids, yaks=None):
+        '''
+        Removes several storages from the specified Yaks at once, with a
+        single query to find them.
+
+        :param stids: an iterable of storage Ids.
+        :param yaks: the UUID of the Yaks instance. If ``None``, the local
+            Yaks instance.
+        :returns: the number of storages removed, the unknown Ids being
+            ignored.
+        '''
+        if(yaks is None):
+            yaks = self.local
+        paths = self.__storage_paths(yaks)
+        count = 0
+        for stid in stids:
+            p = paths.pop(stid, None)
+            if p is not None and self.ws.remove(p):
+                count += 1
+        return count
+
+    def __get_all(self, kind, yaks, timeout):
+        if yaks is None:
+            # a single query for all the reachable instances
+            selectors = ['/{}/*/plugins/yaks/backend/{}'.format(
+                Admin.PREFIX, kind)]
+            results = {}
+        else:
+            selectors = ['/{}/{}/plugins/yaks/backend/{}'.format(
+                Admin.PREFIX, y, kind) for y in yaks]
+            results = {y: [] for y in yaks}
+        entries = self.ws.get_many(selectors, merge=True, timeout=timeout,
+                                   partial=True)
+        for e in entries:
+            segments = e.get_path().split('/')
+            results.setdefault(segments[2], []).append(
+                (segments[-1], e.get_value().value))
+        return results
+
+    def get_all_backends(self, yaks=None, timeout=None):
+        '''
+        Get the backends of several Yaks instances, queried in parallel.
+
+        :param yaks: a list of UUIDs of Yaks instances. If ``None``, all the
+            reachable Yaks instances.
+        :param timeout: the maximum time (in seconds) to wait for the
+            replies. The instances not replying in time are returned
+            without backends.
+        :returns: a dictionary associating to each UUID the list of
+            (beid, properties) of its backends.
+        '''
+        return self.__get_all('*', yaks, timeout)
+
+    def get_all_storages(self, yaks=None, timeout=None):
+        '''
+        Get the storages of several Yaks instances, queried in parallel.
+
+        :param yaks: a list of UUIDs of Yaks instances. If ``None``, all the
+            reachable Yaks instances.
+        :param timeout: see :func:`get_all_backends`.
+        :returns: a dictionary associating to each UUID the list of
+            (stid, properties) of its storages.
+        '''
+        return self.__get_all('*/storage/*', yaks, timeout)
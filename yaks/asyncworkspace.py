@@ -0,0 +1,396 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+import asyncio
+import inspect
+import threading
+import traceback
+from yaks.selector import Selector
+from yaks.value import Value
+from yaks.entry import Entry
+from yaks.results import ResultSet
+from yaks.exceptions import QueryTimeoutError
+from yaks.workspace import Workspace, _send_value, _collect
+import zenoh
+
+# asyncio.get_running_loop requires Python 3.7, get_event_loop returns the
+# running loop when called from a coroutine
+_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+async def _result(result):
+    # the value of an eval, whatever the kind of function it is
+    if inspect.isawaitable(result):
+        return await result
+    if hasattr(result, '__aiter__'):
+        return await _collect(result)
+    return result
+
+
+class LoopBridge(object):
+    '''
+
+    Hands over calls from the zenoh I/O thread to an asyncio event loop.
+
+    Calls are accumulated and the loop is woken up once per batch with
+    ``call_soon_threadsafe`` rather than once per call.
+
+    '''
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.lock = threading.Lock()
+        self.pending = []
+
+    def call(self, fn, *args):
+        with self.lock:
+            self.pending.append((fn, args))
+            wakeup = len(self.pending) == 1
+        if wakeup:
+            try:
+                self.loop.call_soon_threadsafe(self.__drain)
+            except RuntimeError:
+                # the loop has been closed, nobody is waiting anymore
+                with self.lock:
+                    self.pending = []
+
+    def __drain(self):
+        with self.lock:
+            pending = self.pending
+            self.pending = []
+        for (fn, args) in pending:
+            fn(*args)
+
+
+class AsyncSubscription(object):
+    '''
+
+    A subscription whose changes are consumed with ``async for``::
+
+        sub = await ws.subscribe('/fleet/**')
+        async for change in sub:
+            ...
+
+    '''
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.sid = None
+        self.queue = asyncio.Queue()
+        self.closed = False
+
+    def _push(self, changes):
+        if not self.closed:
+            for change in changes:
+                self.queue.put_nowait(change)
+
+    def close(self):
+        '''
+
+        Unregisters the subscription and ends the ``async for`` iteration
+        once the already received changes have been consumed.
+
+        '''
+        if not self.closed:
+            self.closed = True
+            self.ws.unsubscribe(self.sid)
+            self.queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        change = await self.queue.get()
+        if change is None:
+            raise StopAsyncIteration
+        return change
+
+
+class AsyncWorkspace(object):
+    '''
+
+    A Workspace to operate on Yaks from asyncio code.
+
+    It offers the same operations as :class:`~yaks.workspace.Workspace` as
+    coroutines. Replies, subscription changes and eval queries received on
+    the zenoh I/O thread are handed over to the event loop in batches.
+
+    The workspace can be created outside of any event loop: unless a
+    ``loop`` is given, its coroutines use the loop running them.
+
+    '''
+
+    def __init__(self, runtime, path, loop=None, metrics=None):
+        self.ws = Workspace(runtime, path, metrics=metrics)
+        self.rt = runtime
+        self.path = self.ws.path
+        self.loop = loop
+        self.bridge = None
+        # the tasks of the coroutine listeners and evals, asyncio keeping
+        # only weak references on them
+        self.tasks = set()
+
+    def _bridge(self):
+        # the bridge to the given loop, or to the running one
+        loop = self.loop if self.loop is not None \
+            else _running_loop()
+        bridge = self.bridge
+        if bridge is None or bridge.loop is not loop:
+            bridge = self.bridge = LoopBridge(loop)
+        return bridge
+
+    def _spawn(self, loop, coroutine):
+        # runs a coroutine until it is done, reporting its exception to the
+        # exception handler of the loop
+        task = loop.create_task(coroutine)
+        self.tasks.add(task)
+
+        def done(task):
+            self.tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                loop.call_exception_handler({
+                    'message': 'Exception in a coroutine of an '
+                               'AsyncWorkspace',
+                    'exception': task.exception(),
+                    'task': task})
+        task.add_done_callback(done)
+        return task
+
+    async def put(self, path, value):
+        '''
+
+        Put a path/value into Yaks.
+
+        :param path: the Path. Can be absolute or relative to the workspace.
+        :param value: the value.
+
+        '''
+        return self.ws.put(path, value)
+
+    async def put_many(self, entries):
+        '''
+
+        Put several path/value into Yaks.
+        See :func:`~yaks.workspace.Workspace.put_many`.
+
+        :param entries: an iterable of (path, value) tuples.
+        :returns: the number of path/value put.
+
+        '''
+        return self.ws.put_many(entries)
+
+    async def remove(self, path):
+        '''
+
+        Remove a path/value from Yaks.
+
+        :param path: the Path to be removed.
+            Can be absolute or relative to the workspace.
+
+        '''
+        return self.ws.remove(path)
+
+    async def get(self, selector, timeout=None, partial=False):
+        '''
+
+        Get a selection of path/value from Yaks.
+
+        :param selector: the selector expressing the selection.
+        :param timeout: see :func:`~yaks.workspace.Workspace.get`.
+        :param partial: see :func:`~yaks.workspace.Workspace.get`.
+        :returns: a :class:`~yaks.results.ResultSet` (a list of entry).
+
+        '''
+
+        selector = Selector.to_selector(self.ws._to_absolute(selector))
+        bridge = self._bridge()
+        entries = []
+        done = bridge.loop.create_future()
+
+        def on_reply(reply):
+            if done.done():
+                return
+            if reply is None:
+                done.set_result(False)
+            else:
+                entries.append(reply)
+
+        def on_timeout():
+            if not done.done():
+                done.set_result(True)
+
+        def callback(reply):
+            if done.done():
+                # late reply after a timeout
+                return
+            if(reply.kind == zenoh.Z_STORAGE_DATA
+               or reply.kind == zenoh.Z_EVAL_DATA):
+                bridge.call(on_reply, Entry(
+                    reply.rname,
+                    Value.from_z_resource(reply.data, reply.info),
+                    reply.info.tstamp))
+            elif reply.kind == zenoh.Z_REPLY_FINAL:
+                bridge.call(on_reply, None)
+
+        self.rt.query(
+            selector.get_path(),
+            selector.get_optional_part(),
+            callback)
+        if timeout is not None:
+            timer = bridge.loop.call_later(timeout, on_timeout)
+            done.add_done_callback(lambda _: timer.cancel())
+        timed_out = await done
+        results = ResultSet(self.ws._results(selector, entries), timed_out)
+        if timed_out and not partial:
+            raise QueryTimeoutError('Query timed out', results)
+        return results
+
+    async def subscribe(self, selector, listener=None, max_batch=None,
+                        max_delay=None, conflate=False, shared=False):
+        '''
+
+        Subscribe to a selection of path/value from Yaks.
+
+        :param selector: the selector expressing the selection.
+        :param listener: a function or a coroutine function called on the
+            event loop with the list of changes. If ``None``, the changes are
+            consumed by iterating the returned subscription with
+            ``async for``.
+        :param max_batch: see :func:`~yaks.workspace.Workspace.subscribe`.
+        :param max_delay: see :func:`~yaks.workspace.Workspace.subscribe`.
+        :param conflate: see :func:`~yaks.workspace.Workspace.subscribe`.
+        :param shared: see :func:`~yaks.workspace.Workspace.subscribe`.
+        :returns: a subscription id, or a :class:`AsyncSubscription` if
+            ``listener`` is ``None``.
+
+        '''
+
+        bridge = self._bridge()
+        if listener is None:
+            sub = AsyncSubscription(self.ws)
+            sub.sid = self.ws.subscribe(
+                selector,
+                lambda changes: bridge.call(sub._push, changes),
+                max_batch, max_delay, conflate, shared)
+            return sub
+
+        if asyncio.iscoroutinefunction(listener):
+            def deliver(changes):
+                self._spawn(bridge.loop, listener(changes))
+        else:
+            deliver = listener
+        return self.ws.subscribe(
+            selector,
+            lambda changes: bridge.call(deliver, changes),
+            max_batch, max_delay, conflate, shared)
+
+    async def unsubscribe(self, subscription):
+        '''
+
+        Unregisters a previous subscription.
+
+        :param subscription: the subscription id or the
+            :class:`AsyncSubscription` to unregister.
+
+        '''
+        if isinstance(subscription, AsyncSubscription):
+            subscription.close()
+            return True
+        return self.ws.unsubscribe(subscription)
+
+    async def register_eval(self, path, callback, max_concurrency=None,
+                            max_pending=None):
+        '''
+
+        Registers an evaluation function under the provided path.
+
+        :param path: the Path where the function can be triggered using
+            :func:`~yaks.workspace.Workspace.get`.
+        :param callback: the evaluation function, taking the path and the
+            properties of the query and returning a
+            :class:`~yaks.value.Value` or several values as for
+            :func:`~yaks.workspace.Workspace.register_eval`. It can be a
+            function, a generator function, a coroutine function or an
+            asynchronous generator function. It is executed on the event
+            loop.
+        :param max_concurrency: the maximum number of queries evaluated at
+            once. If ``None``, unbounded.
+        :param max_pending: the maximum number of queries waiting for
+            ``max_concurrency``, which it requires. The queries received
+            beyond are replied at once without any value. If ``None``,
+            unbounded.
+
+        A query whose evaluation raises an exception is replied without
+        any value, and the exception is printed.
+
+        '''
+
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError('max_concurrency must be a positive integer')
+        if max_pending is not None and max_concurrency is None:
+            raise ValueError('max_pending requires max_concurrency')
+        bridge = self._bridge()
+        semaphore = None if max_concurrency is None \
+            else asyncio.Semaphore(max_concurrency)
+        limit = None if max_concurrency is None or max_pending is None \
+            else max_concurrency + max_pending
+        # the queries running or waiting for the semaphore, only accessed
+        # from the event loop
+        admitted = 0
+
+        async def reply(path_selector, args, send_replies):
+            nonlocal admitted
+            try:
+                if semaphore is None:
+                    result = await _result(callback(path_selector, args))
+                else:
+                    async with semaphore:
+                        result = await _result(callback(path_selector, args))
+                _send_value(send_replies, path_selector, result)
+            except Exception:
+                # the query is replied without value rather than left
+                # waiting for its final reply
+                traceback.print_exc()
+                send_replies([])
+            finally:
+                admitted -= 1
+
+        def evaluate(path_selector, content_selector, send_replies):
+            nonlocal admitted
+            if limit is not None and admitted >= limit:
+                send_replies([])
+                return
+            args = Selector.dict_from_properties(
+                Selector("{}?{}".format(path_selector, content_selector)))
+            admitted += 1
+            self._spawn(bridge.loop,
+                        reply(path_selector, args, send_replies))
+
+        def query_handler(path_selector, content_selector, send_replies):
+            bridge.call(evaluate, path_selector, content_selector,
+                        send_replies)
+
+        path = self.ws._to_absolute(path)
+        zeval = self.rt.declare_eval(path, query_handler)
+        self.ws.evals.append((path, zeval))
+
+    async def unregister_eval(self, path):
+        '''
+
+        Unregister a previously registered evaluation function.
+
+        :param path: the path where the function has been registered.
+
+        '''
+        return self.ws.unregister_eval(path)
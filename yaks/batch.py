@@ -0,0 +1,319 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from collections import deque, OrderedDict
+import yaks.delta
+from yaks.exceptions import ValidationError
+from yaks.value import Change, ChangeKind
+
+
+class _Worker(object):
+    '''
+
+    Runs the functions submitted to it in order, on a thread of its own
+    started on demand and ending after ``IDLE_TIMEOUT`` seconds without
+    function to run.
+
+    '''
+
+    IDLE_TIMEOUT = 1.0
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.fns = deque()
+        self.thread = None
+
+    def submit(self, fn):
+        with self.cond:
+            self.fns.append(fn)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.__run,
+                                               daemon=True)
+                self.thread.start()
+            else:
+                self.cond.notify()
+
+    def __run(self):
+        while True:
+            with self.cond:
+                if len(self.fns) == 0:
+                    self.cond.wait(self.IDLE_TIMEOUT)
+                if len(self.fns) == 0:
+                    self.thread = None
+                    return
+                fn = self.fns.popleft()
+            try:
+                fn()
+            except Exception:
+                traceback.print_exc()
+
+
+class _Scheduler(object):
+    '''
+
+    Times the delayed flushes of all the batches and batchers on a single
+    thread, started on the first schedule, instead of a timer thread per
+    window. The thread only hands each due flush to the ``submit`` function
+    it was scheduled with, so that a flush taking long, e.g. a listener
+    called without executor, does not delay the others.
+
+    '''
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        # [deadline, sequence number, function or None if cancelled]
+        self.entries = []
+        self.sequence = itertools.count()
+        self.thread = None
+
+    def schedule(self, delay, fn, submit):
+        entry = [time.monotonic() + delay, next(self.sequence), fn, submit]
+        with self.cond:
+            heapq.heappush(self.entries, entry)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.__run,
+                                               daemon=True)
+                self.thread.start()
+            elif self.entries[0] is entry:
+                self.cond.notify()
+        return entry
+
+    def cancel(self, entry):
+        # the entry is dropped when it is due
+        entry[2] = None
+
+    def __next(self):
+        # called with the lock held
+        while True:
+            if len(self.entries) == 0:
+                self.cond.wait()
+                continue
+            (deadline, _, fn, submit) = self.entries[0]
+            if fn is None:
+                heapq.heappop(self.entries)
+                continue
+            delay = deadline - time.monotonic()
+            if delay <= 0:
+                heapq.heappop(self.entries)
+                return (fn, submit)
+            self.cond.wait(delay)
+
+    def __run(self):
+        while True:
+            with self.cond:
+                (fn, submit) = self.__next()
+            try:
+                submit(fn)
+            except Exception:
+                # e.g. an executor shut down
+                traceback.print_exc()
+
+
+_scheduler = _Scheduler()
+
+
+class WriteBatch(object):
+    '''
+
+    A batch of puts accumulated on the client side and handed to a
+    :class:`~yaks.workspace.Workspace` in groups.
+
+    The batch is flushed when it holds ``max_size`` puts, when ``max_delay``
+    seconds elapsed since the first put of the current group, on
+    :func:`flush` and when leaving the ``with`` block.
+
+    '''
+
+    DEFAULT_MAX_SIZE = 1024
+
+    def __init__(self, ws, max_size=DEFAULT_MAX_SIZE, max_delay=None):
+        if max_size is None or max_size < 1:
+            raise ValueError('max_size must be a positive integer')
+        self.ws = ws
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.pending = []
+        self.lock = threading.Lock()
+        self.timer = None
+        # runs the delayed flushes
+        self.worker = _Worker()
+
+    def put(self, path, value):
+        '''
+
+        Add a path/value to the batch.
+
+        :param path: the Path. Can be absolute or relative to the workspace.
+        :param value: the value.
+
+        '''
+        with self.lock:
+            self.pending.append((path, value))
+            if len(self.pending) >= self.max_size:
+                self.__flush()
+            elif self.max_delay is not None and self.timer is None:
+                self.timer = _scheduler.schedule(self.max_delay, self.flush,
+                                                 self.worker.submit)
+        return True
+
+    def flush(self):
+        '''
+
+        Hand all the pending puts to the workspace.
+
+        '''
+        with self.lock:
+            if len(self.pending) > 0:
+                self.__flush()
+
+    def close(self):
+        '''
+
+        Flush the pending puts. The batch can still be used afterwards.
+
+        '''
+        self.flush()
+
+    def __flush(self):
+        # called with the lock held, so that a delayed flush and a flush
+        # on size hand their groups in the order of the puts
+        if self.timer is not None:
+            _scheduler.cancel(self.timer)
+            self.timer = None
+        group = self.pending
+        self.pending = []
+        self.ws.put_many(group)
+
+    def __len__(self):
+        return len(self.pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _conflate(changes, update):
+    # merges an UPDATE into the last pending change of its path, whose
+    # deltas cannot be dropped
+    last = changes[-1]
+    try:
+        if last.kind == ChangeKind.PUT:
+            value = yaks.delta.apply(last.value, update.value)
+            changes[-1] = Change(last.path, ChangeKind.PUT, update.time,
+                                 value)
+            return
+        if last.kind == ChangeKind.UPDATE:
+            delta = yaks.delta.merge(last.value, update.value)
+            if delta is not None:
+                changes[-1] = Change(last.path, ChangeKind.UPDATE,
+                                     update.time, delta)
+                return
+    except (ValueError, ValidationError):
+        pass
+    changes.append(update)
+
+
+class ChangeBatcher(object):
+    '''
+
+    Accumulates the changes received by a subscription and delivers them to
+    the listener as lists.
+
+    A list is delivered when it holds ``max_batch`` changes, or
+    ``max_delay`` seconds after its first change was received. In
+    conflation mode, only the latest change of each path is kept, which
+    lets a slow listener skip the intermediate values. An ``UPDATE``
+    change is merged with the pending change of its path instead: a
+    ``PUT`` followed by an ``UPDATE`` is kept as the ``PUT`` of the updated
+    value, and two ``UPDATE`` as one if their deltas can be merged (see
+    :func:`yaks.delta.merge`). Otherwise both are kept.
+
+    The delayed deliveries run on ``submit``, e.g. the ``submit`` method of
+    an executor, or by default on a thread of the batcher.
+
+    '''
+
+    def __init__(self, deliver, max_batch=None, max_delay=None,
+                 conflate=False, submit=None):
+        if max_batch is None and max_delay is None:
+            raise ValueError('max_batch or max_delay must be set')
+        if max_batch is not None and max_batch < 1:
+            raise ValueError('max_batch must be a positive integer')
+        self.deliver = deliver
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.conflate = conflate
+        self.pending = OrderedDict() if conflate else deque()
+        self.lock = threading.RLock()
+        self.timer = None
+        self.submit = _Worker().submit if submit is None else submit
+
+    def add(self, change):
+        '''
+
+        Add a change, delivering the pending changes if ``max_batch`` is
+        reached.
+
+        :param change: the :class:`~yaks.value.Change`.
+
+        '''
+        with self.lock:
+            if self.conflate:
+                changes = self.pending.pop(change.path, None)
+                if changes is None or change.kind != ChangeKind.UPDATE:
+                    changes = [change]
+                else:
+                    _conflate(changes, change)
+                self.pending[change.path] = changes
+            else:
+                self.pending.append(change)
+            if self.max_batch is not None \
+                    and len(self.pending) >= self.max_batch:
+                self.__deliver()
+            elif self.max_delay is not None and self.timer is None:
+                self.timer = _scheduler.schedule(self.max_delay, self.flush,
+                                                 self.submit)
+
+    def flush(self):
+        '''
+
+        Deliver the pending changes, if any.
+
+        '''
+        with self.lock:
+            if len(self.pending) > 0:
+                self.__deliver()
+
+    def __deliver(self):
+        # called with the lock held, so that the lists are delivered in the
+        # order the changes were received
+        if self.timer is not None:
+            _scheduler.cancel(self.timer)
+            self.timer = None
+        if self.conflate:
+            changes = [c for cs in self.pending.values() for c in cs]
+        else:
+            changes = list(self.pending)
+        self.pending.clear()
+        self.deliver(changes)
+
+    def __len__(self):
+        return len(self.pending)
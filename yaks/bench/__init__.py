@@ -0,0 +1,78 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+'''
+
+Latency and throughput benchmarks of the Yaks API, run with::
+
+    python -m yaks.bench [--locator LOCATOR] [--output FILE] ...
+
+and returning their results as JSON.
+
+'''
+
+import platform
+import time
+from yaks.yaks import Yaks
+from yaks.bench.suites import SUITES
+
+DEFAULT_SAMPLES = 10000
+DEFAULT_SIZE = 64
+DEFAULT_PATH = '/yaks/bench'
+LOOPBACK_LOCATOR = 'mem://yaks.bench'
+
+
+def loopback():
+    '''
+
+    Opens a session with an in-process Yaks service (see
+    :mod:`yaks.loopback`) having a storage on :data:`DEFAULT_PATH`.
+
+    :returns: a :class:`~yaks.yaks.Yaks`.
+
+    '''
+    y = Yaks.login(LOOPBACK_LOCATOR)
+    y.admin().add_storage('yaks.bench',
+                          {'selector': '{}/**'.format(DEFAULT_PATH)})
+    return y
+
+
+def run(y, suites=None, samples=DEFAULT_SAMPLES, size=DEFAULT_SIZE,
+        path=DEFAULT_PATH):
+    '''
+
+    Runs benchmark suites.
+
+    :param y: the :class:`~yaks.yaks.Yaks` to run the suites with.
+    :param suites: the names of the suites to run, among the keys of
+        :data:`~yaks.bench.suites.SUITES`. If ``None``, all of them.
+    :param samples: the number of operations of each measure.
+    :param size: the size of the values, in bytes.
+    :param path: the path under which the suites put their values.
+    :returns: a JSON-serializable dictionary of results.
+
+    '''
+    if suites is None:
+        suites = list(SUITES)
+    ws = y.workspace(path)
+    results = {}
+    for name in suites:
+        results[name] = SUITES[name](ws, path, samples, size)
+    return {
+        'time': time.time(),
+        'python': platform.python_version(),
+        'samples': samples,
+        'size': size,
+        'results': results
+    }
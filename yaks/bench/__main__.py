@@ -0,0 +1,71 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+import argparse
+import json
+import sys
+from yaks import Yaks
+from yaks.bench import run, loopback, SUITES, DEFAULT_SAMPLES, \
+    DEFAULT_SIZE, DEFAULT_PATH
+from yaks.bench import parallel
+
+# the workers of the parallel suite import this module
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(
+        prog='python -m yaks.bench',
+        description='Benchmarks the Yaks API and prints the results as '
+                    'JSON.')
+    ap.add_argument('-l', '--locator', default=None,
+                    help='the locator of the Yaks service, "auto" to '
+                         'discover it. By default an in-process Yaks service '
+                         'with a storage on {} is used. The get suite '
+                         'requires a storage on the path.'.format(
+                             DEFAULT_PATH))
+    ap.add_argument('-s', '--suite', action='append', choices=sorted(SUITES),
+                    help='a suite to run (can be repeated). Default: all')
+    ap.add_argument('-n', '--samples', type=int, default=DEFAULT_SAMPLES,
+                    help='the number of operations per measure')
+    ap.add_argument('-z', '--size', type=int, default=DEFAULT_SIZE,
+                    help='the size of the values in bytes')
+    ap.add_argument('-p', '--path', default=DEFAULT_PATH,
+                    help='the path under which the values are put')
+    ap.add_argument('-o', '--output', default=None,
+                    help='the file to write the results to. Default: stdout')
+    ap.add_argument('-w', '--workers', type=int, action='append',
+                    help='also run the parallel suite, on in-process Yaks '
+                         'services, with this number of workers (can be '
+                         'repeated)')
+    args = ap.parse_args()
+
+    if args.locator is None:
+        y = loopback()
+        runtime = 'loopback'
+    else:
+        y = Yaks.login(None if args.locator == 'auto' else args.locator)
+        runtime = args.locator
+    try:
+        report = run(y, args.suite, args.samples, args.size, args.path)
+    finally:
+        y.logout()
+    report['runtime'] = runtime
+    if args.workers:
+        report['parallel'] = parallel.run(args.workers, args.samples,
+                                          args.size)
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,107 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+'''
+
+Measures the scaling of a :class:`~yaks.parallel.ShardedSubscriber` with
+its number of workers.
+
+Each worker has its own in-process Yaks service (see
+:mod:`yaks.loopback`), on which a thread of the worker puts JSON values
+once all the workers are started, while the subscription decodes them and
+passes a result back to the parent. The rate is the one at which the
+parent receives the results, from the start of the puts to the last
+result.
+
+'''
+
+import functools
+import multiprocessing
+import struct
+import threading
+import time
+from yaks.encoding import Encoding
+from yaks.value import Value
+from yaks.parallel import ShardedSubscriber
+
+PATH = '/yaks/bench/parallel'
+LOCATOR = 'mem://yaks.bench.parallel'
+# the time waited for the results, in seconds
+DELIVERY_TIMEOUT = 60
+
+_RESULT = struct.Struct('<I')
+
+
+def _handler(change):
+    # decodes the JSON value, as a typical listener would
+    return _RESULT.pack(len(change.get_value().get_value()['data']))
+
+
+def _publish(go, samples, size, y):
+    ws = y.workspace(PATH)
+    value = Value({'data': 'x' * size}, Encoding.JSON)
+
+    def publish():
+        go.wait()
+        for i in range(samples):
+            ws.put(str(i % 100), value)
+    threading.Thread(target=publish, daemon=True).start()
+
+
+def bench_parallel(workers, samples, size):
+    '''
+
+    Measures the rate of the results of a
+    :class:`~yaks.parallel.ShardedSubscriber` whose workers each receive
+    ``samples`` changes.
+
+    '''
+    expected = workers * samples
+    last = [None]
+    received = [0]
+    done = threading.Event()
+    go = multiprocessing.get_context('spawn').Event()
+
+    def listener(results):
+        last[0] = time.perf_counter()
+        received[0] += len(results)
+        if received[0] >= expected:
+            done.set()
+
+    subscriber = ShardedSubscriber(
+        LOCATOR, ['{}/**'.format(PATH)] * workers, _handler, listener,
+        workers, initializer=functools.partial(_publish, go, samples, size))
+    with subscriber:
+        start = time.perf_counter()
+        go.set()
+        complete = done.wait(DELIVERY_TIMEOUT)
+    elapsed = 0 if last[0] is None else last[0] - start
+    return {
+        'workers': workers,
+        'results_per_sec': received[0] / elapsed if elapsed > 0 else None,
+        'received': received[0],
+        'complete': complete
+    }
+
+
+def run(workers, samples, size):
+    '''
+
+    Runs :func:`bench_parallel` with each number of workers.
+
+    :param workers: a list of numbers of workers.
+    :returns: a JSON-serializable list of results.
+
+    '''
+    return [bench_parallel(n, samples, size) for n in workers]
@@ -0,0 +1,192 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+import threading
+import time
+from yaks.encoding import Encoding
+from yaks.value import Value
+
+# the time waited for the changes of the subscription suite, in seconds
+DELIVERY_TIMEOUT = 30
+
+
+class _Info(object):
+    def __init__(self, encoding):
+        self.encoding = encoding
+
+
+def _rate(n, elapsed):
+    return n / elapsed if elapsed > 0 else None
+
+
+def _percentiles(latencies):
+    # latencies in seconds, returned in microseconds
+    latencies = sorted(latencies)
+    n = len(latencies)
+
+    def at(p):
+        return latencies[min(n - 1, int(p * n))] * 1e6
+
+    return {
+        'samples': n,
+        'mean_us': sum(latencies) / n * 1e6,
+        'p50_us': at(0.50),
+        'p90_us': at(0.90),
+        'p99_us': at(0.99),
+        'max_us': latencies[-1] * 1e6
+    }
+
+
+def bench_put(ws, path, samples, size):
+    '''
+
+    Measures the rate of :func:`~yaks.workspace.Workspace.put` and of
+    :func:`~yaks.workspace.Workspace.put_many`. The puts are asynchronous:
+    the rate is the one of the client.
+
+    '''
+    value = Value(b'x' * size, Encoding.RAW)
+    paths = ['{}/put/{}'.format(path, i % 100) for i in range(samples)]
+    start = time.perf_counter()
+    for p in paths:
+        ws.put(p, value)
+    put = time.perf_counter() - start
+    start = time.perf_counter()
+    ws.put_many((p, value) for p in paths)
+    put_many = time.perf_counter() - start
+    return {
+        'puts_per_sec': _rate(samples, put),
+        'put_many_per_sec': _rate(samples, put_many),
+        'mbytes_per_sec': _rate(samples * size / 1e6, put)
+    }
+
+
+def bench_get(ws, path, samples, size):
+    '''
+
+    Measures the latency of :func:`~yaks.workspace.Workspace.get` on a
+    single path. A storage must store the path.
+
+    '''
+    p = '{}/get/x'.format(path)
+    ws.put(p, Value(b'x' * size, Encoding.RAW))
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        ws.get(p)
+        latencies.append(time.perf_counter() - start)
+    return _percentiles(latencies)
+
+
+def bench_subscribe(ws, path, samples, size):
+    '''
+
+    Measures the rate at which the changes are delivered to a subscription
+    listener, from the first put to the last change.
+
+    '''
+    value = Value(b'x' * size, Encoding.RAW)
+    received = [0]
+    done = threading.Event()
+
+    def listener(changes):
+        received[0] += len(changes)
+        if received[0] >= samples:
+            done.set()
+
+    sid = ws.subscribe('{}/sub/**'.format(path), listener)
+    try:
+        start = time.perf_counter()
+        for i in range(samples):
+            ws.put('{}/sub/{}'.format(path, i % 100), value)
+        complete = done.wait(DELIVERY_TIMEOUT)
+        elapsed = time.perf_counter() - start
+    finally:
+        ws.unsubscribe(sid)
+    return {
+        'changes_per_sec': _rate(received[0], elapsed),
+        'received': received[0],
+        'complete': complete
+    }
+
+
+def bench_eval(ws, path, samples, size):
+    '''
+
+    Measures the round-trip latency of a get served by an eval.
+
+    '''
+    p = '{}/eval'.format(path)
+    value = Value(b'x' * size, Encoding.RAW)
+    ws.register_eval(p, lambda path, props: value)
+    try:
+        latencies = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            ws.get(p)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        ws.unregister_eval(p)
+    return _percentiles(latencies)
+
+
+_ENCODING_SAMPLES = [
+    ('RAW', Encoding.RAW, lambda size: b'x' * size),
+    ('STRING', Encoding.STRING, lambda size: 'x' * size),
+    ('SQL', Encoding.SQL, lambda size: 'x' * size),
+    ('PROPERTY', Encoding.PROPERTY,
+     lambda size: {'k{}'.format(i): 'v' * 8
+                   for i in range(max(1, size // 12))}),
+    ('JSON', Encoding.JSON,
+     lambda size: {'k{}'.format(i): [i, 'v' * 4, {'x': 1.5}]
+                   for i in range(max(1, size // 32))})
+]
+
+
+def bench_encoding(ws, path, samples, size):
+    '''
+
+    Measures the costs of encoding and decoding a value of about ``size``
+    bytes for each :class:`~yaks.encoding.Encoding`. The workspace is not
+    used.
+
+    '''
+    results = {}
+    for (name, encoding, make) in _ENCODING_SAMPLES:
+        data = make(size)
+        payload = Value(data, encoding).as_z_payload()
+        info = _Info(Encoding.to_z_encoding(encoding))
+        start = time.perf_counter()
+        for _ in range(samples):
+            Value(data, encoding).as_z_payload()
+        encode = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(samples):
+            Value.from_z_resource(payload, info).get_value()
+        decode = time.perf_counter() - start
+        results[name] = {
+            'bytes': len(payload),
+            'encode_us': encode / samples * 1e6,
+            'decode_us': decode / samples * 1e6
+        }
+    return results
+
+
+SUITES = {
+    'put': bench_put,
+    'get': bench_get,
+    'subscribe': bench_subscribe,
+    'eval': bench_eval,
+    'encoding': bench_encoding
+}
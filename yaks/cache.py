@@ -0,0 +1,253 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+import threading
+from collections import OrderedDict
+from yaks.encoding import Encoding, TranscodingFallback
+from yaks.selector import Selector
+from yaks.value import Value
+from yaks.entry import Entry
+from yaks.results import ResultSet
+from yaks.workspace import Workspace
+from yaks.delta import apply as apply_delta
+import zenoh
+
+
+class _CachedSelector(object):
+    def __init__(self, selector, sid):
+        self.selector = selector
+        self.sid = sid
+        self.paths = set()
+        self.complete = False
+
+
+class CachedWorkspace(Workspace):
+    '''
+
+    A :class:`~yaks.workspace.Workspace` keeping a local copy of the
+    path/values it got.
+
+    A :func:`get` with a selector without predicate, properties and fragment
+    subscribes to this selector, queries Yaks once and then keeps the local
+    copy up to date with the received changes. The following :func:`get`
+    with the same selector, or with a path matching it, are served locally
+    with the latest entry of each path. The least recently used entries and
+    selectors are evicted when the limits are reached; a selector with an
+    evicted entry is queried again on its next :func:`get`.
+
+    '''
+
+    DEFAULT_MAX_ENTRIES = 10000
+    DEFAULT_MAX_SELECTORS = 64
+
+    def __init__(self, runtime, path, executor=None,
+                 max_entries=DEFAULT_MAX_ENTRIES,
+                 max_selectors=DEFAULT_MAX_SELECTORS, metrics=None):
+        super(CachedWorkspace, self).__init__(runtime, path, executor,
+                                              metrics)
+        self.max_entries = max_entries
+        self.max_selectors = max_selectors
+        # path -> latest Entry, with a None value for a removed path
+        self.entries = OrderedDict()
+        # selector string -> _CachedSelector
+        self.selectors = OrderedDict()
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def __is_cacheable(selector):
+        return selector.get_predicate() is None \
+            and selector.get_properties() is None \
+            and selector.get_fragment() is None
+
+    def get(self, selector, encoding=Encoding.RAW,
+            fallback=TranscodingFallback.KEEP, timeout=None, deadline=None,
+            partial=False):
+        '''
+
+        Get a selection of path/value from the local copy or from Yaks.
+
+        :param selector: the selector expressing the selection.
+        :param timeout: see :func:`~yaks.workspace.Workspace.get`.
+        :param deadline: see :func:`~yaks.workspace.Workspace.get`.
+        :param partial: see :func:`~yaks.workspace.Workspace.get`. A
+            partial result is not kept as complete in the local copy.
+        :returns: a :class:`~yaks.results.ResultSet` (a list of entry).
+
+        '''
+
+        selector = Selector.to_selector(self._to_absolute(selector))
+        if not self.__is_cacheable(selector):
+            return super(CachedWorkspace, self).get(
+                selector.to_string(), timeout=timeout, deadline=deadline,
+                partial=partial)
+
+        key = selector.to_string()
+        with self.lock:
+            results = self.__lookup(selector)
+            if results is not None:
+                self.hits += 1
+                return results
+            self.misses += 1
+            cached = self.selectors.get(key)
+        if cached is None:
+            cached = self.__add_selector(selector)
+
+        entries = super(CachedWorkspace, self).get(
+            key, timeout=timeout, deadline=deadline, partial=partial)
+        with self.lock:
+            if self.selectors.get(key) is cached:
+                cached.complete = not entries.partial
+                for entry in entries:
+                    cached.paths.add(entry.path)
+                    self.__store(entry.path, entry)
+                return self.__collect(cached.paths, entries.partial)
+        return entries
+
+    def __lookup(self, selector):
+        key = selector.to_string()
+        cached = self.selectors.get(key)
+        if cached is not None and cached.complete:
+            self.selectors.move_to_end(key)
+            return self.__collect(cached.paths)
+        if selector.is_path_unique():
+            path = selector.get_path()
+            for key, cached in self.selectors.items():
+                if cached.complete and cached.selector.matches(path):
+                    self.selectors.move_to_end(key)
+                    return self.__collect([path] if path in cached.paths
+                                          else [])
+        return None
+
+    def __collect(self, paths, partial=False):
+        results = ResultSet(partial=partial)
+        for path in paths:
+            entry = self.entries.get(path)
+            if entry is not None and entry.value is not None:
+                self.entries.move_to_end(path)
+                results.append(entry)
+        return results
+
+    def __add_selector(self, selector):
+        key = selector.to_string()
+        cached = _CachedSelector(selector, None)
+
+        def callback(rname, data, info):
+            with self.lock:
+                if self.selectors.get(key) is not cached:
+                    return
+                cached.paths.add(rname)
+                if info.kind == zenoh.Z_PUT:
+                    self.__store(rname, Entry(
+                        rname, Value.from_z_resource(data, info),
+                        info.tstamp))
+                elif info.kind == zenoh.Z_REMOVE:
+                    self.__store(rname, Entry(rname, None, info.tstamp))
+                else:
+                    self.__update(rname, Value.from_z_resource(data, info),
+                                  info.tstamp)
+
+        # subscribe before querying so that no change is missed. The
+        # runtime is never called with the lock held, as the callbacks
+        # take it from the zenoh I/O thread.
+        cached.sid = self.rt.declare_subscriber(
+            selector.get_path(), zenoh.SubscriberMode.push(), callback)
+        evicted = None
+        with self.lock:
+            previous = self.selectors.get(key)
+            if previous is not None:
+                # registered concurrently by another get
+                evicted = cached
+                cached = previous
+            else:
+                if len(self.selectors) >= self.max_selectors:
+                    _, evicted = self.selectors.popitem(last=False)
+                    self.evictions += 1
+                    self.__drop_paths(evicted.paths)
+                self.selectors[key] = cached
+        if evicted is not None:
+            self.rt.undeclare_subscriber(evicted.sid)
+        return cached
+
+    def __drop_paths(self, paths):
+        for path in paths:
+            if not any(path in c.paths for c in self.selectors.values()):
+                self.entries.pop(path, None)
+
+    def __store(self, path, entry):
+        current = self.entries.get(path, entry)
+        if entry is not current and entry.timestamp is not None \
+                and current.timestamp is not None \
+                and entry.timestamp < current.timestamp:
+            # an older entry received after a newer change
+            return
+        self.entries[path] = entry
+        self.entries.move_to_end(path)
+        while len(self.entries) > self.max_entries:
+            evicted, _ = self.entries.popitem(last=False)
+            self.evictions += 1
+            self.__invalidate(evicted)
+
+    def __update(self, path, delta, timestamp):
+        current = self.entries.get(path)
+        if current is None or current.value is None:
+            self.__invalidate(path)
+            return
+        try:
+            value = apply_delta(current.value, delta)
+        except ValueError:
+            self.__invalidate(path)
+            return
+        self.__store(path, Entry(path, value, timestamp))
+
+    def __invalidate(self, path):
+        self.entries.pop(path, None)
+        for cached in self.selectors.values():
+            if path in cached.paths:
+                cached.paths.discard(path)
+                cached.complete = False
+
+    def cache_stats(self):
+        '''
+
+        Get the statistics of the local copy.
+
+        :returns: a dictionary with the number of ``hits``, ``misses`` and
+            ``evictions``, and the current number of ``entries`` and
+            ``selectors``.
+
+        '''
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'selectors': len(self.selectors)
+            }
+
+    def clear_cache(self):
+        '''
+
+        Drop the local copy and the subscriptions keeping it up to date.
+
+        '''
+        with self.lock:
+            sids = [cached.sid for cached in self.selectors.values()]
+            self.selectors.clear()
+            self.entries.clear()
+        for sid in sids:
+            self.rt.undeclare_subscriber(sid)
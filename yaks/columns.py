@@ -0,0 +1,114 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+'''
+
+Columnar results of the gets, as NumPy arrays, returned by
+:func:`~yaks.workspace.Workspace.get_columns` and
+:func:`~yaks.results.ResultSet.to_numpy`. NumPy must be installed.
+
+The values are converted all at once: the RAW payloads are concatenated
+and viewed with :py:func:`numpy.frombuffer`, and the STRING payloads are
+parsed as numbers by NumPy. The values of the other encodings are decoded
+one by one.
+
+'''
+
+from yaks.encoding import Encoding, get_codec
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _numpy():
+    if numpy is None:
+        raise ImportError('NumPy is required for the columnar results')
+    return numpy
+
+
+class Columns(object):
+    '''
+
+    The ``path``, ``timestamp`` and ``value`` columns of the entries of a
+    get, as NumPy arrays of the same length. The timestamps are the
+    ``time`` of the entry timestamps, as unsigned 64 bits integers (NTP64
+    times with zenoh), ``0`` for the entries without timestamp.
+
+    ``partial`` is ``True`` when the get timed out before all the replies
+    were received.
+
+    '''
+
+    __slots__ = ('path', 'timestamp', 'value', 'partial')
+
+    def __init__(self, path, timestamp, value, partial=False):
+        self.path = path
+        self.timestamp = timestamp
+        self.value = value
+        self.partial = partial
+
+    def __getitem__(self, name):
+        if name not in ('path', 'timestamp', 'value'):
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __len__(self):
+        return len(self.path)
+
+    def __repr__(self):
+        return 'Columns({} entries, {})'.format(len(self), self.value.dtype)
+
+
+def _values(np, encodings, payloads, dtype):
+    if len(payloads) == 0:
+        return np.empty(0, dtype)
+    if all(e == Encoding.RAW for e in encodings):
+        # a single copy of the payloads, viewed as an array
+        size = dtype.itemsize
+        for p in payloads:
+            if len(p) != size:
+                raise ValueError(
+                    'RAW payload of {} bytes for a dtype of {} bytes'
+                    .format(len(p), size))
+        return np.frombuffer(b''.join(payloads), dtype)
+    if all(e == Encoding.STRING for e in encodings):
+        return np.array([bytes(p) for p in payloads]).astype(dtype)
+    return np.array([get_codec(e).decode(p)
+                     for (e, p) in zip(encodings, payloads)], dtype)
+
+
+def to_columns(rows, dtype=None, partial=False):
+    '''
+
+    Builds the columns of a list of entries given as (path, timestamp,
+    encoding, payload) tuples.
+
+    :param rows: the list of tuples.
+    :param dtype: the NumPy dtype of the values, ``float64`` if ``None``.
+        A RAW payload must be exactly of its size.
+    :param partial: the ``partial`` flag of the columns.
+    :returns: the :class:`Columns`.
+
+    '''
+    np = _numpy()
+    dtype = np.dtype(np.float64 if dtype is None else dtype)
+    paths = np.empty(len(rows), object)
+    paths[:] = [r[0] for r in rows]
+    timestamps = np.fromiter(
+        (0 if r[1] is None else r[1].time for r in rows), np.uint64,
+        len(rows))
+    values = _values(np, [r[2] for r in rows], [r[3] for r in rows], dtype)
+    return Columns(paths, timestamps, values, partial)
@@ -0,0 +1,241 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+# Deltas between two values of the same encoding:
+# - JSON: a JSON merge patch (RFC 7386)
+# - PROPERTY: the added or changed 'key=value' and the removed 'key'
+# - RAW: the length of the common prefix and suffix (2 unsigned 32 bits,
+#   network order) followed by the bytes replacing the middle part
+# Only the JSON deltas are applied by the storages of a Yaks service, the
+# other ones are only applied by this API and the mem:// storages.
+
+import struct
+from yaks.encoding import Encoding
+from yaks.value import Value
+
+_RAW_HEADER = struct.Struct('!II')
+# the bytes compared at once to find the common prefix and suffix of RAW
+# values
+_CHUNK = 4096
+
+# the encodings whose deltas the storages of a Yaks service apply
+STORAGE_ENCODINGS = frozenset([Encoding.JSON])
+
+
+def _merge_patch(old, new):
+    # returns None when the patch cannot express the change, i.e. when a
+    # null has to be set, as a null removes a key in a merge patch
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        return None if _has_null(new) else new
+    patch = {}
+    for k in old:
+        if k not in new:
+            patch[k] = None
+    for k, v in new.items():
+        if k not in old:
+            if _has_null(v):
+                return None
+            patch[k] = v
+        elif old[k] != v:
+            p = _merge_patch(old[k], v)
+            if p is None:
+                return None
+            patch[k] = p
+    return patch
+
+
+def _merge_merge_patches(first, second):
+    # the merge patch applying first and then second, None if there is none,
+    # i.e. when second patches a value that first sets or removes
+    if not isinstance(first, dict):
+        return None
+    patch = dict(first)
+    for k, v in second.items():
+        if k in patch and isinstance(v, dict):
+            v = _merge_merge_patches(patch[k], v)
+            if v is None:
+                return None
+        patch[k] = v
+    return patch
+
+
+def _has_null(v):
+    if v is None:
+        return True
+    if isinstance(v, dict):
+        return any(_has_null(x) for x in v.values())
+    return False
+
+
+def _apply_merge_patch(target, patch):
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for k, v in patch.items():
+        if v is None:
+            result.pop(k, None)
+        else:
+            result[k] = _apply_merge_patch(result.get(k), v)
+    return result
+
+
+def _properties(v):
+    if isinstance(v, dict):
+        return v
+    props = {}
+    for p in v.split(';'):
+        if p != '':
+            kv = p.split('=', 1)
+            props[kv[0]] = kv[1] if len(kv) > 1 else None
+    return props
+
+
+def _common_prefix(a, b, n):
+    # compares whole chunks, then the bytes of the first differing one
+    i = 0
+    while i < n:
+        j = min(i + _CHUNK, n)
+        if a[i:j] != b[i:j]:
+            while a[i] == b[i]:
+                i += 1
+            return i
+        i = j
+    return n
+
+
+def _common_suffix(a, b, n):
+    la = len(a)
+    lb = len(b)
+    i = 0
+    while i < n:
+        j = min(i + _CHUNK, n)
+        if a[la - j:la - i] != b[lb - j:lb - i]:
+            while a[la - 1 - i] == b[lb - 1 - i]:
+                i += 1
+            return i
+        i = j
+    return n
+
+
+def _raw_diff(old, new):
+    old = bytes(old)
+    new = bytes(new)
+    n = min(len(old), len(new))
+    prefix = _common_prefix(old, new, n)
+    suffix = _common_suffix(old, new, n - prefix)
+    return _RAW_HEADER.pack(prefix, suffix) + new[prefix:len(new) - suffix]
+
+
+def diff(base, value):
+    '''
+
+    Computes the delta turning a value into another one.
+
+    :param base: the :class:`~yaks.value.Value` the delta applies to.
+    :param value: the :class:`~yaks.value.Value` to get once the delta
+        applied.
+    :returns: the delta as a :class:`~yaks.value.Value` of the same encoding,
+        or ``None`` if the values have different encodings, if the encoding
+        does not support deltas or if the change cannot be expressed as a
+        delta.
+
+    '''
+    encoding = value.get_encoding()
+    if base.get_encoding() != encoding:
+        return None
+    if encoding == Encoding.JSON:
+        patch = _merge_patch(base.get_value(), value.get_value())
+        if patch is None:
+            return None
+        return Value(patch, encoding=Encoding.JSON)
+    if encoding == Encoding.PROPERTY:
+        old = _properties(base.get_value())
+        new = _properties(value.get_value())
+        if None in new.values():
+            return None
+        changes = [k for k in old if k not in new]
+        changes.extend('{}={}'.format(k, v) for k, v in new.items()
+                       if old.get(k) != v)
+        return Value(';'.join(changes), encoding=Encoding.PROPERTY)
+    if encoding == Encoding.RAW:
+        return Value(_raw_diff(base.get_value(), value.get_value()),
+                     encoding=Encoding.RAW)
+    return None
+
+
+def merge(first, second):
+    '''
+
+    Merges two consecutive deltas computed by :func:`diff` into one, e.g.
+    to conflate the changes of a path.
+
+    :param first: the first delta, as a :class:`~yaks.value.Value`.
+    :param second: the delta applying after ``first``.
+    :returns: the delta equivalent to applying ``first`` then ``second``,
+        or ``None`` if the deltas cannot be merged.
+
+    '''
+    encoding = second.get_encoding()
+    if first.get_encoding() != encoding:
+        return None
+    if encoding == Encoding.JSON:
+        if not isinstance(second.get_value(), dict):
+            # second replaces the value
+            return second
+        patch = _merge_merge_patches(first.get_value(), second.get_value())
+        if patch is None:
+            return None
+        return Value(patch, encoding=Encoding.JSON)
+    if encoding == Encoding.PROPERTY:
+        props = dict(_properties(first.get_value()))
+        props.update(_properties(second.get_value()))
+        return Value(';'.join(k if v is None else '{}={}'.format(k, v)
+                              for k, v in props.items()),
+                     encoding=Encoding.PROPERTY)
+    return None
+
+
+def apply(base, delta):
+    '''
+
+    Applies a delta computed by :func:`diff`, e.g. the value of a
+    :class:`~yaks.value.Change` of kind ``UPDATE``.
+
+    :param base: the :class:`~yaks.value.Value` to update.
+    :param delta: the delta, as a :class:`~yaks.value.Value`.
+    :returns: the updated :class:`~yaks.value.Value`.
+
+    '''
+    encoding = delta.get_encoding()
+    if base.get_encoding() != encoding:
+        raise ValueError('The delta and the value encodings differ')
+    if encoding == Encoding.JSON:
+        return Value(_apply_merge_patch(base.get_value(), delta.get_value()),
+                     encoding=Encoding.JSON)
+    if encoding == Encoding.PROPERTY:
+        props = dict(_properties(base.get_value()))
+        for k, v in _properties(delta.get_value()).items():
+            if v is None:
+                props.pop(k, None)
+            else:
+                props[k] = v
+        return Value(props, encoding=Encoding.PROPERTY)
+    if encoding == Encoding.RAW:
+        old = bytes(base.get_value())
+        d = bytes(delta.get_value())
+        prefix, suffix = _RAW_HEADER.unpack_from(d)
+        return Value(b''.join((old[:prefix], d[_RAW_HEADER.size:],
+                               old[len(old) - suffix:])),
+                     encoding=Encoding.RAW)
+    raise ValueError('Encoding does not support deltas')
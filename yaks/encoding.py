@@ -14,10 +14,14 @@
 
 # Encoding
 
+import json
 from enum import Enum
 
 # TODO: This should be changed in enum
 
+__all__ = ['Encoding', 'TranscodingFallback', 'Codec', 'JSON_CODECS',
+           'register_codec', 'get_codec']
+
 
 class Encoding(object):
     Z_RAW_ENC = 0x00
@@ -69,3 +73,122 @@ class TranscodingFallback(Enum):
     FAIL = 0x01
     DROP = 0x02
     KEEP = 0x03
+
+
+class Codec(object):
+    '''
+
+    Encodes values of an :class:`Encoding` into payloads and decodes them.
+
+    :param name: the name of the codec.
+    :param encode: a function returning the payload (``bytes``) of a value.
+    :param decode: a function returning the value of a payload (a
+        bytes-like object).
+
+    '''
+
+    def __init__(self, name, encode, decode):
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+
+    def __repr__(self):
+        return 'Codec({})'.format(self.name)
+
+
+def _raw_encode(v):
+    return v.encode() if isinstance(v, str) else v
+
+
+def _text_encode(v):
+    return v.encode() if isinstance(v, str) else str(v).encode()
+
+
+def _text_decode(buf):
+    return str(buf, 'utf-8')
+
+
+def _property_encode(v):
+    if isinstance(v, str):
+        return v.encode()
+    return ';'.join(map('='.join, map(list, v.items()))).encode()
+
+
+def _json_codecs():
+    codecs = {}
+
+    def json_encode(v):
+        return json.dumps(v).encode()
+
+    def json_decode(buf):
+        return json.loads(str(buf, 'utf-8'))
+
+    codecs['json'] = Codec('json', json_encode, json_decode)
+    try:
+        import ujson
+
+        def ujson_encode(v):
+            return ujson.dumps(v).encode()
+
+        def ujson_decode(buf):
+            return ujson.loads(bytes(buf))
+
+        codecs['ujson'] = Codec('ujson', ujson_encode, ujson_decode)
+    except ImportError:
+        pass
+    try:
+        import orjson
+
+        def orjson_encode(v):
+            try:
+                return orjson.dumps(v)
+            except TypeError:
+                # e.g. non str keys, supported by the json module
+                return json_encode(v)
+
+        codecs['orjson'] = Codec('orjson', orjson_encode, orjson.loads)
+    except ImportError:
+        pass
+    return codecs
+
+
+JSON_CODECS = _json_codecs()
+
+_codecs = {
+    Encoding.RAW: Codec('raw', _raw_encode, lambda buf: buf),
+    Encoding.STRING: Codec('string', _text_encode, _text_decode),
+    Encoding.JSON: JSON_CODECS.get('orjson') or JSON_CODECS.get('ujson')
+    or JSON_CODECS['json'],
+    Encoding.SQL: Codec('sql', _text_encode, _text_decode),
+    Encoding.PROPERTY: Codec('property', _property_encode, _text_decode)
+}
+
+
+def register_codec(encoding, codec):
+    '''
+
+    Registers the :class:`Codec` used by the values of an encoding.
+
+    :param encoding: the :class:`Encoding`.
+    :param codec: the :class:`Codec`, or the name of one of the
+        ``JSON_CODECS`` available for the JSON encoding
+        (``json``, ``ujson`` or ``orjson`` when importable).
+
+    '''
+    if not isinstance(codec, Codec):
+        if codec not in JSON_CODECS:
+            raise ValueError('Codec {} not available'.format(codec))
+        codec = JSON_CODECS[codec]
+    _codecs[encoding] = codec
+
+
+def get_codec(encoding):
+    '''
+
+    Get the :class:`Codec` used by the values of an encoding.
+
+    :param encoding: the :class:`Encoding`.
+    :returns: the :class:`Codec`, or ``None`` if none is registered.
+
+    '''
+    return _codecs.get(encoding)
@@ -16,6 +16,8 @@ import zenoh
 
 
 class Entry(object):
+    __slots__ = ('path', 'value', 'timestamp')
+
     def __init__(self, path, value, timestamp):
         self.path = path
         self.value = value
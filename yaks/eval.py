@@ -0,0 +1,247 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class _Flight(object):
+    # an evaluation in progress, awaited by the identical queries
+    # received meanwhile
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class EvalCache(object):
+    '''
+
+    Memoizes the results of an evaluation function.
+
+    The results are kept ``ttl`` seconds, keyed on the path and the
+    properties of the query as received, so that a hit neither parses the
+    selector nor calls the function. When ``max_entries`` results are kept,
+    the least recently used one is evicted. The identical queries received
+    while a result is being computed wait for it instead of calling the
+    function again.
+
+    '''
+
+    DEFAULT_MAX_ENTRIES = 1024
+
+    def __init__(self, ttl, max_entries=DEFAULT_MAX_ENTRIES,
+                 clock=time.monotonic):
+        if ttl is None or ttl < 0:
+            raise ValueError('ttl must be a positive number')
+        if max_entries is None or max_entries < 1:
+            raise ValueError('max_entries must be a positive integer')
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        # key -> (expiration time, value)
+        self.entries = OrderedDict()
+        # key -> _Flight
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def get(self, key, compute):
+        '''
+
+        Get the result for a key, calling ``compute`` if it is not kept or
+        has expired.
+
+        :param key: a hashable key, e.g. the (path, properties) of a query.
+        :param compute: the function returning the result.
+        :returns: the result.
+
+        '''
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is not None:
+                if cached[0] > self.clock():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return cached[1]
+                del self.entries[key]
+            flight = self.flights.get(key)
+            if flight is None:
+                flight = _Flight()
+                self.flights[key] = flight
+                self.misses += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            with self.lock:
+                self.entries[key] = (self.clock() + self.ttl, flight.value)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.value
+
+    def clear(self):
+        '''
+
+        Drop all the kept results.
+
+        '''
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        '''
+
+        Get the statistics of the cache.
+
+        :returns: a dictionary with the number of ``hits``, ``misses``,
+            ``shared`` (queries that waited for the result of an identical
+            query) and ``evictions``, and the current number of
+            ``entries``.
+
+        '''
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'shared': self.shared,
+                'evictions': self.evictions,
+                'entries': len(self.entries)
+            }
+
+
+class EvalDispatcher(object):
+    '''
+
+    Bounds the number of queries of an evaluation function being evaluated
+    and waiting to be evaluated.
+
+    At most ``max_concurrency`` queries are evaluated at once and at most
+    ``max_pending`` wait for a slot; the queries received beyond are shed
+    at once instead of increasing the latency of all the queries. A
+    ``None`` limit means unbounded. ``max_pending`` requires
+    ``max_concurrency``.
+
+    :param submit: the function running an evaluation, e.g. the ``submit``
+        of an executor. If ``None``, the evaluations run on the calling
+        thread.
+
+    '''
+
+    def __init__(self, submit=None, max_concurrency=None, max_pending=None):
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError('max_concurrency must be a positive integer')
+        if max_pending is not None and max_pending < 0:
+            raise ValueError('max_pending must be a positive integer or 0')
+        if max_pending is not None and max_concurrency is None:
+            raise ValueError('max_pending requires max_concurrency')
+        self.submit = submit
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.running = 0
+        self.shed = 0
+        self.lock = threading.Lock()
+
+    def dispatch(self, task, reject):
+        '''
+
+        Run or queue an evaluation, or reject it if the limits are reached.
+
+        :param task: the function evaluating the query.
+        :param reject: the function called, on the calling thread, when
+            the query is shed.
+        :returns: ``False`` if the query has been shed.
+
+        '''
+        with self.lock:
+            if self.max_concurrency is None \
+                    or self.running < self.max_concurrency:
+                self.running += 1
+            elif self.max_pending is None \
+                    or len(self.pending) < self.max_pending:
+                self.pending.append(task)
+                return True
+            else:
+                self.shed += 1
+                task = None
+        if task is None:
+            reject()
+            return False
+        self.__start(task)
+        return True
+
+    def __start(self, task):
+        if self.submit is None:
+            self.__run(task)
+        else:
+            self.submit(self.__run, task)
+
+    def __run(self, task):
+        # runs the queued evaluations on the same thread as long as there
+        # are some, rather than submitting them again
+        while task is not None:
+            try:
+                task()
+            except BaseException:
+                task = self.__next()
+                if task is not None:
+                    self.__start(task)
+                raise
+            task = self.__next()
+
+    def __next(self):
+        with self.lock:
+            if len(self.pending) > 0:
+                return self.pending.popleft()
+            self.running -= 1
+            return None
+
+    def stats(self):
+        '''
+
+        Get the load of the evaluation function.
+
+        :returns: a dictionary with the current number of ``running`` and
+            ``pending`` queries and the number of ``shed`` queries.
+
+        '''
+        with self.lock:
+            return {
+                'running': self.running,
+                'pending': len(self.pending),
+                'shed': self.shed
+            }
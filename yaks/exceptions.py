@@ -17,3 +17,9 @@ class ValidationError(Exception):
     def __init__(self, message, errors=0):
         super().__init__(message)
         self.errors = errors
+
+
+class QueryTimeoutError(TimeoutError):
+    def __init__(self, message, results=None):
+        super().__init__(message)
+        self.results = results
@@ -12,55 +12,102 @@
 #
 # Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Yaks API
 
+import atexit
 import logging
 import logging.handlers
+import queue
 import sys
-import os
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # enqueues the records as they are: the message is formatted by the
+    # QueueListener thread rather than by the caller, as
+    # QueueHandler.prepare does
+    def prepare(self, record):
+        return record
+
+
+class _FieldsFormatter(logging.Formatter):
+    # appends the structured fields of a record as 'key=value'
+    def format(self, record):
+        message = super(_FieldsFormatter, self).format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            message = '{} {}'.format(message, ' '.join(
+                '{}={}'.format(k, v) for (k, v) in fields.items()))
+        return message
 
 
 class APILogger:
+    '''
+
+    The logger of the Yaks API, a singleton.
+
+    The messages are formatted and written by a background thread: a call
+    whose level is not enabled returns after a level check, and an enabled
+    one only enqueues the record. The message can thus be a format string
+    with its arguments, e.g. ``logger.debug('ws', 'put %s', path)``, which
+    are formatted only if needed (the arguments must not be modified once
+    passed). The keyword arguments are structured fields appended to the
+    message as ``key=value``, e.g. ``logger.debug('ws', 'put', path=path,
+    op='put', latency=0.001)``.
+
+    '''
+
     class __SingletonLogger:
-        def __init__(self, level, debug_flag):
+        def __init__(self, level, debug_flag, handler=None):
 
             log_format = '[%(asctime)s] - [%(levelname)s] > %(message)s'
 
             self.logger = logging.getLogger('is.yaks.python.api')
 
             self.logger.setLevel(level)
-            formatter = logging.Formatter(log_format)
-            if not debug_flag:
+            formatter = _FieldsFormatter(log_format)
+            if handler is not None:
+                pass
+            elif not debug_flag:
                 platform = sys.platform
                 if platform == 'linux':
                     handler = logging.handlers.SysLogHandler('/dev/log')
                 elif platform == 'darwin':
                     handler = logging.handlers.SysLogHandler('/var/run/syslog')
-                elif platform in ['windows', 'Windows', 'win32']:
+                else:
                     handler = logging.handlers.SysLogHandler()
             else:
                 handler = logging.StreamHandler(sys.stdout)
             handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
-
-        def info(self, caller, message):
-            self.logger.info('< {} > {}'.format(caller, message))
-
-        def warning(self, caller, message):
-            self.logger.warning('< {} > {}'.format(caller, message))
-
-        def error(self, caller, message):
-            self.logger.error('< {} > {}'.format(caller, message))
-
-        def debug(self, caller, message):
-            self.logger.debug('< {} > {}'.format(caller, message))
+            # queue.SimpleQueue requires Python 3.7
+            self.queue = queue.Queue()
+            self.queue_handler = _DeferredQueueHandler(self.queue)
+            self.logger.addHandler(self.queue_handler)
+            self.listener = logging.handlers.QueueListener(
+                self.queue, handler, respect_handler_level=True)
+            self.listener.start()
+            atexit.register(self.stop)
+
+        def log(self, level, caller, message, args, fields):
+            if self.logger.isEnabledFor(level):
+                message = str(message)
+                if len(args) == 0:
+                    message = message.replace('%', '%%')
+                self.logger.log(level, '< %s > ' + message, caller, *args,
+                                extra={'fields': fields})
+
+        def stop(self):
+            # writes the pending records and stops the background thread
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+                self.logger.removeHandler(self.queue_handler)
 
     instance = None
     enabled = True
 
-    def __init__(self, level, debug_flag):
+    def __init__(self, level, debug_flag, handler=None):
 
         if not APILogger.instance:
             APILogger.instance = \
-                APILogger.__SingletonLogger(level, debug_flag)
+                APILogger.__SingletonLogger(level, debug_flag, handler)
 
     def enable(self):
         self.enabled = True
@@ -68,18 +115,39 @@ class APILogger:
     def disable(self):
         self.enabled = False
 
-    def info(self, caller, message):
+    def is_enabled_for(self, level):
+        '''
+
+        Tells if the messages of a level are written, to avoid computing
+        their arguments otherwise.
+
+        '''
+        return self.enabled and self.instance.logger.isEnabledFor(level)
+
+    def info(self, caller, message, *args, **fields):
         if self.enabled:
-            self.instance.info(caller, message)
+            self.instance.log(logging.INFO, caller, message, args, fields)
 
-    def warning(self, caller, message):
+    def warning(self, caller, message, *args, **fields):
         if self.enabled:
-            self.instance.warning(caller, message)
+            self.instance.log(logging.WARNING, caller, message, args, fields)
 
-    def error(self, caller, message):
+    def error(self, caller, message, *args, **fields):
         if self.enabled:
-            self.instance.error(caller, message)
+            self.instance.log(logging.ERROR, caller, message, args, fields)
 
-    def debug(self, caller, message):
+    def debug(self, caller, message, *args, **fields):
         if self.enabled:
-            self.instance.debug(caller, message)
+            self.instance.log(logging.DEBUG, caller, message, args, fields)
+
+    @staticmethod
+    def stop():
+        '''
+
+        Writes the pending messages and stops the background thread. A new
+        :class:`APILogger` can be created afterwards.
+
+        '''
+        if APILogger.instance is not None:
+            APILogger.instance.stop()
+            APILogger.instance = None
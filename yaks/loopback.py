@@ -0,0 +1,363 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+'''
+
+An in-process Yaks service, used by :func:`~yaks.yaks.Yaks.login` for the
+``mem://`` locators.
+
+All the sessions opened with the same locator share the same service: the
+path/values are handed over between them without being serialized. As with
+zenoh, the listeners, the query callbacks and the evals of a session are
+called from the I/O thread of this session.
+
+The storages are added and removed with :class:`~yaks.admin.Admin`, whose
+paths are served by the service.
+
+'''
+
+import itertools
+import threading
+import time
+import uuid
+from queue import Queue
+from yaks.selector import Selector, SelectorIndex, compile_matcher
+from yaks.value import Value
+from yaks.delta import apply as apply_delta
+import zenoh
+
+LOCATOR_SCHEME = 'mem://'
+
+
+class _Timestamp(object):
+    __slots__ = ('time', 'clock_id')
+
+    def __init__(self, time, clock_id):
+        self.time = time
+        self.clock_id = clock_id
+
+    def __lt__(self, other):
+        return (self.time, self.clock_id) < (other.time, other.clock_id)
+
+    def __eq__(self, other):
+        return self.time == other.time and self.clock_id == other.clock_id
+
+    def __hash__(self):
+        return hash(self.time)
+
+
+class _DataInfo(object):
+    __slots__ = ('flags', 'encoding', 'kind', 'tstamp')
+
+    def __init__(self, encoding, kind, tstamp):
+        self.flags = 0
+        self.encoding = encoding
+        self.kind = kind
+        self.tstamp = tstamp
+
+
+class _Reply(object):
+    __slots__ = ('kind', 'rname', 'data', 'info')
+
+    def __init__(self, kind, rname=None, data=None, info=None):
+        self.kind = kind
+        self.rname = rname
+        self.data = data
+        self.info = info
+
+
+class _Storage(object):
+    def __init__(self, selector):
+        self.selector = selector
+        # path -> (payload, _DataInfo)
+        self.data = {}
+
+    def write(self, rname, payload, info):
+        current = self.data.get(rname)
+        if current is not None and info.tstamp < current[1].tstamp:
+            return
+        if info.kind == zenoh.Z_PUT:
+            self.data[rname] = (payload, info)
+        elif info.kind == zenoh.Z_REMOVE:
+            self.data.pop(rname, None)
+        elif current is not None:
+            # an update is applied to the stored value, and ignored when
+            # there is no value to apply it to
+            try:
+                value = apply_delta(
+                    Value.from_z_resource(current[0], current[1]),
+                    Value.from_z_resource(payload, info))
+            except ValueError:
+                return
+            self.data[rname] = (bytes(value.as_z_payload()),
+                                _DataInfo(info.encoding, zenoh.Z_PUT,
+                                          info.tstamp))
+
+
+def _properties(text):
+    props = {}
+    for p in text.split(';'):
+        kv = p.split('=', 1)
+        if len(kv) == 2:
+            props[kv[0]] = kv[1]
+    return props
+
+
+class LoopbackService(object):
+    '''
+
+    The state shared by the sessions of a ``mem://`` locator: the
+    storages, the subscriptions and the evals.
+
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.pid = uuid.uuid4().bytes
+        self.prefix = '/@/{}'.format(''.join('{:02x}'.format(x)
+                                             for x in self.pid))
+        self.lock = threading.Lock()
+        self.last_time = 0
+        self.ids = itertools.count(1)
+        # admin path -> (payload, _DataInfo)
+        self.admin = {}
+        # storage admin path -> _Storage
+        self.storages = {}
+        self.storage_index = SelectorIndex()
+        # sid -> (selector, callback, session)
+        self.subscribers = {}
+        self.subscriber_index = SelectorIndex()
+        # eid -> (path, handler, session)
+        self.evals = {}
+
+    def timestamp(self):
+        # a unique and increasing time, close to the wall clock time, as
+        # an NTP64 time like the zenoh timestamps
+        now = int(time.time() * (1 << 32))
+        with self.lock:
+            self.last_time = max(self.last_time + 1, now)
+            return _Timestamp(self.last_time, self.pid)
+
+    def write(self, rname, payload, encoding, kind):
+        payload = bytes(payload)
+        info = _DataInfo(encoding, kind, self.timestamp())
+        with self.lock:
+            if rname.startswith(self.prefix + '/'):
+                self.__write_admin(rname, payload, info)
+            for storage in self.storage_index.match(rname):
+                storage.write(rname, payload, info)
+            sids = self.subscriber_index.match(rname)
+            subscribers = [self.subscribers[sid] for sid in sids]
+        for (_, callback, session) in subscribers:
+            session.submit(callback, rname, payload, info)
+
+    def __write_admin(self, rname, payload, info):
+        if info.kind == zenoh.Z_REMOVE:
+            self.admin.pop(rname, None)
+        else:
+            self.admin[rname] = (payload, info)
+        segments = rname[len(self.prefix):].split('/')
+        # /plugins/yaks/backend/<beid>/storage/<stid>
+        if len(segments) != 7 or segments[1:4] != \
+                ['plugins', 'yaks', 'backend'] or segments[5] != 'storage':
+            return
+        previous = self.storages.pop(rname, None)
+        if previous is not None:
+            self.storage_index.remove(previous.selector, previous)
+        if info.kind == zenoh.Z_REMOVE:
+            return
+        selector = _properties(str(payload, 'utf-8')).get('selector')
+        if selector is not None:
+            storage = _Storage(Selector.to_selector(selector))
+            self.storages[rname] = storage
+            self.storage_index.add(storage.selector, storage)
+
+    def query(self, session, path, optional_part, callback):
+        match = compile_matcher(path)
+        with self.lock:
+            stored = {}
+            for (rname, (payload, info)) in self.admin.items():
+                if match(rname):
+                    stored[rname] = (payload, info)
+            for storage in self.storages.values():
+                if '*' in path:
+                    candidates = storage.data.items()
+                elif path in storage.data:
+                    candidates = [(path, storage.data[path])]
+                else:
+                    continue
+                for (rname, (payload, info)) in candidates:
+                    if match(rname):
+                        current = stored.get(rname)
+                        if current is None \
+                                or current[1].tstamp < info.tstamp:
+                            stored[rname] = (payload, info)
+            evals = [(epath, handler, esession)
+                     for (epath, handler, esession) in self.evals.values()
+                     if match(epath)]
+
+        pending = [len(evals)]
+        lock = threading.Lock()
+
+        def reply_final():
+            with lock:
+                pending[0] -= 1
+                final = pending[0] == 0
+            if final:
+                callback(_Reply(zenoh.Z_REPLY_FINAL))
+
+        def make_send_replies():
+            sent = [False]
+
+            def send_replies(replies):
+                if sent[0]:
+                    return
+                sent[0] = True
+                tstamp = self.timestamp()
+                replies = [_Reply(zenoh.Z_EVAL_DATA, rname, bytes(payload),
+                                  _DataInfo(info.encoding, info.kind, tstamp))
+                           for (rname, (payload, info)) in replies]
+
+                def deliver():
+                    for reply in replies:
+                        callback(reply)
+                    reply_final()
+                session.submit(deliver)
+            return send_replies
+
+        def storage_replies():
+            for (rname, (payload, info)) in stored.items():
+                callback(_Reply(zenoh.Z_STORAGE_DATA, rname, payload, info))
+            if len(evals) == 0:
+                callback(_Reply(zenoh.Z_REPLY_FINAL))
+        session.submit(storage_replies)
+        for (epath, handler, esession) in evals:
+            esession.submit(handler, epath, optional_part,
+                            make_send_replies())
+
+    def declare_subscriber(self, session, selector, callback):
+        sid = next(self.ids)
+        with self.lock:
+            self.subscribers[sid] = (selector, callback, session)
+            self.subscriber_index.add(selector, sid)
+        return sid
+
+    def undeclare_subscriber(self, sid):
+        with self.lock:
+            subscriber = self.subscribers.pop(sid, None)
+            if subscriber is not None:
+                self.subscriber_index.remove(subscriber[0], sid)
+
+    def declare_eval(self, session, path, handler):
+        eid = next(self.ids)
+        with self.lock:
+            self.evals[eid] = (path, handler, session)
+        return eid
+
+    def undeclare_eval(self, eid):
+        with self.lock:
+            self.evals.pop(eid, None)
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_service(locator):
+    '''
+
+    Get the service of a ``mem://`` locator, creating it if needed. The
+    name following ``mem://`` identifies the service, several independent
+    services can thus run in the same process.
+
+    '''
+    if not locator.startswith(LOCATOR_SCHEME):
+        raise ValueError('Not a loopback locator: {}'.format(locator))
+    name = locator[len(LOCATOR_SCHEME):]
+    with _services_lock:
+        service = _services.get(name)
+        if service is None:
+            service = LoopbackService(name)
+            _services[name] = service
+        return service
+
+
+class LoopbackRuntime(object):
+    '''
+
+    A session with a :class:`LoopbackService`, offering the operations of
+    the zenoh runtime used by the Yaks API.
+
+    '''
+
+    def __init__(self, service):
+        self.service = service
+        self.sids = set()
+        self.eids = set()
+        self.io = Queue()
+        self.running = True
+        self.thread = threading.Thread(target=self.__io_loop, daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def open(locator):
+        return LoopbackRuntime(get_service(locator))
+
+    def __io_loop(self):
+        while True:
+            task = self.io.get()
+            if task is None:
+                return
+            (fn, args) = task
+            fn(*args)
+
+    def submit(self, fn, *args):
+        # runs a callback on the I/O thread of the session
+        if self.running:
+            self.io.put((fn, args))
+
+    def write_data(self, rname, payload, encoding=0, kind=zenoh.Z_PUT):
+        self.service.write(rname, payload, encoding, kind)
+
+    def query(self, path, optional_part, callback):
+        self.service.query(self, path, optional_part, callback)
+
+    def declare_subscriber(self, selector, mode, callback):
+        sid = self.service.declare_subscriber(self, selector, callback)
+        self.sids.add(sid)
+        return sid
+
+    def undeclare_subscriber(self, sid):
+        self.sids.discard(sid)
+        self.service.undeclare_subscriber(sid)
+
+    def declare_eval(self, path, handler):
+        eid = self.service.declare_eval(self, path, handler)
+        self.eids.add(eid)
+        return eid
+
+    def undeclare_eval(self, eid):
+        self.eids.discard(eid)
+        self.service.undeclare_eval(eid)
+
+    def info(self):
+        return {zenoh.Z_INFO_PEER_PID_KEY: self.service.pid}
+
+    def close(self):
+        for sid in list(self.sids):
+            self.undeclare_subscriber(sid)
+        for eid in list(self.eids):
+            self.undeclare_eval(eid)
+        self.running = False
+        self.io.put(None)
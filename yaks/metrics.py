@@ -0,0 +1,357 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+'''
+
+Counters and histograms of the operations of the workspaces, enabled with
+:func:`~yaks.yaks.Yaks.enable_metrics` and read with
+:func:`~yaks.yaks.Yaks.metrics` or an :class:`Exporter`.
+
+When disabled, an operation only tests the ``enabled`` flag of the
+:class:`Metrics`.
+
+'''
+
+import bisect
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+# 10us to ~10s, doubling
+LATENCY_BUCKETS = tuple(1e-5 * 2 ** i for i in range(21))
+# 16 bytes to 16MB, by factors of 4
+SIZE_BUCKETS = tuple(16 * 4 ** i for i in range(11))
+
+OPERATIONS = ('put', 'put_many', 'update', 'remove', 'get', 'get_many')
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    # http.server.ThreadingHTTPServer, which requires Python 3.7
+    daemon_threads = True
+
+
+class Counter(object):
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self.lock:
+            self.value += n
+
+    def sample(self):
+        return {'value': self.value}
+
+
+class Histogram(object):
+    __slots__ = ('bounds', 'counts', 'sum', 'lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # the last count is the one of the values above the last bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0
+        self.lock = threading.Lock()
+
+    def observe(self, v):
+        i = bisect.bisect_left(self.bounds, v)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += v
+
+    def sample(self):
+        with self.lock:
+            counts = list(self.counts)
+            total = self.sum
+        buckets = []
+        cumulated = 0
+        for (bound, count) in zip(self.bounds, counts):
+            cumulated += count
+            buckets.append([bound, cumulated])
+        return {
+            'count': cumulated + counts[-1],
+            'sum': total,
+            'buckets': buckets
+        }
+
+
+class _Family(object):
+    def __init__(self, name, kind, help):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        # labels, as a tuple of (name, value) -> Counter or Histogram
+        self.children = {}
+
+
+class Metrics(object):
+    '''
+
+    A registry of counters and histograms, identified by a name and
+    labels, holding the metrics of the Yaks API as attributes.
+
+    '''
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.families = {}
+        self.lock = threading.Lock()
+
+        self.operations = {op: self.counter(
+            'yaks_operations_total', 'Number of operations', op=op)
+            for op in OPERATIONS}
+        self.operation_seconds = {op: self.histogram(
+            'yaks_operation_seconds',
+            'Duration of the operations, until all the replies for a get',
+            op=op) for op in OPERATIONS}
+        self.put_bytes = self.counter(
+            'yaks_put_bytes_total', 'Size of the payloads put')
+        self.put_sizes = self.histogram(
+            'yaks_put_size_bytes', 'Size of the payloads put',
+            buckets=SIZE_BUCKETS)
+        self.encode_seconds = self.histogram(
+            'yaks_encode_seconds', 'Duration of the encoding of the values')
+        self.received = {kind: self.counter(
+            'yaks_received_total', 'Number of values received', kind=kind)
+            for kind in ('reply', 'change')}
+        self.received_bytes = {kind: self.counter(
+            'yaks_received_bytes_total', 'Size of the payloads received',
+            kind=kind) for kind in ('reply', 'change')}
+        self.listener_seconds = self.histogram(
+            'yaks_listener_seconds',
+            'Duration from the delivery of changes, at their reception or at '
+            'the flush of their batch, to the return of their listener')
+        self.evals = self.counter(
+            'yaks_evals_total', 'Number of queries received by the evals')
+        self.eval_seconds = self.histogram(
+            'yaks_eval_seconds',
+            'Duration from the reception of a query to the replies of the '
+            'eval')
+
+    def record(self, op, seconds):
+        self.operations[op].inc()
+        self.operation_seconds[op].observe(seconds)
+
+    def record_put(self, size, encode_seconds=None):
+        self.put_bytes.inc(size)
+        self.put_sizes.observe(size)
+        if encode_seconds is not None:
+            self.encode_seconds.observe(encode_seconds)
+
+    def record_received(self, kind, size):
+        self.received[kind].inc()
+        self.received_bytes[kind].inc(size)
+
+    def __family(self, name, kind, help):
+        family = self.families.get(name)
+        if family is None:
+            family = _Family(name, kind, help)
+            self.families[name] = family
+        elif family.kind != kind:
+            raise ValueError('{} is a {}'.format(name, family.kind))
+        return family
+
+    def counter(self, name, help='', **labels):
+        '''
+
+        Get a counter, creating it if needed.
+
+        :param name: the name of the counter.
+        :param help: its description.
+        :param labels: its labels.
+        :returns: a :class:`Counter`, whose ``inc`` method increments it.
+
+        '''
+        with self.lock:
+            family = self.__family(name, 'counter', help)
+            key = tuple(sorted(labels.items()))
+            metric = family.children.get(key)
+            if metric is None:
+                metric = Counter()
+                family.children[key] = metric
+            return metric
+
+    def histogram(self, name, help='', buckets=LATENCY_BUCKETS, **labels):
+        '''
+
+        Get a histogram, creating it if needed.
+
+        :param name: the name of the histogram.
+        :param help: its description.
+        :param buckets: the upper bounds of its buckets.
+        :param labels: its labels.
+        :returns: a :class:`Histogram`, whose ``observe`` method records a
+            value.
+
+        '''
+        with self.lock:
+            family = self.__family(name, 'histogram', help)
+            key = tuple(sorted(labels.items()))
+            metric = family.children.get(key)
+            if metric is None:
+                metric = Histogram(tuple(buckets))
+                family.children[key] = metric
+            return metric
+
+    def snapshot(self):
+        '''
+
+        Get the current values of the metrics.
+
+        :returns: a JSON-serializable dictionary, associating to each metric
+            name its ``type``, ``help`` and ``samples``. Each sample holds
+            its ``labels`` and the ``value`` of a counter, or the ``count``,
+            ``sum`` and cumulated ``buckets`` of a histogram.
+
+        '''
+        with self.lock:
+            families = [(f, list(f.children.items()))
+                        for f in self.families.values()]
+        snapshot = {}
+        for (family, children) in families:
+            samples = []
+            for (labels, metric) in children:
+                sample = metric.sample()
+                sample['labels'] = dict(labels)
+                samples.append(sample)
+            snapshot[family.name] = {
+                'type': family.kind,
+                'help': family.help,
+                'samples': samples
+            }
+        return snapshot
+
+
+# the Metrics of the workspaces created without metrics
+DISABLED = Metrics(enabled=False)
+
+
+class Exporter(object):
+    '''
+
+    Renders the metrics in a text format, to be written to a file or served
+    over HTTP. Subclasses implement :func:`render`.
+
+    '''
+
+    content_type = 'text/plain; charset=utf-8'
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def render(self):
+        raise NotImplementedError
+
+    def write(self, path):
+        '''
+
+        Writes the metrics to a file, replaced atomically.
+
+        '''
+        tmp = '{}.tmp'.format(path)
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        '''
+
+        Serves the metrics over HTTP from a background thread.
+
+        :param port: the port to listen on, ``0`` for any free port.
+        :param host: the address to listen on.
+        :returns: the :py:class:`http.server.HTTPServer`, whose
+            ``server_address`` holds the port and whose ``shutdown`` method
+            stops it.
+
+        '''
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', exporter.content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = _ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+
+def _labels(labels, extra=None):
+    items = list(labels.items())
+    if extra is not None:
+        items.append(extra)
+    if len(items) == 0:
+        return ''
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+        for (k, v) in items))
+
+
+class PrometheusExporter(Exporter):
+    '''
+
+    Renders the metrics in the Prometheus text exposition format.
+
+    '''
+
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def render(self):
+        lines = []
+        for (name, family) in sorted(self.metrics.snapshot().items()):
+            lines.append('# HELP {} {}'.format(name, family['help']))
+            lines.append('# TYPE {} {}'.format(name, family['type']))
+            for sample in family['samples']:
+                labels = sample['labels']
+                if family['type'] == 'counter':
+                    lines.append('{}{} {}'.format(
+                        name, _labels(labels), sample['value']))
+                    continue
+                for (bound, count) in sample['buckets']:
+                    lines.append('{}_bucket{} {}'.format(
+                        name, _labels(labels, ('le', repr(float(bound)))),
+                        count))
+                lines.append('{}_bucket{} {}'.format(
+                    name, _labels(labels, ('le', '+Inf')), sample['count']))
+                lines.append('{}_sum{} {}'.format(
+                    name, _labels(labels), sample['sum']))
+                lines.append('{}_count{} {}'.format(
+                    name, _labels(labels), sample['count']))
+        return '\n'.join(lines) + '\n'
+
+
+class JSONExporter(Exporter):
+    '''
+
+    Renders the metrics as the JSON of :func:`Metrics.snapshot`.
+
+    '''
+
+    content_type = 'application/json'
+
+    def render(self):
+        return json.dumps(self.metrics.snapshot())
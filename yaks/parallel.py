@@ -0,0 +1,543 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+'''
+
+Publishers and subscribers sharded over worker processes, each holding its
+own Yaks session, so that the decoding of the values and the listeners run
+in parallel instead of under the GIL of a single process.
+
+A :class:`ShardedSubscriber` assigns the selectors to the workers and
+receives the results of a handler called by the workers for each change.
+A :class:`ShardedPublisher` assigns the paths to the workers, which put the
+path/values. The data is exchanged with the workers through shared-memory
+:class:`RingBuffer` objects, one per worker.
+
+The workers are started with the ``spawn`` method: the handlers and
+initializers must be picklable, e.g. module-level functions. The
+``mem://`` services being in-process, each worker has its own one.
+
+The ring buffers use :py:mod:`multiprocessing.shared_memory`, which
+requires Python 3.8 or later.
+
+'''
+
+import multiprocessing
+import os
+import platform
+import struct
+import sys
+import threading
+import time
+import zlib
+from yaks.encoding import Encoding
+from yaks.value import Value
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8
+    shared_memory = None
+
+DEFAULT_CAPACITY = 1 << 22
+
+# the producer and consumer positions, as indexes of 64 bits words in
+# distinct cache lines, and the offset of the first record
+_HEAD = 0
+_TAIL = 8
+_DATA = 128
+_LENGTH = struct.Struct('<I')
+# the record length marking the end of the data before wrapping around
+_WRAP = 0xffffffff
+# the CPUs whose stores are seen by the other CPUs in program order (TSO),
+# on which the positions need no memory barrier
+_ORDERED = platform.machine().lower() in ('x86_64', 'amd64', 'x86', 'i386',
+                                          'i686')
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _attach(name):
+    if sys.version_info >= (3, 13):
+        # the segment is owned, and unlinked, by the process that created it
+        return shared_memory.SharedMemory(name, track=False)
+    # the workers share the resource tracker of the process that created
+    # the segment, which keeps it until it is unlinked
+    return shared_memory.SharedMemory(name)
+
+
+class RingBuffer(object):
+    '''
+
+    A single-producer single-consumer queue of byte strings in a shared
+    memory segment.
+
+    The records are written contiguously, prefixed by their length, and the
+    producer and consumer positions are counters that only increase. On x86
+    CPUs, whose stores are seen in program order by the other CPUs, a put
+    or a get does not take any lock: a record is written before the
+    position publishing it. Python having no memory barrier, on the other
+    CPUs (e.g. aarch64) the positions are read and written under a lock
+    shared by the producer and the consumer, whose acquire and release are
+    the barriers ordering the records and the positions.
+
+    :param capacity: the size of the data area, in bytes.
+    :param name: the name of an existing segment to attach to, e.g. the
+        :attr:`name` of a ring buffer created by another process. If
+        ``None``, a new segment is created.
+    :param lock: the :py:class:`multiprocessing.Lock` of the positions,
+        required on the CPUs other than x86 (see :func:`new_lock`), given to
+        both ends. Unused if ``None``.
+
+    '''
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, name=None, lock=None):
+        if shared_memory is None:
+            raise ImportError('The ring buffers require Python 3.8 or later')
+        if name is None:
+            capacity = _align(capacity)
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=_DATA + capacity)
+            self.owner = True
+            self.shm.buf[:_DATA] = bytes(_DATA)
+        else:
+            self.shm = _attach(name)
+            self.owner = False
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        # the positions are read and written as native words, with a
+        # single load or store, so that they are never seen half written
+        self.positions = self.buf[:_DATA].cast('Q')
+        self.capacity = capacity
+        self.lock = lock
+
+    @staticmethod
+    def new_lock(context=multiprocessing):
+        '''
+
+        :returns: a lock of the positions for the ring buffers shared with
+            the processes of ``context``, or ``None`` on x86 CPUs.
+
+        '''
+        return None if _ORDERED else context.Lock()
+
+    @staticmethod
+    def attach(name, capacity, lock=None):
+        return RingBuffer(capacity, name, lock)
+
+    def __load(self):
+        # the (head, tail) positions
+        if self.lock is None:
+            return (self.positions[_HEAD], self.positions[_TAIL])
+        with self.lock:
+            return (self.positions[_HEAD], self.positions[_TAIL])
+
+    def __store(self, index, position):
+        if self.lock is None:
+            self.positions[index] = position
+        else:
+            with self.lock:
+                self.positions[index] = position
+
+    def __len__(self):
+        # the number of bytes used
+        (head, tail) = self.__load()
+        return head - tail
+
+    def try_put(self, data):
+        '''
+
+        Adds a record if there is room for it.
+
+        :returns: ``False`` if the buffer is full.
+
+        '''
+        size = len(data)
+        needed = _align(_LENGTH.size + size)
+        if needed > self.capacity:
+            raise ValueError('Record of {} bytes larger than the buffer'
+                             .format(size))
+        (head, tail) = self.__load()
+        free = self.capacity - (head - tail)
+        offset = head % self.capacity
+        end = self.capacity - offset
+        if end < needed:
+            if free < end + needed:
+                return False
+            _LENGTH.pack_into(self.buf, _DATA + offset, _WRAP)
+            head += end
+            offset = 0
+        elif free < needed:
+            return False
+        _LENGTH.pack_into(self.buf, _DATA + offset, size)
+        start = _DATA + offset + _LENGTH.size
+        self.buf[start:start + size] = data
+        # the record is written before being published
+        self.__store(_HEAD, head + needed)
+        return True
+
+    def put(self, data, timeout=None, cancelled=None):
+        '''
+
+        Adds a record, waiting for room if the buffer is full.
+
+        :param timeout: the maximum time to wait, in seconds. If ``None``,
+            wait until there is room.
+        :param cancelled: a :py:class:`threading.Event` or
+            :py:class:`multiprocessing.Event` stopping the wait when set.
+        :returns: ``False`` if the record could not be added.
+
+        '''
+        delay = 0.00005
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_put(data):
+            if (cancelled is not None and cancelled.is_set()) or \
+                    (deadline is not None and time.monotonic() >= deadline):
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 0.005)
+        return True
+
+    def get(self):
+        '''
+
+        Removes the oldest record.
+
+        :returns: the record as bytes, or ``None`` if the buffer is empty.
+
+        '''
+        (head, tail) = self.__load()
+        if tail == head:
+            return None
+        offset = tail % self.capacity
+        size = _LENGTH.unpack_from(self.buf, _DATA + offset)[0]
+        if size == _WRAP:
+            tail += self.capacity - offset
+            offset = 0
+            size = _LENGTH.unpack_from(self.buf, _DATA)[0]
+        start = _DATA + offset + _LENGTH.size
+        data = bytes(self.buf[start:start + size])
+        self.__store(_TAIL, tail + _align(_LENGTH.size + size))
+        return data
+
+    def close(self):
+        '''
+
+        Detaches from the segment, and destroys it if it was created by
+        this ring buffer.
+
+        '''
+        self.positions.release()
+        self.positions = None
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class _Info(object):
+    # the data info from which a Value is rebuilt
+    __slots__ = ('encoding',)
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+
+
+_PUT_HEADER = struct.Struct('<HB')
+
+
+def _subscriber(locator, properties, selectors, handler, initializer,
+                ring, capacity, lock, ready, stop):
+    from yaks.yaks import Yaks
+    ring = RingBuffer.attach(ring, capacity, lock)
+    y = Yaks.login(locator, properties)
+    try:
+        ws = y.workspace('/')
+
+        def listener(changes):
+            for change in changes:
+                result = handler(change)
+                if result is not None:
+                    ring.put(result, cancelled=stop)
+        for selector in selectors:
+            ws.subscribe(selector, listener)
+        if initializer is not None:
+            initializer(y)
+        ready.release()
+        stop.wait()
+    finally:
+        y.logout()
+        ring.close()
+
+
+def _publisher(locator, properties, initializer, ring, capacity, lock,
+               ready, stop):
+    from yaks.yaks import Yaks
+    ring = RingBuffer.attach(ring, capacity, lock)
+    y = Yaks.login(locator, properties)
+    try:
+        ws = y.workspace('/')
+        if initializer is not None:
+            initializer(y)
+        ready.release()
+        delay = 0.00005
+        while True:
+            record = ring.get()
+            if record is None:
+                if stop.is_set() and len(ring) == 0:
+                    return
+                time.sleep(delay)
+                delay = min(delay * 2, 0.005)
+                continue
+            delay = 0.00005
+            (size, encoding) = _PUT_HEADER.unpack_from(record)
+            start = _PUT_HEADER.size + size
+            ws.put(str(record[_PUT_HEADER.size:start], 'utf-8'),
+                   Value.from_z_resource(record[start:], _Info(encoding)))
+    finally:
+        y.logout()
+        ring.close()
+
+
+class _Workers(object):
+    # the worker processes, each with its ring buffer
+
+    def __init__(self, workers, capacity):
+        if workers < 1:
+            raise ValueError('workers must be a positive integer')
+        self.count = workers
+        self.capacity = capacity
+        self.context = multiprocessing.get_context('spawn')
+        self.ready = self.context.Semaphore(0)
+        self.stop_event = self.context.Event()
+        self.rings = []
+        self.processes = []
+
+    def start(self, target, args, timeout):
+        try:
+            for i in range(self.count):
+                ring = RingBuffer(self.capacity,
+                                  lock=RingBuffer.new_lock(self.context))
+                self.rings.append(ring)
+                process = self.context.Process(
+                    target=target,
+                    args=args(i) + (ring.name, ring.capacity, ring.lock,
+                                    self.ready, self.stop_event),
+                    daemon=True)
+                process.start()
+                self.processes.append(process)
+            deadline = None if timeout is None \
+                else time.monotonic() + timeout
+            started = 0
+            while started < self.count:
+                if self.ready.acquire(timeout=0.05):
+                    started += 1
+                elif any(p.exitcode is not None for p in self.processes):
+                    raise RuntimeError('A worker failed to start')
+                elif deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError('The workers did not start in time')
+        except BaseException:
+            self.stop()
+            self.close()
+            raise
+
+    def stop(self):
+        self.stop_event.set()
+        for process in self.processes:
+            process.join()
+
+    def close(self):
+        for ring in self.rings:
+            ring.close()
+        self.rings = []
+
+
+class ShardedSubscriber(object):
+    '''
+
+    Subscribes to selectors from worker processes.
+
+    Each worker opens a session with ``locator``, subscribes to its share
+    of the ``selectors`` (assigned in turn) and calls ``handler`` with each
+    received :class:`~yaks.value.Change`. The results of the handler, as
+    bytes, are passed back through a ring buffer per worker and delivered
+    by lists to ``listener``, called from a thread of this process.
+
+    :param locator: the locator of the Yaks service.
+    :param selectors: the absolute selectors to subscribe to.
+    :param handler: a picklable function called by the workers with each
+        change, returning bytes or ``None`` for no result.
+    :param listener: the function called with lists of results. If
+        ``None``, the results are counted and dropped.
+    :param workers: the number of worker processes, by default the number
+        of CPUs.
+    :param properties: the properties of the sessions, see
+        :func:`~yaks.yaks.Yaks.login`.
+    :param initializer: a picklable function called by each worker with its
+        :class:`~yaks.yaks.Yaks` once subscribed.
+    :param capacity: the size of the ring buffer of each worker, in bytes.
+        A worker waits while its ring buffer is full.
+
+    '''
+
+    def __init__(self, locator, selectors, handler, listener=None,
+                 workers=None, properties=None, initializer=None,
+                 capacity=DEFAULT_CAPACITY):
+        self.locator = locator
+        self.properties = properties
+        self.handler = handler
+        self.listener = listener
+        self.initializer = initializer
+        self.workers = _Workers(workers or os.cpu_count() or 1, capacity)
+        count = self.workers.count
+        self.shards = [list(selectors[i::count]) for i in range(count)]
+        self.received = 0
+        self.running = False
+        self.thread = None
+
+    def start(self, timeout=None):
+        '''
+
+        Starts the workers and waits for them to be subscribed.
+
+        :param timeout: the maximum time to wait, in seconds.
+
+        '''
+        self.workers.start(
+            _subscriber,
+            lambda i: (self.locator, self.properties, self.shards[i],
+                       self.handler, self.initializer),
+            timeout)
+        self.running = True
+        self.thread = threading.Thread(target=self.__collect, daemon=True)
+        self.thread.start()
+        return self
+
+    def __collect(self):
+        delay = 0.00005
+        while True:
+            stopping = not self.running
+            results = []
+            for ring in self.workers.rings:
+                record = ring.get()
+                while record is not None:
+                    results.append(record)
+                    record = ring.get()
+            if len(results) > 0:
+                delay = 0.00005
+                self.received += len(results)
+                if self.listener is not None:
+                    self.listener(results)
+            elif stopping:
+                return
+            else:
+                time.sleep(delay)
+                delay = min(delay * 2, 0.005)
+
+    def stop(self):
+        '''
+
+        Stops the workers, once the results they produced are delivered.
+
+        '''
+        self.workers.stop()
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        self.workers.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class ShardedPublisher(object):
+    '''
+
+    Puts path/values from worker processes.
+
+    Each path is assigned to a worker by a hash, so that the values of a
+    path are put in order. The payloads are encoded in this process and
+    passed to the workers through a ring buffer per worker.
+
+    :param locator: the locator of the Yaks service.
+    :param workers: the number of worker processes, by default the number
+        of CPUs.
+    :param properties: see :class:`ShardedSubscriber`.
+    :param initializer: a picklable function called by each worker with its
+        :class:`~yaks.yaks.Yaks` once logged in.
+    :param capacity: the size of the ring buffer of each worker, in bytes.
+        :func:`put` waits while the ring buffer of the worker is full.
+
+    '''
+
+    def __init__(self, locator, workers=None, properties=None,
+                 initializer=None, capacity=DEFAULT_CAPACITY):
+        self.locator = locator
+        self.properties = properties
+        self.initializer = initializer
+        self.workers = _Workers(workers or os.cpu_count() or 1, capacity)
+
+    def start(self, timeout=None):
+        '''
+
+        Starts the workers and waits for them to be logged in.
+
+        :param timeout: the maximum time to wait, in seconds.
+
+        '''
+        self.workers.start(
+            _publisher,
+            lambda i: (self.locator, self.properties, self.initializer),
+            timeout)
+        return self
+
+    def put(self, path, value):
+        '''
+
+        Puts a path/value from the worker of the path. The ring buffers
+        having a single producer, :func:`put` must be called from a single
+        thread at a time.
+
+        :param path: an absolute path.
+        :param value: the :class:`~yaks.value.Value`.
+
+        '''
+        rpath = path.encode()
+        rings = self.workers.rings
+        ring = rings[zlib.crc32(rpath) % len(rings)]
+        record = b''.join((
+            _PUT_HEADER.pack(len(rpath),
+                             Encoding.to_z_encoding(value.get_encoding())),
+            rpath, value.as_z_payload()))
+        ring.put(record)
+
+    def stop(self):
+        '''
+
+        Stops the workers, once they have put the queued path/values.
+
+        '''
+        self.workers.stop()
+        self.workers.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
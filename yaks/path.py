@@ -16,9 +16,13 @@ import re
 from yaks.exceptions import ValidationError
 
 
+_PATH_REGEX = re.compile('^[^?#*]+$')
+
+
 class Path(object):
+    __slots__ = ('path',)
+
     def __init__(self, path):
-        self.__path_regex = re.compile('^[^?#*]+$')
         if not self.is_valid(path):
             raise ValidationError("{} is not a valid Path".format(path))
         self.path = path
@@ -31,7 +35,7 @@ class Path(object):
             return Path(p)
 
     def is_valid(self, path):
-        return self.__path_regex.match(path) is not None \
+        return _PATH_REGEX.match(path) is not None \
             and not path.startswith('//')
 
     def is_absolute(self):
@@ -0,0 +1,122 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+'''
+
+A pool of zenoh sessions, opened by :func:`~yaks.yaks.Yaks.login` with
+``sessions=n``, spreading the load over the I/O threads of the sessions.
+
+'''
+
+import itertools
+import threading
+
+# the sessions are selected per path of the operations
+BALANCE_PATH = 'path'
+# each workspace uses a single session
+BALANCE_WORKSPACE = 'workspace'
+
+
+class RuntimePool(object):
+    '''
+
+    Offers the operations of a zenoh runtime over several runtimes.
+
+    The writes on a path always go through the same runtime, chosen by a
+    hash of the path, so that the changes of a path keep their order. The
+    queries on a single path go through the runtime of its writes, so that
+    a get follows the puts of the path. The other queries, the
+    subscriptions and the evals are assigned to the runtimes in turn.
+
+    :param runtimes: the runtimes, e.g. zenoh sessions.
+    :param balance: with :data:`BALANCE_PATH`, the workspaces use the pool
+        and their operations are spread as described above. With
+        :data:`BALANCE_WORKSPACE`, each workspace is assigned a single
+        runtime, in turn, keeping the order of all its operations.
+
+    '''
+
+    def __init__(self, runtimes, balance=BALANCE_PATH):
+        if len(runtimes) == 0:
+            raise ValueError('A pool needs at least one runtime')
+        if balance not in (BALANCE_PATH, BALANCE_WORKSPACE):
+            raise ValueError('Unknown balance: {}'.format(balance))
+        self.runtimes = list(runtimes)
+        self.balance = balance
+        self.turns = itertools.count()
+        self.ids = itertools.count(1)
+        # id -> (runtime, id in this runtime)
+        self.subscribers = {}
+        self.evals = {}
+        self.lock = threading.Lock()
+
+    def __next(self):
+        return self.runtimes[next(self.turns) % len(self.runtimes)]
+
+    @property
+    def running(self):
+        return any(getattr(rt, 'running', True) for rt in self.runtimes)
+
+    def workspace_runtime(self):
+        '''
+
+        Get the runtime of a new workspace: the pool, or one of its
+        runtimes depending on ``balance``.
+
+        '''
+        if self.balance == BALANCE_WORKSPACE:
+            return self.__next()
+        return self
+
+    def __of_path(self, path):
+        return self.runtimes[hash(path) % len(self.runtimes)]
+
+    def write_data(self, rname, *args):
+        self.__of_path(rname).write_data(rname, *args)
+
+    def query(self, path, optional_part, callback):
+        rt = self.__next() if '*' in path else self.__of_path(path)
+        rt.query(path, optional_part, callback)
+
+    def __declare(self, declared, rt, did):
+        pid = next(self.ids)
+        with self.lock:
+            declared[pid] = (rt, did)
+        return pid
+
+    def declare_subscriber(self, selector, mode, callback):
+        rt = self.__next()
+        return self.__declare(self.subscribers, rt,
+                              rt.declare_subscriber(selector, mode, callback))
+
+    def undeclare_subscriber(self, sid):
+        with self.lock:
+            (rt, did) = self.subscribers.pop(sid)
+        rt.undeclare_subscriber(did)
+
+    def declare_eval(self, path, handler):
+        rt = self.__next()
+        return self.__declare(self.evals, rt, rt.declare_eval(path, handler))
+
+    def undeclare_eval(self, eid):
+        with self.lock:
+            (rt, did) = self.evals.pop(eid)
+        rt.undeclare_eval(did)
+
+    def info(self):
+        return self.runtimes[0].info()
+
+    def close(self):
+        for rt in self.runtimes:
+            rt.close()
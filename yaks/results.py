@@ -0,0 +1,44 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Yaks API
+
+import yaks.columns
+
+
+class ResultSet(list):
+    '''
+
+    The list of entries returned by a get.
+
+    ``partial`` is ``True`` when the get timed out before all the replies
+    were received.
+
+    '''
+
+    def __init__(self, entries=(), partial=False):
+        super(ResultSet, self).__init__(entries)
+        self.partial = partial
+
+    def to_numpy(self, dtype=None):
+        '''
+
+        Get the entries as NumPy columns.
+
+        :param dtype: the NumPy dtype of the values, see
+            :func:`~yaks.columns.to_columns`.
+        :returns: the :class:`~yaks.columns.Columns`.
+
+        '''
+        return yaks.columns.to_columns(
+            [(e.path, e.timestamp, e.value.encoding, e.value.as_z_payload())
+             for e in self], dtype, self.partial)
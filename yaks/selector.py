@@ -13,35 +13,76 @@
 # Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Yaks API
 
 import re
+from functools import lru_cache
 from yaks.exceptions import ValidationError
 from yaks.path import Path
 
 
+def _segment_regex(segment):
+    return '[^/]*'.join(re.escape(s) for s in segment.split('*'))
+
+
+def compile_matcher(path_expr):
+    '''
+
+    Compiles a path expression, i.e. the path part of a selector, into a
+    function matching a path string. The function returns a match object
+    if the path matches, ``None`` otherwise.
+
+    '''
+    regex = ''
+    for i, segment in enumerate(path_expr.split('/')):
+        if segment == '**':
+            regex += '(?:/.*)?' if i > 0 else '.*'
+        else:
+            regex += ('/' if i > 0 else '') + _segment_regex(segment)
+    return re.compile('^{}$'.format(regex), re.DOTALL).match
+
+
+_SELECTOR_REGEX = re.compile(
+    '^([^?#]+)(\?([^\[()\]#]*)(\((.*)\))?)?(\#(.*))?$')
+
+
+@lru_cache(maxsize=1024)
+def _parse(selector):
+    # returns (path, predicate, properties, fragment, optional_part), or
+    # None if the selector is not valid
+    if selector.startswith('//'):
+        return None
+    res = _SELECTOR_REGEX.match(selector)
+    if res is None:
+        return None
+    return (res.group(1) or None,
+            res.group(3) or None,
+            res.group(5) or None,
+            res.group(7) or None,
+            (res.group(2) or "?")[1:] + (res.group(6) or ""))
+
+
 class Selector(object):
+    # Selectors returned by to_selector are shared: they must not be modified
+    __slots__ = ('selector', 'path', 'predicate', 'properties', 'fragment',
+                 'optional_part', '__matcher')
+
     def __init__(self, selector):
-        self.__sel_regex = re.compile(
-            '^([^?#]+)(\?([^\[()\]#]*)(\((.*)\))?)?(\#(.*))?$')
-        if not self.is_valid(selector):
+        parsed = _parse(selector)
+        if parsed is None:
             raise ValidationError(
                 "{} is not a valid Selector".format(selector))
-        res = self.__sel_regex.match(selector)
         self.selector = selector
-        self.path = res.group(1) or None
-        self.predicate = res.group(3) or None
-        self.properties = res.group(5) or None
-        self.fragment = res.group(7) or None
-        self.optional_part = (res.group(2) or "?")[1:] + (res.group(6) or "")
+        (self.path, self.predicate, self.properties, self.fragment,
+         self.optional_part) = parsed
+        self.__matcher = None
 
     @staticmethod
     def to_selector(s):
         if isinstance(s, Selector):
             return s
         else:
-            return Selector(s)
+            return _intern(s)
 
     def is_valid(self, selector):
-        return self.__sel_regex.match(selector) is not None \
-            and not selector.startswith('//')
+        return _parse(selector) is not None
 
     def is_absolute(self):
         if self.path.startswith('/'):
@@ -54,6 +95,21 @@ class Selector(object):
     def is_prefixed_by_path(self, path):
         return self.path.startswith(str(path))
 
+    def matches(self, path):
+        '''
+
+        Checks if a path matches the path expression of this selector.
+        A ``*`` matches any sequence of characters but ``/`` within a
+        segment and a ``**`` segment matches any number of segments.
+
+        :param path: the path, as a :class:`~yaks.path.Path` or a string.
+        :returns: ``True`` if the path matches.
+
+        '''
+        if self.__matcher is None:
+            self.__matcher = compile_matcher(self.path)
+        return self.__matcher(str(path)) is not None
+
     def to_string(self):
         return self.selector
 
@@ -122,3 +178,167 @@ class Selector(object):
 
     def __hash__(self):
         return self.selector.__hash__()
+
+
+# Selectors built by Selector.to_selector from frequently used strings
+_intern = lru_cache(maxsize=1024)(Selector)
+
+
+class _IndexNode(object):
+    def __init__(self, star=False):
+        # True if reached by a '**' segment
+        self.star = star
+        # literal segment -> node
+        self.children = {}
+        # segment with '*' -> (compiled segment matcher, node)
+        self.patterns = {}
+        # node reached by a '**' segment
+        self.any = None
+        # (selector, value) ending at this node
+        self.items = []
+
+    def is_empty(self):
+        return not (self.children or self.patterns
+                    or self.any is not None or self.items)
+
+
+class SelectorIndex(object):
+    '''
+
+    An index of selectors, organised as a trie of path segments, returning
+    the selectors matching a path in a time proportional to the path depth
+    rather than to the number of selectors.
+
+    Only the path expression of the selectors is considered, with the same
+    semantic as :func:`Selector.matches`.
+
+    '''
+
+    def __init__(self):
+        self.root = _IndexNode()
+        self.count = 0
+
+    def add(self, selector, value=None):
+        '''
+
+        Adds a selector in the index.
+
+        :param selector: the selector, as a :class:`Selector` or a string.
+        :param value: the value returned by :func:`match` for this selector.
+            If ``None``, the selector itself.
+
+        '''
+        selector = Selector.to_selector(selector)
+        node = self.root
+        for segment in selector.get_path().split('/'):
+            node = self.__child(node, segment, True)
+        node.items.append((selector, selector if value is None else value))
+        self.count += 1
+
+    def remove(self, selector, value=None):
+        '''
+
+        Removes a selector from the index.
+
+        :param selector: the selector, as a :class:`Selector` or a string.
+        :param value: the value given to :func:`add`. If ``None``, any value
+            associated to the selector.
+        :returns: ``True`` if the selector was in the index.
+
+        '''
+        selector = Selector.to_selector(selector)
+        nodes = [self.root]
+        for segment in selector.get_path().split('/'):
+            node = self.__child(nodes[-1], segment, False)
+            if node is None:
+                return False
+            nodes.append(node)
+        items = nodes[-1].items
+        for i, (s, v) in enumerate(items):
+            if s == selector and (value is None or v == value):
+                del items[i]
+                self.count -= 1
+                self.__prune(nodes, selector.get_path().split('/'))
+                return True
+        return False
+
+    def match(self, path):
+        '''
+
+        Finds the selectors matching a path.
+
+        :param path: the path, as a :class:`~yaks.path.Path` or a string.
+        :returns: the list of the values of the matching selectors.
+
+        '''
+        # walks the trie as a NFA: 'states' are the nodes reached by the
+        # segments consumed so far, a '**' node consuming any segment
+        states = self.__closure([self.root])
+        for segment in str(path).split('/'):
+            reached = []
+            for node in states:
+                child = node.children.get(segment)
+                if child is not None:
+                    reached.append(child)
+                for (matcher, child) in node.patterns.values():
+                    if matcher(segment) is not None:
+                        reached.append(child)
+                if node.star:
+                    reached.append(node)
+            if not reached:
+                return []
+            states = self.__closure(reached)
+        found = {}
+        for node in states:
+            for item in node.items:
+                found[id(item)] = item[1]
+        return list(found.values())
+
+    @staticmethod
+    def __closure(nodes):
+        # adds the nodes reached by '**' segments matching no segment
+        states = set()
+        for node in nodes:
+            while node is not None and node not in states:
+                states.add(node)
+                node = node.any
+        return states
+
+    @staticmethod
+    def __child(node, segment, create):
+        if segment == '**':
+            if node.any is None and create:
+                node.any = _IndexNode(True)
+            return node.any
+        if '*' in segment:
+            pattern = node.patterns.get(segment)
+            if pattern is None:
+                if not create:
+                    return None
+                pattern = (re.compile(
+                    '^{}$'.format(_segment_regex(segment))).match,
+                    _IndexNode())
+                node.patterns[segment] = pattern
+            return pattern[1]
+        child = node.children.get(segment)
+        if child is None and create:
+            child = _IndexNode()
+            node.children[segment] = child
+        return child
+
+    @staticmethod
+    def __prune(nodes, segments):
+        for i in range(len(segments) - 1, -1, -1):
+            if not nodes[i + 1].is_empty():
+                return
+            parent = nodes[i]
+            segment = segments[i]
+            if segment == '**':
+                parent.any = None
+            elif '*' in segment:
+                del parent.patterns[segment]
+            else:
+                del parent.children[segment]
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,250 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+'''
+
+Downsampling of time series, used by
+:func:`~yaks.workspace.Workspace.get_series`.
+
+The samples are aggregated per path and per window of ``step`` seconds as
+they are received: only the aggregates of the windows are kept rather than
+the entries, with the timestamps of the samples of the latest windows of
+each path to drop the duplicates returned by several storages. The
+columns are NumPy arrays when NumPy is installed, lists otherwise.
+
+'''
+
+from yaks.selector import Selector
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+AGGREGATIONS = ('min', 'max', 'mean', 'last', 'count')
+
+# zenoh timestamps are NTP64: seconds in the upper 32 bits and fraction of
+# second in the lower 32 bits
+_NTP64_SECOND = 1 << 32
+
+
+def timestamp_seconds(timestamp):
+    '''
+
+    Converts the timestamp of an :class:`~yaks.entry.Entry` to seconds since
+    the epoch.
+
+    '''
+    return timestamp.time / _NTP64_SECOND
+
+
+def sample_value(value):
+    '''
+
+    Converts a :class:`~yaks.value.Value` holding a number, as a number or
+    as its text, to a float.
+
+    '''
+    v = value.get_value()
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        v = bytes(v)
+    return float(v)
+
+
+def _property(v):
+    return repr(float(v)) if isinstance(v, (int, float)) else str(v)
+
+
+def window_selector(selector, start=None, stop=None, step=None, agg=None):
+    '''
+
+    Adds the ``starttime``, ``stoptime``, ``step`` and ``agg`` properties
+    to a selector, letting the storages supporting them return a single
+    sample per window.
+
+    :param selector: the :class:`~yaks.selector.Selector`.
+    :returns: the new :class:`~yaks.selector.Selector`.
+
+    '''
+    hints = [('{}={}'.format(k, _property(v)), k) for (k, v) in [
+        ('starttime', start), ('stoptime', stop), ('step', step),
+        ('agg', None if agg is None else ','.join(agg))] if v is not None]
+    # the properties of the selector are kept, unless overridden
+    keys = set(k for (_, k) in hints)
+    props = [p for p in (selector.get_properties() or '').split(';')
+             if p != '' and p.split('=', 1)[0] not in keys]
+    props.extend(p for (p, _) in hints)
+    s = '{}?{}({})'.format(selector.get_path(),
+                           selector.get_predicate() or '', ';'.join(props))
+    if selector.get_fragment() is not None:
+        s += '#' + selector.get_fragment()
+    return Selector.to_selector(s)
+
+
+class Series(object):
+    '''
+
+    The downsampled series of a path, as columns of the same length: the
+    ``time`` of the start of each window, in seconds since the epoch, and
+    a column per aggregation.
+
+    '''
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['columns'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __len__(self):
+        return len(self.columns['time'])
+
+    def __repr__(self):
+        return 'Series({}, {} windows)'.format(self.path, len(self))
+
+
+class Downsampler(object):
+    '''
+
+    Aggregates samples per path and per window.
+
+    :param start: the start of the first window, in seconds since the
+        epoch. If ``None``, the windows are aligned on multiples of
+        ``step``. Samples before ``start`` are ignored.
+    :param stop: samples at or after ``stop`` are ignored, if not ``None``.
+    :param step: the duration of the windows, in seconds.
+    :param agg: the aggregations among :data:`AGGREGATIONS`.
+    :param horizon: the number of windows, before the latest window of a
+        path, whose timestamps are kept to drop the duplicates. The
+        storages answer in time order, so that the windows further behind
+        are complete: a duplicate received that late is counted again.
+
+    '''
+
+    DEFAULT_HORIZON = 4
+
+    def __init__(self, start, stop, step, agg=('mean',),
+                 horizon=DEFAULT_HORIZON):
+        if step is None or step <= 0:
+            raise ValueError('step must be a positive number')
+        for a in agg:
+            if a not in AGGREGATIONS:
+                raise ValueError('Unknown aggregation: {}'.format(a))
+        self.origin = 0 if start is None else start
+        self.start = start
+        self.stop = stop
+        self.step = step
+        self.agg = tuple(agg)
+        self.horizon = horizon
+        # path -> {window index: [count, sum, min, max, last time, last]}
+        self.windows = {}
+        # path -> (latest window index, {window index: set of timestamps})
+        self.seen = {}
+
+    def add(self, path, time, value, timestamp=None):
+        '''
+
+        Aggregates a sample.
+
+        :param path: the path of the sample.
+        :param time: its time, in seconds since the epoch.
+        :param value: its value, as a number.
+        :param timestamp: a hashable identifier of the sample, if not
+            ``None`` the samples already added with the same identifier are
+            ignored.
+
+        '''
+        if (self.start is not None and time < self.start) \
+                or (self.stop is not None and time >= self.stop):
+            return
+        index = int((time - self.origin) // self.step)
+        if timestamp is not None and self.__seen(path, index, timestamp):
+            return
+        windows = self.windows.get(path)
+        if windows is None:
+            windows = {}
+            self.windows[path] = windows
+        w = windows.get(index)
+        if w is None:
+            windows[index] = [1, value, value, value, time, value]
+            return
+        w[0] += 1
+        w[1] += value
+        if value < w[2]:
+            w[2] = value
+        if value > w[3]:
+            w[3] = value
+        if time >= w[4]:
+            w[4] = time
+            w[5] = value
+
+    def __seen(self, path, index, timestamp):
+        # tells if the sample is a duplicate, keeping the timestamps of the
+        # windows within the horizon only
+        seen = self.seen.get(path)
+        if seen is None:
+            seen = self.seen[path] = [index, {}]
+        elif index > seen[0]:
+            seen[0] = index
+            oldest = index - self.horizon
+            for i in [i for i in seen[1] if i < oldest]:
+                del seen[1][i]
+        if index < seen[0] - self.horizon:
+            return False
+        timestamps = seen[1].get(index)
+        if timestamps is None:
+            timestamps = seen[1][index] = set()
+        elif timestamp in timestamps:
+            return True
+        timestamps.add(timestamp)
+        return False
+
+    def series(self):
+        '''
+
+        Get the series of the aggregated samples.
+
+        :returns: a dictionary of :class:`Series` per path, sorted by path.
+
+        '''
+        results = {}
+        for path in sorted(self.windows):
+            windows = self.windows[path]
+            indexes = sorted(windows)
+            columns = {'time': [self.origin + i * self.step for i in indexes]}
+            rows = [windows[i] for i in indexes]
+            for a in self.agg:
+                if a == 'count':
+                    columns[a] = [w[0] for w in rows]
+                elif a == 'mean':
+                    columns[a] = [w[1] / w[0] for w in rows]
+                elif a == 'min':
+                    columns[a] = [w[2] for w in rows]
+                elif a == 'max':
+                    columns[a] = [w[3] for w in rows]
+                else:
+                    columns[a] = [w[5] for w in rows]
+            if numpy is not None:
+                columns = {k: numpy.array(
+                    v, dtype=numpy.int64 if k == 'count' else numpy.float64)
+                    for (k, v) in columns.items()}
+            results[path] = Series(path, columns)
+        return results
@@ -0,0 +1,366 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
+
+'''
+
+Shared-memory payloads for the clients of the same host, enabled with
+:func:`~yaks.workspace.Workspace.enable_shared_memory` on the publishing
+workspace and with the ``shared`` parameter of
+:func:`~yaks.workspace.Workspace.subscribe` on the subscriptions. Python
+3.8 or later is required.
+
+A workspace with shared memory enabled copies each large RAW payload it
+puts into a new :py:class:`multiprocessing.shared_memory.SharedMemory`
+segment, and publishes a small handle on it before putting the value as
+usual: the storages, the gets and the other subscriptions thus see the
+value as if shared memory were not enabled. The handle holds the id of
+the host, the name and size of the segment, and a random token written at
+the start of the segment. It is written under :data:`SHARED_PREFIX` (the
+handle of ``/a/b`` on ``/@/yaks/shm/data/a/b``) with the
+:data:`Z_SHARED_ENC` encoding. A storage whose selector covers
+:data:`SHARED_PREFIX`, e.g. ``/**``, stores the handles too.
+
+A shared subscription also subscribes to the handles of its selection.
+The segment of a handle received from the same host is mapped read-only
+at once, and the value is delivered as a :py:class:`memoryview` on it:
+the copy of the value put after the handle is then dropped. The handles
+of the other hosts, or whose segment cannot be mapped anymore, are
+dropped and the copy is delivered instead. The handles and the copies are
+paired on their path, size and first and last bytes, whatever the order
+they are received in.
+
+The writer keeps the ``keep`` last segments of each path, and at most
+``max_segments`` segments overall, and unlinks the older ones. A segment
+is never modified once published, and a mapped segment stays valid after
+its unlink.
+
+'''
+
+import collections
+import hashlib
+import mmap
+import os
+import re
+import socket
+import struct
+import threading
+import uuid
+from yaks.encoding import Encoding
+from yaks.selector import compile_matcher
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8
+    shared_memory = None
+
+try:
+    import _posixshmem
+except ImportError:
+    # the segments cannot be mapped, the copies are delivered
+    _posixshmem = None
+
+# the payloads of at least this size are shared
+DEFAULT_THRESHOLD = 64 * 1024
+# the number of segments kept per path
+DEFAULT_KEEP = 4
+# the number of segments kept by a writer
+DEFAULT_MAX_SEGMENTS = 64
+# the prefix of the paths of the handles
+SHARED_PREFIX = '/@/yaks/shm/data'
+# the zenoh encoding of the handles, not used by any Yaks encoding
+Z_SHARED_ENC = 0x80
+
+# host id, token, size, length of the segment name, followed by the name
+_HANDLE = struct.Struct('<16s16sQH')
+_TOKEN_SIZE = 16
+_NAME = re.compile('^[A-Za-z0-9_]{1,64}$')
+_SHARED_SEGMENTS = SHARED_PREFIX.split('/')[1:]
+# the number of bytes of each end of a payload compared to pair a handle
+# and a copy
+_SAMPLE = 32
+
+
+def _host_id():
+    # the segments are shared by the processes with the same machine id and
+    # host name, which tells the containers of a host apart
+    machine = b''
+    for path in ('/etc/machine-id', '/proc/sys/kernel/random/boot_id'):
+        try:
+            with open(path, 'rb') as f:
+                machine = f.read().strip()
+            break
+        except OSError:
+            pass
+    if not machine:
+        machine = str(uuid.getnode()).encode()
+    return hashlib.sha256(machine + socket.gethostname().encode()) \
+        .digest()[:16]
+
+
+HOST_ID = _host_id()
+
+
+def covers_shared(selector):
+    '''
+
+    Tells if a selector can match the paths of the handles, in which case
+    its subscriptions filter them out.
+
+    '''
+    path = selector.split('?', 1)[0].split('#', 1)[0]
+    segments = path.split('/')[1:]
+    for (i, segment) in enumerate(segments):
+        if segment == '**' or i == len(_SHARED_SEGMENTS):
+            return True
+        if compile_matcher(segment)(_SHARED_SEGMENTS[i]) is None:
+            return False
+    return False
+
+
+def parse_handle(handle):
+    '''
+
+    :returns: the (host id, token, size, segment name) of a handle.
+    :raises LookupError: if the handle is not valid.
+
+    '''
+    try:
+        (host, token, size, length) = _HANDLE.unpack_from(handle)
+        name = bytes(handle[_HANDLE.size:_HANDLE.size + length]).decode()
+    except (struct.error, UnicodeDecodeError):
+        raise LookupError('Invalid shared payload handle')
+    if len(handle) != _HANDLE.size + length or _NAME.match(name) is None:
+        raise LookupError('Invalid shared payload handle')
+    return (host, token, size, name)
+
+
+def _map(name, token, size):
+    fd = _posixshmem.shm_open('/' + name, os.O_RDONLY, mode=0o600)
+    try:
+        if os.fstat(fd).st_size < _TOKEN_SIZE + size:
+            return None
+        m = mmap.mmap(fd, _TOKEN_SIZE + size, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+    # the view keeps the mapping until it is released
+    view = memoryview(m)
+    if view[:_TOKEN_SIZE] != token:
+        return None
+    return view[_TOKEN_SIZE:]
+
+
+def map_handle(handle):
+    '''
+
+    Maps the segment of a handle.
+
+    :returns: a read-only :py:class:`memoryview` on the payload, or
+        ``None`` if the handle is not valid, is from another host, or if
+        its segment cannot be mapped, e.g. once unlinked.
+
+    '''
+    try:
+        (host, token, size, name) = parse_handle(handle)
+    except LookupError:
+        return None
+    if host != HOST_ID or _posixshmem is None:
+        return None
+    try:
+        return _map(name, token, size)
+    except (OSError, ValueError):
+        # unlinked, or in another /dev/shm
+        return None
+
+
+def _create(size):
+    segment = shared_memory.SharedMemory(create=True,
+                                         size=_TOKEN_SIZE + size)
+    if getattr(segment, '_fd', -1) >= 0:
+        # the segment stays mapped: its descriptor is not needed anymore
+        os.close(segment._fd)
+        segment._fd = -1
+    return segment
+
+
+def _release(segment):
+    segment.close()
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _key(payload):
+    # what pairs a handle and the copy of its payload
+    view = memoryview(payload).cast('B')
+    return (view.nbytes, bytes(view[:_SAMPLE]), bytes(view[-_SAMPLE:]))
+
+
+class SharedMemoryWriter(object):
+    '''
+
+    Moves the large RAW payloads put by a workspace into shared-memory
+    segments.
+
+    :param threshold: the minimum size of the shared payloads, in bytes.
+    :param keep: the number of segments kept per path.
+    :param max_segments: the number of segments kept overall.
+
+    '''
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, keep=DEFAULT_KEEP,
+                 max_segments=DEFAULT_MAX_SEGMENTS):
+        if shared_memory is None:
+            raise ImportError(
+                'Shared-memory payloads require Python 3.8 or later')
+        if keep < 1 or max_segments < 1:
+            raise ValueError('At least one segment must be kept')
+        self.threshold = threshold
+        self.keep = keep
+        self.max_segments = max_segments
+        self.lock = threading.Lock()
+        # path -> deque of the names of the segments kept for the path
+        self.segments = {}
+        # segment name -> (segment, path), oldest first
+        self.names = collections.OrderedDict()
+
+    def __evict(self, name):
+        # called with the lock held
+        (segment, rname) = self.names.pop(name)
+        kept = self.segments[rname]
+        kept.remove(name)
+        if len(kept) == 0:
+            del self.segments[rname]
+        return segment
+
+    def shares(self, encoding, payload):
+        '''
+
+        Tells if a payload is to be put in a segment.
+
+        '''
+        return encoding == Encoding.RAW \
+            and memoryview(payload).nbytes >= max(self.threshold, 1)
+
+    def handle(self, rname, payload):
+        '''
+
+        Copies a payload into a new segment.
+
+        :returns: the handle on the segment, to be written on
+            ``SHARED_PREFIX + rname``.
+
+        '''
+        view = memoryview(payload).cast('B')
+        size = view.nbytes
+        token = os.urandom(_TOKEN_SIZE)
+        segment = _create(size)
+        segment.buf[:_TOKEN_SIZE] = token
+        segment.buf[_TOKEN_SIZE:_TOKEN_SIZE + size] = view
+        name = segment.name
+        evicted = []
+        with self.lock:
+            kept = self.segments.get(rname)
+            if kept is None:
+                kept = self.segments[rname] = collections.deque()
+            kept.append(name)
+            self.names[name] = (segment, rname)
+            if len(kept) > self.keep:
+                evicted.append(self.__evict(kept[0]))
+            while len(self.names) > self.max_segments:
+                evicted.append(self.__evict(next(iter(self.names))))
+        for segment in evicted:
+            _release(segment)
+        encoded = name.encode()
+        return b''.join((_HANDLE.pack(HOST_ID, token, size, len(encoded)),
+                         encoded))
+
+    def close(self):
+        '''
+
+        Unlinks all the segments.
+
+        '''
+        with self.lock:
+            segments = [segment for (segment, _) in self.names.values()]
+            self.segments = {}
+            self.names = collections.OrderedDict()
+        for segment in segments:
+            _release(segment)
+
+
+class SharedReceiver(object):
+    '''
+
+    Pairs the handles and the copies of the shared payloads received by a
+    shared subscription, so that each value is delivered once.
+
+    The payloads received on one side and not yet on the other are kept,
+    by their key only, ``MAX_PENDING`` per path and for ``MAX_PATHS``
+    paths at most. The ``lock`` is held by the subscription while it
+    delivers a change, its two zenoh subscriptions thus never call the
+    listener at once.
+
+    '''
+
+    MAX_PENDING = 16
+    MAX_PATHS = 1024
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # path -> deque of (is a handle, key), least recently used first
+        self.pending = collections.OrderedDict()
+
+    def __pair(self, rname, handle, key):
+        # called with the lock held, True if the other side was received
+        pending = self.pending.get(rname)
+        if pending is not None:
+            self.pending.move_to_end(rname)
+            other = (not handle, key)
+            if other in pending:
+                pending.remove(other)
+                if len(pending) == 0:
+                    del self.pending[rname]
+                return True
+        else:
+            pending = self.pending[rname] = \
+                collections.deque(maxlen=self.MAX_PENDING)
+            if len(self.pending) > self.MAX_PATHS:
+                self.pending.popitem(last=False)
+        pending.append((handle, key))
+        return False
+
+    def receive_handle(self, rname, handle):
+        '''
+
+        :returns: the mapped payload of a handle to deliver, or ``None``
+            if the handle is dropped.
+
+        '''
+        view = map_handle(handle)
+        if view is None or self.__pair(rname, True, _key(view)):
+            return None
+        return view
+
+    def receive_copy(self, rname, payload):
+        '''
+
+        :returns: ``True`` if a RAW payload is to be delivered, ``False``
+            if its handle has already been.
+
+        '''
+        if memoryview(payload).nbytes == 0:
+            return True
+        return not self.__pair(rname, False, _key(payload))
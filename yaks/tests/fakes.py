@@ -0,0 +1,48 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+'''
+
+The zenoh replies of the tests needing data that the ``mem://`` service
+cannot hold, e.g. several samples of a path with given times.
+
+'''
+
+import zenoh
+from yaks import Encoding
+
+
+class Timestamp(object):
+    def __init__(self, time):
+        self.time = time
+
+    def __lt__(self, other):
+        return self.time < other.time
+
+    def __eq__(self, other):
+        return self.time == other.time
+
+    def __hash__(self):
+        return hash(self.time)
+
+
+class Reply(object):
+    def __init__(self, kind, rname=None, data=None, time=None,
+                 encoding=Encoding.Z_STRING_ENC):
+        self.kind = kind
+        self.rname = rname
+        self.data = data
+        self.info = zenoh.z_data_info_t()
+        self.info.encoding = encoding
+        self.info.tstamp = None if time is None else Timestamp(time)
@@ -0,0 +1,81 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import time
+import unittest
+import uuid
+from yaks import Yaks, Value, Encoding
+
+
+class AdminTests(unittest.TestCase):
+
+    def setUp(self):
+        self.y = Yaks.login('mem://{}'.format(uuid.uuid4()))
+        self.queries = []
+        query = self.y.rt.query
+
+        def counting_query(path, optional_part, callback):
+            self.queries.append(path)
+            query(path, optional_part, callback)
+        self.y.rt.query = counting_query
+
+    def tearDown(self):
+        self.y.logout()
+
+    def test_add_remove_storages(self):
+        admin = self.y.admin()
+        props = {'selector': '/myyaks/**'}
+        self.assertEqual(admin.add_storages(
+            [('st{}'.format(i), props) for i in range(10)]
+            + [('other', {'selector': '/other/**'}, 'mem')]), 11)
+        self.assertEqual(len(admin.get_storages()), 11)
+        self.assertEqual(admin.get_storage('other'), 'selector=/other/**')
+        ws = self.y.workspace('/')
+        ws.put('/other/a', Value('1', encoding=Encoding.STRING))
+        self.assertEqual(len(ws.get('/other/a')), 1)
+
+        del self.queries[:]
+        self.assertEqual(admin.remove_storages(
+            ['st{}'.format(i) for i in range(10)] + ['unknown']), 10)
+        self.assertEqual(len(self.queries), 1)
+        self.assertEqual([stid for (stid, _) in admin.get_storages()],
+                         ['other'])
+
+    def test_cached(self):
+        admin = self.y.admin(cache_size=100)
+        admin.add_storage('st', {'selector': '/myyaks/**'})
+        self.assertEqual(admin.get_storage('st'), 'selector=/myyaks/**')
+        del self.queries[:]
+        admin.add_storage('st2', {'selector': '/myyaks2/**'})
+        # the subscription delivers the change from the I/O thread
+        for _ in range(100):
+            if admin.get_storage('st2') is not None:
+                break
+            time.sleep(0.01)
+        self.assertEqual(admin.get_storage('st2'), 'selector=/myyaks2/**')
+        self.assertTrue(admin.remove_storage('st'))
+        self.assertFalse(admin.remove_storage('unknown'))
+        self.assertEqual(self.queries, [])
+
+    def test_get_all(self):
+        admin = self.y.admin()
+        admin.add_backend('mem', {'kind': 'memory'})
+        admin.add_storage('st', {'selector': '/myyaks/**'}, 'mem')
+        other = 'ff' * 16
+        storages = admin.get_all_storages([admin.local, other], timeout=1)
+        self.assertEqual(storages, {
+            admin.local: [('st', 'selector=/myyaks/**')],
+            other: []})
+        self.assertEqual(admin.get_all_backends(),
+                         {admin.local: [('mem', 'kind=memory')]})
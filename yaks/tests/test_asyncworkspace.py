@@ -0,0 +1,146 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import unittest
+import asyncio
+import sys
+import threading
+import uuid
+from yaks import Yaks, Value, Encoding
+from yaks.asyncworkspace import LoopBridge
+from yaks.exceptions import QueryTimeoutError
+
+
+async def slow_eval(path, props):
+    await asyncio.sleep(1)
+    return Value('late', encoding=Encoding.STRING)
+
+
+class LoopBridgeTests(unittest.TestCase):
+
+    def test_bridge_batches_calls(self):
+        loop = asyncio.new_event_loop()
+        bridge = LoopBridge(loop)
+        received = []
+        wakeups = []
+        original = loop.call_soon_threadsafe
+
+        def call_soon_threadsafe(cb, *args):
+            wakeups.append(cb)
+            return original(cb, *args)
+
+        loop.call_soon_threadsafe = call_soon_threadsafe
+
+        def produce():
+            for i in range(0, 100):
+                bridge.call(received.append, i)
+
+        t = threading.Thread(target=produce)
+        t.start()
+        t.join()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+        self.assertEqual(received, list(range(0, 100)))
+        self.assertEqual(len(wakeups), 1)
+
+    def test_bridge_closed_loop(self):
+        loop = asyncio.new_event_loop()
+        loop.close()
+        bridge = LoopBridge(loop)
+        bridge.call(print, 'never')
+        self.assertEqual(bridge.pending, [])
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'asyncio.run requires 3.7')
+class AsyncWorkspaceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.y = Yaks.login('mem://{}'.format(uuid.uuid4()))
+        self.y.admin().add_storage('st', {'selector': '/async/**'})
+        # created outside of any event loop, as usual
+        self.ws = self.y.workspace('/async', asyncio=True)
+
+    def tearDown(self):
+        self.y.logout()
+
+    def test_put_get(self):
+        async def main():
+            await self.ws.put('a', Value('1', encoding=Encoding.STRING))
+            return await self.ws.get('a')
+        entries = asyncio.run(main())
+        self.assertEqual(entries[0].get_value().get_value(), '1')
+        # another loop, as with a second asyncio.run
+        entries = asyncio.run(self.ws.get('a'))
+        self.assertEqual(entries[0].get_value().get_value(), '1')
+
+    def test_get_timeout(self):
+        async def main():
+            await self.ws.register_eval('slow', slow_eval)
+            with self.assertRaises(QueryTimeoutError):
+                await self.ws.get('slow', timeout=0.05)
+            return await self.ws.get('slow', timeout=0.05, partial=True)
+        entries = asyncio.run(main())
+        self.assertTrue(entries.partial)
+        self.assertEqual(entries, [])
+
+    def test_async_for(self):
+        async def main():
+            sub = await self.ws.subscribe('/async/**')
+            for i in range(3):
+                await self.ws.put('s', Value(str(i),
+                                             encoding=Encoding.STRING))
+            received = []
+            async for change in sub:
+                received.append(change.get_value().get_value())
+                if len(received) == 3:
+                    await self.ws.unsubscribe(sub)
+            return received
+        self.assertEqual(asyncio.run(asyncio.wait_for(main(), 5)),
+                         ['0', '1', '2'])
+
+    def test_coroutine_listener(self):
+        async def main():
+            received = []
+            done = asyncio.Event()
+
+            async def listener(changes):
+                await asyncio.sleep(0)
+                received.extend(c.get_value().get_value() for c in changes)
+                if len(received) == 2:
+                    done.set()
+            sid = await self.ws.subscribe('/async/**', listener)
+            await self.ws.put('l', Value('x', encoding=Encoding.STRING))
+            await self.ws.put('l', Value('y', encoding=Encoding.STRING))
+            await asyncio.wait_for(done.wait(), 5)
+            await self.ws.unsubscribe(sid)
+            return received
+        self.assertEqual(asyncio.run(main()), ['x', 'y'])
+
+    def test_listener_exception(self):
+        async def main():
+            errors = []
+            asyncio.get_event_loop().set_exception_handler(
+                lambda loop, context: errors.append(context['exception']))
+
+            async def listener(changes):
+                raise ValueError('listener')
+            sid = await self.ws.subscribe('/async/**', listener)
+            await self.ws.put('e', Value('x', encoding=Encoding.STRING))
+            while len(errors) == 0:
+                await asyncio.sleep(0.01)
+            await self.ws.unsubscribe(sid)
+            return errors
+        errors = asyncio.run(asyncio.wait_for(main(), 5))
+        self.assertIsInstance(errors[0], ValueError)
+        self.assertEqual(self.ws.tasks, set())
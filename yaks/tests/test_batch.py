@@ -0,0 +1,195 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import unittest
+import threading
+import time
+from yaks.batch import WriteBatch, ChangeBatcher, _Scheduler
+from yaks import Value, Encoding, Change, ChangeKind
+
+
+class FakeWorkspace(object):
+    def __init__(self, delay=None):
+        self.groups = []
+        self.delay = delay
+
+    def put_many(self, entries):
+        entries = list(entries)
+        if self.delay is not None:
+            time.sleep(self.delay(entries))
+        self.groups.append(entries)
+        return len(entries)
+
+
+class WriteBatchTests(unittest.TestCase):
+
+    def test_batch_flush_on_size(self):
+        ws = FakeWorkspace()
+        b = WriteBatch(ws, max_size=2)
+        v = Value('v', encoding=Encoding.STRING)
+        b.put('/a', v)
+        self.assertEqual(ws.groups, [])
+        b.put('/b', v)
+        self.assertEqual(ws.groups, [[('/a', v), ('/b', v)]])
+        self.assertEqual(len(b), 0)
+
+    def test_batch_flush_on_exit(self):
+        ws = FakeWorkspace()
+        v = Value('v', encoding=Encoding.STRING)
+        with WriteBatch(ws, max_size=10) as b:
+            b.put('/a', v)
+            b.put('/b', v)
+            b.put('/c', v)
+        self.assertEqual(len(ws.groups), 1)
+        self.assertEqual(len(ws.groups[0]), 3)
+
+    def test_batch_flush_on_delay(self):
+        ws = FakeWorkspace()
+        b = WriteBatch(ws, max_size=10, max_delay=0.01)
+        b.put('/a', Value('v', encoding=Encoding.STRING))
+        time.sleep(0.2)
+        self.assertEqual(len(ws.groups), 1)
+        b.flush()
+        self.assertEqual(len(ws.groups), 1)
+
+    def test_batch_order(self):
+        # a delayed flush, slower than the following flush on size, does
+        # not let it overtake its group
+        ws = FakeWorkspace(delay=lambda group: 0.05 if len(group) < 4
+                           else 0)
+        b = WriteBatch(ws, max_size=4, max_delay=0.01)
+        v = Value('v', encoding=Encoding.STRING)
+        b.put('0', v)
+        time.sleep(0.02)
+        for i in range(1, 5):
+            b.put(str(i), v)
+        b.flush()
+        time.sleep(0.1)
+        self.assertEqual([p for group in ws.groups for (p, _) in group],
+                         [str(i) for i in range(5)])
+
+    def test_batch_invalid_size(self):
+        self.assertRaises(ValueError, WriteBatch, FakeWorkspace(), 0)
+
+
+class ChangeBatcherTests(unittest.TestCase):
+
+    def changes(self, *paths):
+        return [Change(p, ChangeKind.PUT, i, Value(str(i))) for (i, p)
+                in enumerate(paths)]
+
+    def test_batcher_deliver_on_size(self):
+        delivered = []
+        b = ChangeBatcher(delivered.append, max_batch=2)
+        changes = self.changes('/a', '/b', '/c')
+        for c in changes:
+            b.add(c)
+        self.assertEqual(delivered, [changes[:2]])
+        b.flush()
+        self.assertEqual(delivered, [changes[:2], changes[2:]])
+
+    def test_batcher_deliver_on_delay(self):
+        delivered = []
+        b = ChangeBatcher(delivered.append, max_batch=10, max_delay=0.01)
+        b.add(self.changes('/a')[0])
+        time.sleep(0.2)
+        self.assertEqual(len(delivered), 1)
+
+    def test_batcher_conflate(self):
+        delivered = []
+        b = ChangeBatcher(delivered.append, max_delay=10, conflate=True)
+        changes = self.changes('/a', '/b', '/a')
+        for c in changes:
+            b.add(c)
+        self.assertEqual(len(b), 2)
+        b.flush()
+        self.assertEqual(delivered, [[changes[1], changes[2]]])
+
+    def test_batcher_conflate_updates(self):
+        delivered = []
+        b = ChangeBatcher(delivered.extend, max_delay=10, conflate=True)
+
+        def json(v):
+            return Value(v, encoding=Encoding.JSON)
+        put = Change('/a', ChangeKind.PUT, 1, json({'a': 1, 'b': 1, 'c': 1}))
+        first = Change('/a', ChangeKind.UPDATE, 2, json({'a': 2, 'd': {}}))
+        second = Change('/a', ChangeKind.UPDATE, 3, json({'b': 3}))
+        raw = [Change('/r', ChangeKind.UPDATE, t, Value(d))
+               for (t, d) in [(4, b'\0\0\0\0\0\0\0\0x'),
+                              (5, b'\0\0\0\0\0\0\0\0y')]]
+        for c in [put, first, second] + raw:
+            b.add(c)
+        b.flush()
+        # the PUT of the updated value, the RAW deltas being kept
+        self.assertEqual([(c.path, c.kind, c.time) for c in delivered],
+                         [('/a', ChangeKind.PUT, 3),
+                          ('/r', ChangeKind.UPDATE, 4),
+                          ('/r', ChangeKind.UPDATE, 5)])
+        self.assertEqual(delivered[0].value.get_value(),
+                         {'a': 2, 'b': 3, 'c': 1, 'd': {}})
+        # two UPDATE merged into one
+        delivered.clear()
+        for c in [first, second]:
+            b.add(c)
+        b.flush()
+        self.assertEqual(len(delivered), 1)
+        self.assertEqual(
+            delivered[0].apply_to(put.value).get_value(),
+            second.apply_to(first.apply_to(put.value)).get_value())
+
+    def test_batcher_single_thread(self):
+        # the delayed deliveries run on the same thread
+        delivered = []
+        threads = set()
+
+        def deliver(changes):
+            delivered.extend(changes)
+            threads.add(threading.current_thread().name)
+        b = ChangeBatcher(deliver, max_batch=10, max_delay=0.001)
+        for c in self.changes(*['/a'] * 5):
+            b.add(c)
+            time.sleep(0.01)
+        self.assertEqual(len(delivered), 5)
+        self.assertEqual(len(threads), 1)
+
+    def test_slow_listener(self):
+        # a listener taking long does not delay the flushes of the others
+        release = threading.Event()
+        delivered = []
+        slow = ChangeBatcher(lambda changes: release.wait(), max_delay=0.001)
+        fast = ChangeBatcher(delivered.extend, max_delay=0.01)
+        try:
+            slow.add(self.changes('/a')[0])
+            time.sleep(0.01)
+            fast.add(self.changes('/b')[0])
+            time.sleep(0.1)
+            self.assertEqual(len(delivered), 1)
+        finally:
+            release.set()
+
+    def test_scheduler(self):
+        scheduler = _Scheduler()
+        called = []
+        done = threading.Event()
+        scheduler.schedule(0.02, lambda: (called.append(2), done.set()),
+                           lambda fn: fn())
+        cancelled = scheduler.schedule(0.01, lambda: called.append(0),
+                                       lambda fn: fn())
+        scheduler.schedule(0.01, lambda: called.append(1), lambda fn: fn())
+        scheduler.cancel(cancelled)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(called, [1, 2])
+
+    def test_batcher_needs_trigger(self):
+        self.assertRaises(ValueError, ChangeBatcher, print)
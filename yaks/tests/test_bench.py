@@ -0,0 +1,36 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import unittest
+import json
+from yaks.bench import run, loopback, SUITES
+
+
+class BenchTests(unittest.TestCase):
+
+    def test_run(self):
+        y = loopback()
+        try:
+            report = run(y, samples=20, size=16)
+        finally:
+            y.logout()
+        self.assertEqual(set(report['results']), set(SUITES))
+        self.assertEqual(report['results']['get']['samples'], 20)
+        self.assertTrue(report['results']['subscribe']['complete'])
+        self.assertIn('JSON', report['results']['encoding'])
+        json.dumps(report)
+
+
+if __name__ == '__main__':
+    unittest.main()
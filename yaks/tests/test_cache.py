@@ -0,0 +1,117 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import unittest
+import zenoh
+from yaks.cache import CachedWorkspace
+from yaks import Value, Encoding
+from yaks.tests.fakes import Timestamp, Reply
+
+
+class FakeRuntime(object):
+    def __init__(self, data):
+        self.data = data
+        self.queries = 0
+        self.subscribers = {}
+
+    def query(self, path, optional_part, callback):
+        self.queries += 1
+        for (rname, value, time) in self.data:
+            callback(Reply(zenoh.Z_STORAGE_DATA, rname, value, time))
+        callback(Reply(zenoh.Z_REPLY_FINAL))
+
+    def declare_subscriber(self, selector, mode, callback):
+        sid = len(self.subscribers)
+        self.subscribers[sid] = callback
+        return sid
+
+    def undeclare_subscriber(self, sid):
+        del self.subscribers[sid]
+
+    def notify(self, rname, data, kind, time,
+               encoding=Encoding.Z_STRING_ENC):
+        info = zenoh.z_data_info_t()
+        info.encoding = encoding
+        info.kind = kind
+        info.tstamp = Timestamp(time)
+        for callback in list(self.subscribers.values()):
+            callback(rname, data, info)
+
+
+class CachedWorkspaceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.rt = FakeRuntime([('/fleet/a', b'a1', 1),
+                               ('/fleet/a', b'a2', 2),
+                               ('/fleet/b', b'b1', 3)])
+
+    def values(self, entries):
+        return sorted((e.get_path(), e.get_value().get_value())
+                      for e in entries)
+
+    def test_cache_hit(self):
+        ws = CachedWorkspace(self.rt, '/')
+        expected = [('/fleet/a', 'a2'), ('/fleet/b', 'b1')]
+        self.assertEqual(self.values(ws.get('/fleet/**')), expected)
+        self.assertEqual(self.values(ws.get('/fleet/**')), expected)
+        self.assertEqual(self.values(ws.get('/fleet/b')), [expected[1]])
+        self.assertEqual(ws.get('/fleet/c'), [])
+        self.assertEqual(self.rt.queries, 1)
+        stats = ws.cache_stats()
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_cache_follows_changes(self):
+        ws = CachedWorkspace(self.rt, '/')
+        ws.get('/fleet/**')
+        self.rt.notify('/fleet/a', b'a3', zenoh.Z_PUT, 4)
+        self.rt.notify('/fleet/b', b'', zenoh.Z_REMOVE, 5)
+        self.rt.notify('/fleet/c', b'c1', zenoh.Z_PUT, 6)
+        self.assertEqual(self.values(ws.get('/fleet/**')),
+                         [('/fleet/a', 'a3'), ('/fleet/c', 'c1')])
+        self.assertEqual(self.rt.queries, 1)
+
+    def test_cache_applies_updates(self):
+        rt = FakeRuntime([])
+        ws = CachedWorkspace(rt, '/')
+        ws.get('/fleet/**')
+        rt.notify('/fleet/a', b'{"x": 1, "y": 2}', zenoh.Z_PUT, 1,
+                  Encoding.Z_JSON_ENC)
+        rt.notify('/fleet/a', b'{"y": 3}', zenoh.Z_UPDATE, 2,
+                  Encoding.Z_JSON_ENC)
+        entries = ws.get('/fleet/**')
+        self.assertEqual(rt.queries, 1)
+        self.assertEqual(entries[0].get_value().get_value(),
+                         {'x': 1, 'y': 3})
+
+    def test_cache_eviction(self):
+        ws = CachedWorkspace(self.rt, '/', max_entries=1)
+        ws.get('/fleet/**')
+        ws.get('/fleet/**')
+        self.assertEqual(self.rt.queries, 2)
+        self.assertGreater(ws.cache_stats()['evictions'], 0)
+
+    def test_not_cacheable(self):
+        ws = CachedWorkspace(self.rt, '/')
+        ws.get('/fleet/**?(starttime=0)')
+        ws.get('/fleet/**?(starttime=0)')
+        self.assertEqual(self.rt.queries, 2)
+        self.assertEqual(self.rt.subscribers, {})
+
+    def test_clear_cache(self):
+        ws = CachedWorkspace(self.rt, '/')
+        ws.get('/fleet/**')
+        ws.clear_cache()
+        self.assertEqual(self.rt.subscribers, {})
+        self.assertEqual(ws.cache_stats()['entries'], 0)
@@ -0,0 +1,76 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import struct
+import unittest
+import uuid
+from yaks import Yaks, Value, Encoding
+from yaks.columns import numpy
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class ColumnsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.y = Yaks.login('mem://{}'.format(uuid.uuid4()))
+        self.y.admin().add_storage('st', {'selector': '/**'})
+        self.ws = self.y.workspace('/')
+        self.ws.put('/raw/a', Value(struct.pack('<d', 1.5)))
+        self.ws.put('/raw/a', Value(struct.pack('<d', 2.5)))
+        self.ws.put('/raw/b', Value(struct.pack('<d', -1)))
+        self.ws.put('/text/a', Value('10', encoding=Encoding.STRING))
+        self.ws.put('/text/b', Value(' 25 ', encoding=Encoding.STRING))
+        self.ws.put('/json/a', Value('3', encoding=Encoding.JSON))
+
+    def tearDown(self):
+        self.y.logout()
+
+    def timestamps(self, paths):
+        entries = dict((e.get_path(), e.get_timestamp().time)
+                       for e in self.ws.get('/**?(x=1)'))
+        return [entries[p] for p in paths]
+
+    def test_raw(self):
+        columns = self.ws.get_columns('/raw/*?(x=1)', dtype='<f8')
+        order = numpy.argsort(columns.path)
+        self.assertEqual(list(columns.path[order]), ['/raw/a', '/raw/b'])
+        self.assertEqual(list(columns.timestamp[order]),
+                         self.timestamps(['/raw/a', '/raw/b']))
+        self.assertEqual(list(columns['value'][order]), [2.5, -1])
+        self.assertEqual(len(columns), 2)
+        self.assertFalse(columns.partial)
+        with self.assertRaises(ValueError):
+            self.ws.get_columns('/raw/*?(x=1)', dtype='<f4')
+
+    def test_string_series(self):
+        columns = self.ws.get_columns('/text/*', dtype=numpy.int32)
+        self.assertEqual(columns.value.dtype, numpy.int32)
+        self.assertEqual(sorted(zip(columns.path, columns.timestamp,
+                                    columns.value)),
+                         list(zip(['/text/a', '/text/b'],
+                                  self.timestamps(['/text/a', '/text/b']),
+                                  [10, 25])))
+        columns = self.ws.get_columns('/text/b?(x=1)')
+        self.assertEqual(list(columns.value), [25.0])
+
+    def test_decoded(self):
+        columns = self.ws.get_columns('/json/*?(x=1)')
+        self.assertEqual(list(columns.value), [3.0])
+        self.assertEqual(len(self.ws.get_columns('/none/*')), 0)
+
+    def test_to_numpy(self):
+        results = self.ws.get('/raw/*?(x=1)')
+        columns = results.to_numpy(numpy.float64)
+        self.assertEqual(sorted(zip(columns.path, columns.value)),
+                         [('/raw/a', 2.5), ('/raw/b', -1)])
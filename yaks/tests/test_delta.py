@@ -0,0 +1,103 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import unittest
+from yaks import Value, Change, ChangeKind, Encoding
+from yaks.delta import diff, apply, merge
+
+
+class DeltaTests(unittest.TestCase):
+
+    def test_json_delta(self):
+        old = Value({'a': 1, 'b': {'c': 2, 'd': 3}, 'e': [1, 2]},
+                    encoding=Encoding.JSON)
+        new = Value({'a': 1, 'b': {'c': 4, 'd': 3}, 'f': 'x'},
+                    encoding=Encoding.JSON)
+        delta = diff(old, new)
+        self.assertEqual({'b': {'c': 4}, 'e': None, 'f': 'x'},
+                         delta.get_value())
+        self.assertEqual(new, apply(old, delta))
+
+    def test_json_delta_null(self):
+        old = Value({'a': 1}, encoding=Encoding.JSON)
+        new = Value({'a': None}, encoding=Encoding.JSON)
+        self.assertIsNone(diff(old, new))
+
+    def test_property_delta(self):
+        old = Value({'a': '1', 'b': '2', 'c': '3'},
+                    encoding=Encoding.PROPERTY)
+        new = Value({'a': '1', 'b': '4', 'd': 'x=y'},
+                    encoding=Encoding.PROPERTY)
+        delta = diff(old, new)
+        self.assertEqual(sorted(delta.get_value().split(';')),
+                         ['b=4', 'c', 'd=x=y'])
+        self.assertEqual(new.get_value(), apply(old, delta).get_value())
+        old = Value('a=1;b=2;c=3', encoding=Encoding.PROPERTY)
+        self.assertEqual(new.get_value(), apply(old, delta).get_value())
+
+    def test_raw_delta(self):
+        old = Value(b'0123456789' * 100)
+        new = Value(b'0123456789' * 50 + b'abc' + b'0123456789' * 50)
+        delta = diff(old, new)
+        self.assertLess(len(delta.as_z_payload()), 16)
+        self.assertEqual(new, apply(old, delta))
+        for (o, n) in [(b'', b'abc'), (b'abc', b''), (b'aaa', b'aaaa'),
+                       (b'abcd', b'abcd')]:
+            self.assertEqual(Value(n), apply(Value(o), diff(Value(o),
+                                                            Value(n))))
+        # around the chunks compared at once
+        old = bytes(range(256)) * 64
+        for i in (0, 4095, 4096, 4097, 8191, len(old) - 1):
+            new = bytearray(old)
+            new[i] ^= 0xff
+            delta = diff(Value(old), Value(bytes(new)))
+            self.assertEqual(len(delta.as_z_payload()), 9)
+            self.assertEqual(apply(Value(old), delta), Value(bytes(new)))
+            delta = diff(Value(old), Value(old[:i]))
+            self.assertEqual(apply(Value(old), delta), Value(old[:i]))
+
+    def test_merge(self):
+        values = [
+            ({'a': 1, 'b': {'c': 2, 'd': 3}}, Encoding.JSON),
+            ({'a': 2, 'b': {'c': 2}, 'e': {'f': 1}}, Encoding.JSON),
+            ({'b': {'c': 5}, 'e': {'f': 1, 'g': 2}}, Encoding.JSON),
+            ({'a': '1', 'b': '2'}, Encoding.PROPERTY),
+            ({'a': '3', 'c': '4'}, Encoding.PROPERTY),
+            ({'b': '5', 'c': '4'}, Encoding.PROPERTY)]
+        for i in (0, 3):
+            (v0, v1, v2) = [Value(v, encoding=e) for (v, e)
+                            in values[i:i + 3]]
+            delta = merge(diff(v0, v1), diff(v1, v2))
+            self.assertEqual(apply(v0, delta).get_value(), v2.get_value())
+        # a value set by the first delta and patched by the second one
+        first = Value({'a': 1}, encoding=Encoding.JSON)
+        self.assertIsNone(merge(first, Value({'a': {'b': 1}},
+                                             encoding=Encoding.JSON)))
+        self.assertIsNone(merge(Value(b'ab'), Value(b'cd')))
+
+    def test_unsupported_delta(self):
+        old = Value('a', encoding=Encoding.STRING)
+        self.assertIsNone(diff(old, Value('b', encoding=Encoding.STRING)))
+        self.assertIsNone(diff(old, Value(b'b')))
+        self.assertRaises(ValueError, apply, old, Value(b'b'))
+
+    def test_change_apply_to(self):
+        old = Value({'a': 1}, encoding=Encoding.JSON)
+        delta = Value({'b': 2}, encoding=Encoding.JSON)
+        c = Change('/a', ChangeKind.UPDATE, 0, delta)
+        self.assertEqual({'a': 1, 'b': 2}, c.apply_to(old).get_value())
+        c = Change('/a', ChangeKind.PUT, 0, delta)
+        self.assertEqual(delta, c.apply_to(old))
+        c = Change('/a', ChangeKind.REMOVE, 0)
+        self.assertIsNone(c.apply_to(old))
@@ -0,0 +1,302 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import unittest
+import asyncio
+import contextlib
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from yaks import Workspace, Value
+from yaks.eval import EvalCache, EvalDispatcher
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class EvalRuntime(object):
+    def __init__(self):
+        self.evals = {}
+
+    def declare_eval(self, path, handler):
+        self.evals[path] = handler
+        return path
+
+    def undeclare_eval(self, path):
+        del self.evals[path]
+
+    def query(self, path, props):
+        replies = []
+        self.evals[path](path, props, replies.extend)
+        return replies
+
+    def query_async(self, path, props, callback):
+        self.evals[path](path, props, callback)
+
+
+class EvalCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_ttl(self):
+        cache = EvalCache(10, clock=self.clock)
+        self.assertEqual(cache.get('k', self.compute), 1)
+        self.clock.now = 9
+        self.assertEqual(cache.get('k', self.compute), 1)
+        self.clock.now = 10
+        self.assertEqual(cache.get('k', self.compute), 2)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_lru(self):
+        cache = EvalCache(10, max_entries=2, clock=self.clock)
+        cache.get('a', self.compute)
+        cache.get('b', self.compute)
+        cache.get('a', self.compute)
+        cache.get('c', self.compute)
+        self.assertEqual(cache.get('a', self.compute), 1)
+        self.assertEqual(cache.get('b', self.compute), 4)
+        self.assertEqual(cache.stats()['evictions'], 2)
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_single_flight(self):
+        cache = EvalCache(10)
+
+        def slow():
+            time.sleep(0.2)
+            return self.compute()
+
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda _: cache.get('k', slow),
+                                        range(8)))
+        self.assertEqual(results, [1] * 8)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cache.stats()['shared'], 7)
+
+    def test_error_not_cached(self):
+        cache = EvalCache(10, clock=self.clock)
+
+        def fail():
+            raise RuntimeError('failed')
+
+        self.assertRaises(RuntimeError, cache.get, 'k', fail)
+        self.assertEqual(cache.get('k', self.compute), 1)
+
+
+class RegisterEvalTests(unittest.TestCase):
+
+    def test_cached_eval(self):
+        rt = EvalRuntime()
+        ws = Workspace(rt, '/')
+        calls = []
+
+        def callback(path, args):
+            calls.append(args)
+            return Value(args['x'])
+
+        ws.register_eval('/e', callback, cache_ttl=60)
+        for _ in range(3):
+            replies = rt.query('/e', '(x=1)')
+            self.assertEqual(bytes(replies[0][1][0]), b'1')
+        rt.query('/e', '(x=2)')
+        self.assertEqual(calls, [{'x': '1'}, {'x': '2'}])
+        self.assertEqual(ws.eval_cache_stats('/e')['hits'], 2)
+        ws.unregister_eval('/e')
+        self.assertIsNone(ws.eval_cache_stats('/e'))
+
+    def test_uncached_eval(self):
+        rt = EvalRuntime()
+        ws = Workspace(rt, '/')
+        calls = []
+        ws.register_eval('/e', lambda path, args: calls.append(args)
+                         or Value('v'))
+        rt.query('/e', '(x=1)')
+        rt.query('/e', '(x=1)')
+        self.assertEqual(len(calls), 2)
+        self.assertIsNone(ws.eval_cache_stats('/e'))
+
+    def test_generator_eval(self):
+        rt = EvalRuntime()
+        ws = Workspace(rt, '/')
+
+        def callback(path, args):
+            yield Value('a')
+            yield ('/e/b', Value('b'))
+
+        ws.register_eval('/e', callback, cache_ttl=60)
+        for _ in range(2):
+            replies = rt.query('/e', '')
+            self.assertEqual([(p, bytes(d[0])) for (p, d) in replies],
+                             [('/e', b'a'), ('/e/b', b'b')])
+
+    def test_coroutine_eval(self):
+        rt = EvalRuntime()
+        ws = Workspace(rt, '/')
+
+        async def callback(path, args):
+            await asyncio.sleep(0)
+            return Value(args['x'])
+
+        ws.register_eval('/e', callback)
+        self.assertEqual(bytes(rt.query('/e', '(x=1)')[0][1][0]), b'1')
+
+    def test_shed_queries(self):
+        rt = EvalRuntime()
+        release = threading.Event()
+        with ThreadPoolExecutor(4) as executor:
+            ws = Workspace(rt, '/', executor)
+            ws.register_eval('/e', lambda path, args: release.wait()
+                             and Value('v'), max_concurrency=1,
+                             max_pending=1)
+            replies = []
+            for _ in range(3):
+                rt.query_async('/e', '', replies.append)
+            # the third query is replied at once, without value
+            self.assertEqual(replies, [[]])
+            self.assertEqual(ws.eval_stats('/e'),
+                             {'running': 1, 'pending': 1, 'shed': 1})
+            release.set()
+        self.assertEqual(len(replies), 3)
+        self.assertEqual(ws.eval_stats('/e'),
+                         {'running': 0, 'pending': 0, 'shed': 1})
+
+    def test_shed_queries_default_concurrency(self):
+        rt = EvalRuntime()
+        release = threading.Event()
+        with ThreadPoolExecutor(2) as executor:
+            ws = Workspace(rt, '/', executor)
+            ws.register_eval('/e', lambda path, args: release.wait()
+                             and Value('v'), max_pending=1)
+            replies = []
+            for _ in range(4):
+                rt.query_async('/e', '', replies.append)
+            # one query per thread of the executor is evaluated at once
+            self.assertEqual(ws.eval_stats('/e'),
+                             {'running': 2, 'pending': 1, 'shed': 1})
+            release.set()
+        self.assertEqual(len(replies), 4)
+
+    def test_failing_eval(self):
+        rt = EvalRuntime()
+        ws = Workspace(rt, '/')
+
+        def callback(path, args):
+            raise RuntimeError('eval failure')
+
+        ws.register_eval('/e', callback)
+        # the query is replied without value
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(rt.query('/e', ''), [])
+
+
+class EvalDispatcherTests(unittest.TestCase):
+
+    def test_concurrency(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def task():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.pop()
+
+        with ThreadPoolExecutor(8) as executor:
+            dispatcher = EvalDispatcher(executor.submit, max_concurrency=2)
+            for _ in range(20):
+                self.assertTrue(dispatcher.dispatch(task, None))
+        self.assertEqual(len(peak), 20)
+        self.assertEqual(max(peak), 2)
+
+    def test_pending_requires_concurrency(self):
+        self.assertRaises(ValueError, EvalDispatcher, None, None, 1)
+
+
+class Values(object):
+    # an asynchronous iterator, as an asynchronous generator requires
+    # Python 3.6
+    def __init__(self, values):
+        self.values = iter(values)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0)
+        for v in self.values:
+            return Value(v)
+        raise StopAsyncIteration
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'asyncio.run requires 3.7')
+class AsyncEvalTests(unittest.TestCase):
+
+    def test_async_generator_eval(self):
+        from yaks.asyncworkspace import AsyncWorkspace
+        rt = EvalRuntime()
+        replies = []
+
+        def callback(path, args):
+            return Values(['a', 'b'])
+
+        async def run():
+            ws = AsyncWorkspace(rt, '/', asyncio.get_event_loop())
+            await ws.register_eval('/e', callback, max_concurrency=1,
+                                   max_pending=0)
+            rt.query_async('/e', '', replies.append)
+            rt.query_async('/e', '', replies.append)
+            await asyncio.sleep(0.1)
+
+        asyncio.run(run())
+        self.assertEqual(replies[0], [])
+        self.assertEqual([bytes(d[0]) for (_, d) in replies[1]],
+                         [b'a', b'b'])
+
+    def test_failing_eval(self):
+        from yaks.asyncworkspace import AsyncWorkspace
+        rt = EvalRuntime()
+        replies = []
+
+        async def callback(path, args):
+            raise RuntimeError('eval failure')
+
+        async def run():
+            ws = AsyncWorkspace(rt, '/', asyncio.get_event_loop())
+            await ws.register_eval('/e', callback)
+            rt.query_async('/e', '', replies.append)
+            await asyncio.sleep(0.1)
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            asyncio.run(run())
+        self.assertEqual(replies, [[]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import unittest
+import io
+import logging
+import threading
+from yaks.logger import APILogger
+
+
+class Counted(object):
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return 'counted'
+
+
+class RecordingHandler(logging.StreamHandler):
+    def __init__(self):
+        super(RecordingHandler, self).__init__(io.StringIO())
+        self.threads = set()
+
+    def emit(self, record):
+        self.threads.add(threading.current_thread())
+        super(RecordingHandler, self).emit(record)
+
+
+class APILoggerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = RecordingHandler()
+        self.logger = APILogger(logging.INFO, True, self.handler)
+
+    def tearDown(self):
+        APILogger.stop()
+
+    def test_lazy_formatting(self):
+        arg = Counted()
+        self.logger.debug('test', 'value %s', arg)
+        self.assertEqual(arg.formatted, 0)
+        self.assertFalse(self.logger.is_enabled_for(logging.DEBUG))
+        self.logger.info('test', 'value %s', arg)
+        APILogger.stop()
+        self.assertIn('< test > value counted\n',
+                      self.handler.stream.getvalue())
+        self.assertNotIn(threading.current_thread(), self.handler.threads)
+
+    def test_fields(self):
+        self.logger.warning('ws', '100% put', path='/a/b', op='put',
+                            latency=0.5)
+        APILogger.stop()
+        self.assertIn('< ws > 100% put path=/a/b op=put latency=0.5\n',
+                      self.handler.stream.getvalue())
+
+    def test_disable(self):
+        self.logger.disable()
+        self.logger.error('test', 'hidden')
+        self.logger.enable()
+        APILogger.stop()
+        self.assertEqual(self.handler.stream.getvalue(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import unittest
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from yaks import Yaks, Value, Encoding, ChangeKind
+
+
+class LoopbackTests(unittest.TestCase):
+
+    def setUp(self):
+        # a service per test
+        self.locator = 'mem://{}'.format(uuid.uuid4())
+        self.y = Yaks.login(self.locator)
+        self.admin = self.y.admin()
+        self.admin.add_storage('st', {'selector': '/myyaks/**'})
+        self.ws = self.y.workspace('/myyaks')
+
+    def tearDown(self):
+        self.y.logout()
+
+    def test_login(self):
+        self.assertTrue(self.y.rt.running)
+        self.assertEqual(self.admin.get_storage('st'), 'selector=/myyaks/**')
+        self.assertEqual([stid for (stid, _) in self.admin.get_storages()],
+                         ['st'])
+
+    def test_put_get_remove(self):
+        v = Value('hello!', encoding=Encoding.STRING)
+        self.assertTrue(self.ws.put('key1', v))
+        self.ws.put('/myyaks/a/key2', Value('2', encoding=Encoding.STRING))
+        self.ws.put('/other/key', Value('3', encoding=Encoding.STRING))
+        entry = self.ws.get('key1')[0]
+        self.assertEqual(entry.get_path(), '/myyaks/key1')
+        self.assertEqual(entry.get_value(), v)
+        self.assertEqual(sorted(e.get_path() for e in self.ws.get('**')),
+                         ['/myyaks/a/key2', '/myyaks/key1'])
+        self.assertEqual(self.ws.get('/other/key'), [])
+        self.ws.remove('key1')
+        self.assertEqual(self.ws.get('key1'), [])
+
+    def test_remove_storage(self):
+        self.ws.put('key1', Value('1', encoding=Encoding.STRING))
+        self.assertTrue(self.admin.remove_storage('st'))
+        self.assertEqual(self.ws.get('key1'), [])
+
+    def test_update(self):
+        self.ws.put('doc', Value({'a': 1, 'b': 2}, encoding=Encoding.JSON))
+        self.ws.update('doc', Value({'a': 1, 'b': 3}, encoding=Encoding.JSON))
+        entry = self.ws.get('doc')[0]
+        self.assertEqual(entry.get_value().get_value(), {'a': 1, 'b': 3})
+
+    def test_update_client_deltas(self):
+        received = []
+        done = threading.Event()
+
+        def listener(changes):
+            received.extend(c.get_kind() for c in changes)
+            if len(received) == 4:
+                done.set()
+        self.ws.subscribe('props', listener)
+        for client_deltas in (False, True):
+            self.ws.put('props', Value({'a': '1', 'b': '2'},
+                                       encoding=Encoding.PROPERTY))
+            self.ws.update('props', Value({'a': '1', 'b': '3'},
+                                          encoding=Encoding.PROPERTY),
+                           client_deltas=client_deltas)
+        self.assertTrue(done.wait(1))
+        # sent as a delta on request only
+        self.assertEqual(received, [ChangeKind.PUT, ChangeKind.PUT,
+                                    ChangeKind.PUT, ChangeKind.UPDATE])
+        entry = self.ws.get('props')[0]
+        self.assertEqual(sorted(entry.get_value().get_value().split(';')),
+                         ['a=1', 'b=3'])
+
+    def test_update_after_put(self):
+        # the put in between is the base of the second update
+        self.ws.update('doc', Value({'x': 1, 'y': 1}, encoding=Encoding.JSON))
+        self.ws.put('doc', Value({'x': 5, 'y': 5, 'z': 5},
+                                 encoding=Encoding.JSON))
+        self.ws.put_many([('doc', Value({'x': 6, 'y': 6, 'z': 6},
+                                        encoding=Encoding.JSON))])
+        self.ws.update('doc', Value({'x': 1, 'y': 2, 'z': 6},
+                                    encoding=Encoding.JSON))
+        entry = self.ws.get('doc')[0]
+        self.assertEqual(entry.get_value().get_value(),
+                         {'x': 1, 'y': 2, 'z': 6})
+
+    def test_update_bases_bound(self):
+        self.ws.MAX_UPDATE_BASES = 2
+        for path in ('a', 'b', 'c', 'b'):
+            self.ws.update(path, Value({'v': path}, encoding=Encoding.JSON))
+        self.assertEqual(list(self.ws.update_bases),
+                         ['/myyaks/c', '/myyaks/b'])
+
+    def test_sessions(self):
+        y2 = Yaks.login(self.locator)
+        ws2 = y2.workspace('/myyaks')
+        received = []
+        done = threading.Event()
+
+        def listener(changes):
+            received.extend(changes)
+            if len(received) == 2:
+                done.set()
+
+        ws2.subscribe('**', listener)
+        self.ws.put('k', Value('1', encoding=Encoding.STRING))
+        self.ws.remove('k')
+        self.assertTrue(done.wait(1))
+        self.assertEqual([c.get_kind() for c in received],
+                         [ChangeKind.PUT, ChangeKind.REMOVE])
+        y2.logout()
+        self.assertEqual(self.y.rt.service.subscribers, {})
+
+    def test_eval(self):
+        y2 = Yaks.login(self.locator)
+        ws2 = y2.workspace('/', ThreadPoolExecutor(2))
+        self.ws.put('name', Value('Bob', encoding=Encoding.STRING))
+
+        def callback(path, props):
+            name = ws2.get('/myyaks/name')[0].get_value().get_value()
+            return Value('{} {}'.format(props['greet'], name),
+                         encoding=Encoding.STRING)
+
+        ws2.register_eval('/myyaks/eval', callback)
+        entries = self.ws.get('eval?(greet=Hi)', timeout=1)
+        self.assertEqual([e.get_value().get_value() for e in entries],
+                         ['Hi Bob'])
+        y2.logout()
+        self.assertEqual(self.ws.get('eval?(greet=Hi)', timeout=1), [])
+
+    def test_isolated_services(self):
+        y2 = Yaks.login('mem://{}'.format(uuid.uuid4()))
+        self.ws.put('k', Value('1', encoding=Encoding.STRING))
+        self.assertEqual(y2.workspace('/').get('/myyaks/k'), [])
+        y2.logout()
+
+
+if __name__ == '__main__':
+    unittest.main()
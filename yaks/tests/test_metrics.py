@@ -0,0 +1,123 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import unittest
+import json
+import os
+import tempfile
+import threading
+import urllib.request
+import uuid
+from yaks import Yaks, Value, Encoding
+from yaks.metrics import Metrics, PrometheusExporter, JSONExporter
+
+
+def sample(snapshot, name, **labels):
+    for s in snapshot[name]['samples']:
+        if s['labels'] == labels:
+            return s
+    return None
+
+
+class MetricsTests(unittest.TestCase):
+
+    def test_counter_histogram(self):
+        m = Metrics()
+        m.counter('c', 'a counter', op='x').inc()
+        m.counter('c', op='x').inc(2)
+        h = m.histogram('h', 'a histogram', buckets=(1, 10))
+        for v in [0.5, 1, 5, 50]:
+            h.observe(v)
+        snapshot = m.snapshot()
+        self.assertEqual(sample(snapshot, 'c', op='x')['value'], 3)
+        self.assertEqual(sample(snapshot, 'h'),
+                         {'count': 4, 'sum': 56.5,
+                          'buckets': [[1, 2], [10, 3]], 'labels': {}})
+        self.assertRaises(ValueError, m.histogram, 'c')
+
+    def test_prometheus(self):
+        m = Metrics()
+        m.counter('c', 'a counter', op='x').inc()
+        m.histogram('h', 'a histogram', buckets=(1,)).observe(2)
+        text = PrometheusExporter(m).render()
+        self.assertIn('# TYPE c counter\nc{op="x"} 1\n', text)
+        self.assertIn('h_bucket{le="1.0"} 0\nh_bucket{le="+Inf"} 1\n'
+                      'h_sum 2\nh_count 1\n', text)
+
+    def test_exporters(self):
+        m = Metrics()
+        m.counter('c').inc()
+        path = os.path.join(tempfile.mkdtemp(), 'metrics.json')
+        JSONExporter(m).write(path)
+        with open(path) as f:
+            self.assertEqual(json.load(f)['c']['samples'][0]['value'], 1)
+        server = PrometheusExporter(m).serve(0)
+        try:
+            url = 'http://127.0.0.1:{}/metrics'.format(
+                server.server_address[1])
+            with urllib.request.urlopen(url) as r:
+                self.assertIn('c 1', r.read().decode())
+        finally:
+            server.shutdown()
+
+
+class WorkspaceMetricsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.y = Yaks.login('mem://{}'.format(uuid.uuid4()))
+        self.y.admin().add_storage('st', {'selector': '/m/**'})
+        self.ws = self.y.workspace('/m')
+
+    def tearDown(self):
+        self.y.logout()
+
+    def test_disabled(self):
+        self.ws.put('k', Value('v'))
+        self.ws.get('k')
+        self.assertEqual(
+            sample(self.y.metrics(), 'yaks_operations_total',
+                   op='put')['value'], 0)
+
+    def test_operations(self):
+        self.y.enable_metrics()
+        done = threading.Event()
+        self.ws.subscribe('**', lambda changes: done.set())
+        self.ws.register_eval('/m/e', lambda path, props: Value('e'))
+        self.ws.put('k', Value('value'))
+        self.ws.put_many([('k1', Value('1')), ('k2', Value('2'))])
+        self.assertEqual(len(self.ws.get('k')), 1)
+        self.assertEqual(len(self.ws.get('e')), 1)
+        self.assertTrue(done.wait(1))
+        self.ws.remove('k')
+        snapshot = self.y.metrics()
+        for (op, count) in [('put', 1), ('put_many', 1), ('get', 2),
+                            ('remove', 1)]:
+            self.assertEqual(sample(snapshot, 'yaks_operations_total',
+                                    op=op)['value'], count)
+            self.assertEqual(sample(snapshot, 'yaks_operation_seconds',
+                                    op=op)['count'], count)
+        self.assertEqual(sample(snapshot, 'yaks_put_bytes_total')['value'], 7)
+        self.assertEqual(sample(snapshot, 'yaks_encode_seconds')['count'], 1)
+        self.assertEqual(sample(snapshot, 'yaks_received_total',
+                                kind='reply')['value'], 2)
+        self.assertGreaterEqual(sample(snapshot, 'yaks_received_total',
+                                       kind='change')['value'], 1)
+        self.assertGreaterEqual(
+            sample(snapshot, 'yaks_listener_seconds')['count'], 1)
+        self.assertEqual(sample(snapshot, 'yaks_evals_total')['value'], 1)
+        self.assertEqual(sample(snapshot, 'yaks_eval_seconds')['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
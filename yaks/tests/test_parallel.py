@@ -0,0 +1,129 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import multiprocessing
+import threading
+import time
+import unittest
+import uuid
+from yaks import Yaks, Value, Encoding
+from yaks.parallel import RingBuffer, ShardedSubscriber, ShardedPublisher, \
+    _publisher, shared_memory
+
+
+def _handler(change):
+    return '{}={}'.format(change.get_path(),
+                          change.get_value().get_value()).encode()
+
+
+def _put_values(y):
+    # the workers put on their own in-process service
+    ws = y.workspace('/test')
+    ws.put('a', Value('1', encoding=Encoding.STRING))
+    ws.put('b', Value('2', encoding=Encoding.STRING))
+
+
+@unittest.skipIf(shared_memory is None, 'Python 3.8 is required')
+class RingBufferTests(unittest.TestCase):
+
+    lock = None
+
+    def setUp(self):
+        self.ring = RingBuffer(64, lock=self.lock)
+        self.reader = RingBuffer.attach(self.ring.name, self.ring.capacity,
+                                        self.lock)
+
+    def tearDown(self):
+        self.reader.close()
+        self.ring.close()
+
+    def test_put_get(self):
+        self.assertIsNone(self.reader.get())
+        self.assertTrue(self.ring.try_put(b'hello'))
+        self.assertTrue(self.ring.try_put(b''))
+        self.assertEqual(self.reader.get(), b'hello')
+        self.assertEqual(self.reader.get(), b'')
+        self.assertIsNone(self.reader.get())
+        with self.assertRaises(ValueError):
+            self.ring.try_put(b'x' * 61)
+
+    def test_wrap_around(self):
+        for i in range(100):
+            record = bytes([i]) * (i % 20)
+            self.assertTrue(self.ring.try_put(record))
+            self.assertEqual(self.reader.get(), record)
+
+    def test_full(self):
+        # 4 records of 16 bytes with their length
+        for i in range(4):
+            self.assertTrue(self.ring.try_put(bytes([i]) * 12))
+        self.assertFalse(self.ring.try_put(b'x'))
+        self.assertFalse(self.ring.put(b'x', timeout=0.01))
+        self.assertEqual(self.reader.get(), bytes([0]) * 12)
+        self.assertTrue(self.ring.put(b'x', timeout=0.01))
+        self.assertEqual(len(self.ring), 56)
+
+
+class LockedRingBufferTests(RingBufferTests):
+    # the positions under a lock, as on the CPUs other than x86
+
+    lock = multiprocessing.get_context('spawn').Lock()
+
+
+@unittest.skipIf(shared_memory is None, 'Python 3.8 is required')
+class ShardedTests(unittest.TestCase):
+
+    def test_subscriber(self):
+        results = []
+        with ShardedSubscriber('mem://', ['/test/**', '/other/**'], _handler,
+                               results.extend, workers=2,
+                               initializer=_put_values) as subscriber:
+            self.assertEqual(subscriber.shards, [['/test/**'], ['/other/**']])
+            deadline = time.monotonic() + 10
+            while len(results) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(sorted(results), [b'/test/a=1', b'/test/b=2'])
+        self.assertEqual(subscriber.received, 2)
+
+    def test_publisher(self):
+        # runs the worker of a publisher as a thread of this process
+        locator = 'mem://{}'.format(uuid.uuid4())
+        y = Yaks.login(locator)
+        y.admin().add_storage('st', {'selector': '/test/**'})
+        ring = RingBuffer(1024)
+        ready = threading.Semaphore(0)
+        stop = threading.Event()
+        worker = threading.Thread(target=_publisher, args=(
+            locator, None, None, ring.name, ring.capacity, None, ready,
+            stop))
+        worker.start()
+        self.assertTrue(ready.acquire(timeout=5))
+        publisher = ShardedPublisher(locator, workers=1)
+        publisher.workers.rings = [ring]
+        for i in range(10):
+            publisher.put('/test/{}'.format(i % 3),
+                          Value(str(i), encoding=Encoding.STRING))
+        publisher.put('/test/raw', Value(b'\x00\x01'))
+        stop.set()
+        worker.join()
+        ring.close()
+        entries = y.workspace('/test').get('*')
+        self.assertEqual(sorted((e.get_path(), e.get_value().get_value())
+                                for e in entries
+                                if e.get_path() != '/test/raw'),
+                         [('/test/0', '9'), ('/test/1', '7'),
+                          ('/test/2', '8')])
+        raw = y.workspace('/test').get('raw')[0].get_value().get_value()
+        self.assertEqual(bytes(raw), b'\x00\x01')
+        y.logout()
@@ -0,0 +1,100 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import threading
+import unittest
+import uuid
+from yaks import Yaks, Value, Encoding
+from yaks.pool import RuntimePool
+
+
+class PoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.locator = 'mem://{}'.format(uuid.uuid4())
+        self.y = Yaks.login([self.locator], sessions=4)
+        self.y.admin().add_storage('st', {'selector': '/pool/**'})
+
+    def tearDown(self):
+        self.y.logout()
+
+    def test_login(self):
+        self.assertIsInstance(self.y.rt, RuntimePool)
+        self.assertEqual(len(self.y.rt.runtimes), 4)
+        self.assertEqual(len(set(rt.service for rt in self.y.rt.runtimes)),
+                         1)
+        y = Yaks.login(self.locator, sessions=1)
+        self.assertNotIsInstance(y.rt, RuntimePool)
+        y.logout()
+
+    def test_path_order(self):
+        ws = self.y.workspace('/pool')
+        received = []
+        done = threading.Event()
+
+        def listener(changes):
+            for change in changes:
+                received.append((change.get_path(),
+                                 change.get_value().get_value()))
+            if len(received) == 400:
+                done.set()
+        sid = ws.subscribe('/pool/**', listener)
+        for i in range(100):
+            for path in ('a', 'b', 'c', 'd'):
+                ws.put(path, Value(str(i), encoding=Encoding.STRING))
+        self.assertTrue(done.wait(5))
+        for path in ('a', 'b', 'c', 'd'):
+            self.assertEqual(
+                [v for (p, v) in received if p == '/pool/' + path],
+                [str(i) for i in range(100)])
+        self.assertEqual(len(ws.get('/pool/*')), 4)
+        ws.unsubscribe(sid)
+        self.assertEqual(self.y.rt.subscribers, {})
+
+    def test_get_after_put(self):
+        # a get on a path goes through the session of its puts
+        used = []
+        for rt in self.y.rt.runtimes:
+            for op in ('write_data', 'query'):
+                def spy(*args, rt=rt, op=op, f=getattr(rt, op)):
+                    used.append((op, rt))
+                    return f(*args)
+                setattr(rt, op, spy)
+        ws = self.y.workspace('/pool')
+        for path in ('a', 'b', 'c', 'd', 'e'):
+            ws.put(path, Value(path, encoding=Encoding.STRING))
+            self.assertEqual(ws.get(path)[0].get_value().get_value(), path)
+            self.assertEqual([op for (op, _) in used], ['write_data', 'query'])
+            self.assertIs(used[0][1], used[1][1])
+            used.clear()
+
+    def test_eval(self):
+        ws = self.y.workspace('/pool')
+        ws.register_eval('e', lambda path, props: Value(
+            'ok', encoding=Encoding.STRING))
+        for _ in range(4):
+            entries = ws.get('/pool/e', timeout=1)
+            self.assertEqual(entries[0].get_value().get_value(), 'ok')
+        ws.unregister_eval('e')
+        self.assertEqual(self.y.rt.evals, {})
+
+    def test_balance_workspace(self):
+        y = Yaks.login(self.locator, sessions=3, balance='workspace')
+        runtimes = [y.workspace('/pool').rt for _ in range(3)]
+        self.assertEqual(sorted(map(id, runtimes)),
+                         sorted(map(id, y.rt.runtimes)))
+        y.logout()
+        self.assertFalse(y.rt.running)
+        with self.assertRaises(ValueError):
+            RuntimePool(runtimes, 'random')
@@ -13,7 +13,10 @@
 # Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
 
 import unittest
+import re
+import timeit
 from yaks import Selector
+from yaks.selector import SelectorIndex
 from yaks import Path
 from yaks.exceptions import *
 
@@ -107,3 +110,94 @@ class SelectorTests(unittest.TestCase):
     def test_selector_check_ko_1(self):
         self.assertRaises(ValidationError, Selector,
                           '//this/is/a/not/selector')
+
+    def test_selector_matches(self):
+        s = Selector('/this/is/a/*/selector')
+        self.assertTrue(s.matches('/this/is/a/wildcard/selector'))
+        self.assertTrue(s.matches(Path('/this/is/a//selector')))
+        self.assertFalse(s.matches('/this/is/a/wild/card/selector'))
+        s = Selector('/this/is/**/selector?x>10')
+        self.assertTrue(s.matches('/this/is/selector'))
+        self.assertTrue(s.matches('/this/is/a/wild/card/selector'))
+        self.assertFalse(s.matches('/this/is/a/selector/not'))
+        s = Selector('/this/is/a/s*r')
+        self.assertTrue(s.matches('/this/is/a/selector'))
+        self.assertFalse(s.matches('/this/is/a/sel/ector'))
+
+    def test_to_selector_interned(self):
+        s = '/this/is/an/interned/selector?x>10(x.y.z=100)#field'
+        self.assertIs(Selector.to_selector(s), Selector.to_selector(s))
+        self.assertIsNot(Selector(s), Selector(s))
+        self.assertRaises(ValidationError, Selector.to_selector,
+                          '//this/is/a/not/selector')
+
+    def test_selector_parse_speedup(self):
+        # the selector construction used to compile its regex and to run
+        # it twice per instance
+        class UncachedSelector(object):
+            def __init__(self, selector):
+                regex = re.compile(
+                    '^([^?#]+)(\?([^\[()\]#]*)(\((.*)\))?)?(\#(.*))?$')
+                if regex.match(selector) is None \
+                        or selector.startswith('//'):
+                    raise ValidationError(selector)
+                res = regex.match(selector)
+                self.selector = selector
+                self.path = res.group(1) or None
+                self.predicate = res.group(3) or None
+                self.properties = res.group(5) or None
+                self.fragment = res.group(7) or None
+                self.optional_part = \
+                    (res.group(2) or "?")[1:] + (res.group(6) or "")
+
+        s = '/this/is/a/**?x>10(starttime=0;stoptime=10)#field'
+        uncached = min(timeit.repeat(lambda: UncachedSelector(s),
+                                     number=2000, repeat=5))
+        cached = min(timeit.repeat(lambda: Selector(s),
+                                   number=2000, repeat=5))
+        interned = min(timeit.repeat(lambda: Selector.to_selector(s),
+                                     number=2000, repeat=5))
+        self.assertLess(cached, uncached)
+        self.assertLess(interned, uncached)
+
+
+class SelectorIndexTests(unittest.TestCase):
+
+    def test_index_match(self):
+        index = SelectorIndex()
+        index.add('/fleet/**')
+        index.add('/fleet/*/temp', 'temp')
+        index.add('/fleet/robot1/**/pos')
+        index.add('/other/*')
+        self.assertEqual(len(index), 4)
+        self.assertEqual(
+            sorted(str(s) for s in index.match('/fleet/robot1/temp')),
+            ['/fleet/**', 'temp'])
+        self.assertEqual(
+            sorted(str(s) for s in index.match('/fleet/robot1/arm/pos')),
+            ['/fleet/**', '/fleet/robot1/**/pos'])
+        self.assertEqual(index.match('/unknown/path'), [])
+
+    def test_index_same_as_matches(self):
+        selectors = ['/a/**', '/a/*/c', '/**/c', '/a/b*/**/c', '/*/*',
+                     '/a/**/**/c', '/b/c', '/**']
+        paths = ['/a', '/a/b', '/a/b/c', '/a/bb/x/c', '/b/c', '/c',
+                 '/a/x/y/z']
+        index = SelectorIndex()
+        for s in selectors:
+            index.add(s)
+        for p in paths:
+            expected = sorted(s for s in selectors if Selector(s).matches(p))
+            self.assertEqual(sorted(str(s) for s in index.match(p)),
+                             expected)
+
+    def test_index_remove(self):
+        index = SelectorIndex()
+        index.add('/a/*/c', 1)
+        index.add('/a/*/c', 2)
+        self.assertTrue(index.remove('/a/*/c', 1))
+        self.assertEqual(index.match('/a/b/c'), [2])
+        self.assertTrue(index.remove('/a/*/c'))
+        self.assertFalse(index.remove('/a/*/c'))
+        self.assertEqual(len(index), 0)
+        self.assertTrue(index.root.is_empty())
@@ -0,0 +1,107 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import unittest
+import zenoh
+from yaks import Workspace
+from yaks.series import Downsampler
+from yaks.tests.fakes import Reply
+
+
+class HistoryRuntime(object):
+    '''
+    Replies to each query with all the samples of a history, twice as if
+    returned by two storages, and records the queries.
+    '''
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.queries = []
+
+    def query(self, path, optional_part, callback):
+        self.queries.append((path, optional_part))
+        for _ in range(2):
+            for (rname, seconds, value) in self.samples:
+                # NTP64 times
+                callback(Reply(zenoh.Z_STORAGE_DATA, rname,
+                               str(value).encode(), int(seconds * (1 << 32))))
+        callback(Reply(zenoh.Z_REPLY_FINAL))
+
+
+class SeriesTests(unittest.TestCase):
+
+    def setUp(self):
+        samples = [('/s/t', 100 + i * 0.5, i) for i in range(20)]
+        samples.append(('/s/h', 101.25, 'not a number'))
+        samples.append(('/s/h', 102.25, 7))
+        self.rt = HistoryRuntime(samples)
+        self.ws = Workspace(self.rt, '/s')
+
+    def test_get_series(self):
+        series = self.ws.get_series('*?(unit=C)', start=100, stop=105,
+                                    step=2, agg=['min', 'max', 'mean',
+                                                 'last', 'count'])
+        self.assertEqual(self.rt.queries, [(
+            '/s/*',
+            '(unit=C;starttime=100.0;stoptime=105.0;step=2.0;'
+            'agg=min,max,mean,last,count)')])
+        self.assertEqual(sorted(series), ['/s/h', '/s/t'])
+        t = series['/s/t']
+        self.assertEqual(len(t), 3)
+        self.assertEqual(list(t['time']), [100, 102, 104])
+        self.assertEqual(list(t['min']), [0, 4, 8])
+        self.assertEqual(list(t['max']), [3, 7, 9])
+        self.assertEqual(list(t['mean']), [1.5, 5.5, 8.5])
+        self.assertEqual(list(t['last']), [3, 7, 9])
+        # the duplicates of the second storage are dropped
+        self.assertEqual(list(t.count), [4, 4, 2])
+        h = series['/s/h']
+        self.assertEqual(list(h.time), [102])
+        self.assertEqual(list(h.mean), [7])
+
+    def test_get_series_unbounded(self):
+        series = self.ws.get_series('/s/t', step=10, agg='last')
+        self.assertEqual(self.rt.queries[0][1], '(step=10.0;agg=last)')
+        self.assertEqual(list(series['/s/t'].time), [100])
+        self.assertEqual(list(series['/s/t'].last), [19])
+
+    def test_downsampler(self):
+        with self.assertRaises(ValueError):
+            Downsampler(None, None, 0)
+        with self.assertRaises(ValueError):
+            Downsampler(None, None, 1, ['median'])
+        d = Downsampler(None, None, 1, ['last', 'count'])
+        # out of order samples: last is the one with the latest time
+        d.add('/a', 3.5, 2)
+        d.add('/a', 3.2, 1)
+        d.add('/a', 1.0, 5)
+        series = d.series()['/a']
+        self.assertEqual(list(series.time), [1, 3])
+        self.assertEqual(list(series.last), [5, 2])
+        self.assertEqual(list(series.count), [1, 2])
+
+    def test_downsampler_duplicates(self):
+        d = Downsampler(None, None, 1, ['count'], horizon=1)
+        for t in range(10):
+            d.add('/a', t, 1, timestamp=t)
+            d.add('/a', t, 1, timestamp=t)
+            if t > 0:
+                # a duplicate of the previous window, within the horizon
+                d.add('/a', t - 1, 1, timestamp=t - 1)
+        self.assertEqual(list(d.series()['/a'].count), [1] * 10)
+        # only the timestamps of the latest windows are kept
+        self.assertEqual(sorted(d.seen['/a'][1]), [8, 9])
+        # beyond the horizon, the window is complete
+        d.add('/a', 0, 1, timestamp=0)
+        self.assertEqual(d.series()['/a'].count[0], 2)
@@ -0,0 +1,153 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import mmap
+import threading
+import unittest
+import uuid
+from unittest import mock
+import yaks.shm
+from yaks import Yaks, Value, Encoding
+
+
+@unittest.skipIf(yaks.shm.shared_memory is None,
+                 'Shared memory requires Python 3.8')
+class SharedMemoryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.y = Yaks.login('mem://{}'.format(uuid.uuid4()))
+        self.y.admin().add_storage('st', {'selector': '/shm/**'})
+        self.ws = self.y.workspace('/shm')
+        self.ws.enable_shared_memory(threshold=16, keep=2)
+
+    def tearDown(self):
+        self.ws.enable_shared_memory(False)
+        self.y.logout()
+
+    def subscribe(self, selector, shared=True):
+        # the changes received until the put of /shm/end
+        received = []
+        done = threading.Event()
+
+        def listener(changes):
+            for change in changes:
+                if change.get_path() == '/shm/end':
+                    done.set()
+                else:
+                    received.append((change.get_path(),
+                                     change.get_value().get_value()))
+        sid = self.ws.subscribe(selector, listener, shared=shared)
+        return (sid, received, done)
+
+    def end(self, sid, done):
+        self.ws.put('end', Value(b'end'))
+        self.assertTrue(done.wait(5))
+        self.ws.unsubscribe(sid)
+
+    def test_same_host(self):
+        (sid, received, done) = self.subscribe('/shm/*')
+        data = bytes(range(256)) * 4
+        self.ws.put('big', Value(data))
+        self.ws.put('small', Value(b'abc'))
+        self.ws.put('text', Value('x' * 100, encoding=Encoding.STRING))
+        self.end(sid, done)
+        self.assertEqual(self.ws.shared_subscribers, {})
+        # each value once
+        self.assertEqual([p for (p, _) in received],
+                         ['/shm/big', '/shm/small', '/shm/text'])
+        values = dict(received)
+        mapped = values['/shm/big']
+        self.assertIsInstance(mapped, memoryview)
+        self.assertIsInstance(mapped.obj, mmap.mmap)
+        self.assertTrue(mapped.readonly)
+        self.assertEqual(mapped, data)
+        self.assertEqual(values['/shm/small'], b'abc')
+        self.assertEqual(values['/shm/text'], 'x' * 100)
+
+    def test_opt_in(self):
+        service = self.y.rt.service
+        (sid, received, done) = self.subscribe('/shm/*', shared=False)
+        self.assertEqual(len(service.subscribers), 1)
+        self.ws.put('big', Value(b'b' * 32))
+        self.end(sid, done)
+        self.assertEqual(len(received), 1)
+        self.assertNotIsInstance(received[0][1].obj, mmap.mmap)
+        self.assertEqual(received[0][1], b'b' * 32)
+        sid = self.ws.subscribe('/shm/*', lambda changes: None,
+                                shared=True)
+        self.assertEqual(len(service.subscribers), 2)
+        self.ws.unsubscribe(sid)
+        self.assertEqual(service.subscribers, {})
+
+    def test_stored(self):
+        self.y.admin().add_storage('all', {'selector': '/**'})
+        (sid, received, done) = self.subscribe('/**', shared=False)
+        self.ws.put('big', Value(b'b' * 32))
+        self.end(sid, done)
+        # the handles are filtered out of the subscriptions
+        self.assertEqual([p for (p, _) in received], ['/shm/big'])
+        entries = self.ws.get('/shm/big')
+        self.assertEqual(entries[0].get_value().get_value(), b'b' * 32)
+
+    def test_remote(self):
+        # the copy of a value of another host is delivered
+        (sid, received, done) = self.subscribe('/shm/*')
+        with mock.patch('yaks.shm.HOST_ID', b'\x01' * 16):
+            self.ws.put('big', Value(b'y' * 100))
+        self.end(sid, done)
+        self.assertEqual(len(received), 1)
+        self.assertNotIsInstance(received[0][1].obj, mmap.mmap)
+        self.assertEqual(received[0][1], b'y' * 100)
+
+    def test_keep(self):
+        self.ws.enable_shared_memory(threshold=16, keep=2, max_segments=3)
+        for i in range(3):
+            self.ws.put('a', Value(bytes([i]) * 32))
+        self.assertEqual(len(self.ws.shm.names), 2)
+        self.ws.put_many([('b', Value(b'b' * 32)), ('c', Value(b'c' * 32))])
+        self.assertEqual(sorted(self.ws.shm.segments),
+                         ['/shm/a', '/shm/b', '/shm/c'])
+        self.assertEqual(len(self.ws.shm.names), 3)
+
+    def test_invalid_handle(self):
+        handle = self.ws.shm.handle('/shm/big', b'z' * 32)
+        (host, token, size, name) = yaks.shm.parse_handle(handle)
+        # another token or a truncated handle is refused
+        self.assertIsNone(yaks.shm.map_handle(
+            handle.replace(token, b'\x00' * 16)))
+        self.assertIsNone(yaks.shm.map_handle(handle[:-1]))
+        self.assertEqual(yaks.shm.map_handle(handle), b'z' * 32)
+        self.ws.enable_shared_memory(False)
+        self.assertIsNone(yaks.shm.map_handle(handle))
+
+    def test_receiver(self):
+        receiver = yaks.shm.SharedReceiver()
+        handle = self.ws.shm.handle('/shm/a', b'a' * 32)
+        # a copy received before its handle
+        self.assertTrue(receiver.receive_copy('/shm/a', b'a' * 32))
+        self.assertIsNone(receiver.receive_handle('/shm/a', handle))
+        # a handle received before its copy
+        self.assertEqual(receiver.receive_handle('/shm/a', handle),
+                         b'a' * 32)
+        self.assertTrue(receiver.receive_copy('/shm/a', b'b' * 32))
+        self.assertFalse(receiver.receive_copy('/shm/a', b'a' * 32))
+        self.assertEqual(receiver.pending, {'/shm/a': mock.ANY})
+        self.assertEqual(len(receiver.pending['/shm/a']), 1)
+
+    def test_covers_shared(self):
+        self.assertTrue(yaks.shm.covers_shared('/**'))
+        self.assertTrue(yaks.shm.covers_shared('/*/yaks/**'))
+        self.assertTrue(yaks.shm.covers_shared('/@/yaks/shm/data/a'))
+        self.assertFalse(yaks.shm.covers_shared('/shm/**'))
+        self.assertFalse(yaks.shm.covers_shared('/*/yaks'))
@@ -18,6 +18,11 @@ from yaks.encoding import *
 from yaks.exceptions import ValidationError
 
 
+class ZInfo(object):
+    def __init__(self, encoding):
+        self.encoding = encoding
+
+
 class ValueTests(unittest.TestCase):
 
     def test_raw_value_str(self):
@@ -86,3 +91,74 @@ class ValueTests(unittest.TestCase):
         self.assertEqual(ChangeKind.PUT, c.get_kind())
         self.assertEqual(v1, c.get_value())
         self.assertEqual(1234, c.get_time())
+
+    def test_from_z_resource_raw_zero_copy(self):
+        buf = bytearray(b'some raw payload')
+        info = ZInfo(Encoding.to_z_encoding(Encoding.RAW))
+        v = Value.from_z_resource(buf, info)
+        self.assertIsInstance(v.get_value(), memoryview)
+        self.assertEqual(b'some raw payload', v.get_value())
+        buf[0:4] = b'SOME'
+        self.assertEqual(b'SOME raw payload', v.get_value())
+        c = v.copy()
+        buf[0:4] = b'some'
+        self.assertEqual(b'SOME raw payload', c.get_value())
+        self.assertEqual(Encoding.RAW, c.get_encoding())
+
+    def test_from_z_resource_lazy_decoding(self):
+        info = ZInfo(Encoding.to_z_encoding(Encoding.JSON))
+        v = Value.from_z_resource(b'{"this": "is", "a": "json value"}', info)
+        self.assertEqual(b'{"this": "is", "a": "json value"}',
+                         v.as_z_payload())
+        self.assertEqual({'this': 'is', 'a': 'json value'}, v.get_value())
+        info = ZInfo(Encoding.to_z_encoding(Encoding.STRING))
+        v = Value.from_z_resource(b'test string value', info)
+        self.assertEqual(Value('test string value', Encoding.STRING), v)
+        self.assertEqual('test string value', v.copy().get_value())
+
+    def test_from_z_resource_property(self):
+        info = ZInfo(Encoding.to_z_encoding(Encoding.PROPERTY))
+        v = Value.from_z_resource(b'selector=/demo/**', info)
+        self.assertEqual('selector=/demo/**', v.get_value())
+        self.assertEqual(b'selector=/demo/**', v.as_z_payload())
+
+    def test_payload_encoded_once(self):
+        v = Value({'this': 'is', 'a': 'json value'}, encoding=Encoding.JSON)
+        self.assertIs(v.as_z_payload(), v.as_z_payload())
+        v = Value('test string value', encoding=Encoding.STRING)
+        self.assertIs(v.as_z_payload(), v.as_z_payload())
+        self.assertEqual(b'test string value', v.as_z_payload())
+
+    def test_decoded_value_memoized(self):
+        info = ZInfo(Encoding.to_z_encoding(Encoding.JSON))
+        v = Value.from_z_resource(b'{"a": [1, 2]}', info)
+        self.assertIs(v.get_value(), v.get_value())
+
+    def test_json_codecs(self):
+        d = {'this': 'is', 'a': ['json', 'value']}
+        default = get_codec(Encoding.JSON)
+        try:
+            for name in JSON_CODECS:
+                register_codec(Encoding.JSON, name)
+                v = Value(d, encoding=Encoding.JSON)
+                info = ZInfo(Encoding.to_z_encoding(Encoding.JSON))
+                r = Value.from_z_resource(v.as_z_payload(), info)
+                self.assertEqual(d, r.get_value())
+                self.assertEqual(v, r)
+        finally:
+            register_codec(Encoding.JSON, default)
+        self.assertRaises(ValueError, register_codec, Encoding.JSON, 'nope')
+
+    def test_custom_codec(self):
+        default = get_codec(Encoding.STRING)
+        try:
+            register_codec(Encoding.STRING, Codec(
+                'upper', lambda v: v.upper().encode(),
+                lambda buf: str(buf, 'utf-8').lower()))
+            v = Value('test string value', encoding=Encoding.STRING)
+            self.assertEqual(b'TEST STRING VALUE', v.as_z_payload())
+            info = ZInfo(Encoding.to_z_encoding(Encoding.STRING))
+            r = Value.from_z_resource(v.as_z_payload(), info)
+            self.assertEqual('test string value', r.get_value())
+        finally:
+            register_codec(Encoding.STRING, default)
@@ -0,0 +1,98 @@
+# Copyright (c) 2018 ADLINK Technology Inc.
+#
+# See the NOTICE file(s) distributed with this work for additional
+# information regarding copyright ownership.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# http://www.eclipse.org/legal/epl-2.0, or the Apache License, Version 2.0
+# which is available at https://www.apache.org/licenses/LICENSE-2.0.
+#
+# SPDX-License-Identifier: EPL-2.0 OR Apache-2.0
+#
+# Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Tests
+
+import unittest
+import threading
+import time
+import zenoh
+from yaks import Workspace
+from yaks.exceptions import QueryTimeoutError
+from yaks.tests.fakes import Reply
+
+
+class DelayedRuntime(object):
+    '''
+    Replies to each query from another thread, after a delay, with the
+    data whose path starts with the queried path. The delay of some queried
+    paths can be overridden with ``delays``.
+    '''
+
+    def __init__(self, data, delay, delays=None):
+        self.data = data
+        self.delay = delay
+        self.delays = {} if delays is None else delays
+
+    def query(self, path, optional_part, callback):
+        prefix = path.split('*')[0]
+        delay = self.delays.get(prefix, self.delay)
+
+        def reply():
+            time.sleep(delay)
+            for (rname, value, t) in self.data:
+                if rname.startswith(prefix):
+                    callback(Reply(zenoh.Z_STORAGE_DATA, rname, value, t))
+            callback(Reply(zenoh.Z_REPLY_FINAL))
+        threading.Thread(target=reply, daemon=True).start()
+
+
+class WorkspaceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.rt = DelayedRuntime([('/a/x', b'1', 1),
+                                  ('/a/x', b'2', 2),
+                                  ('/b/y', b'3', 3)], 0.2)
+        self.ws = Workspace(self.rt, '/')
+
+    def test_get_many(self):
+        start = time.time()
+        results = self.ws.get_many(['/a/**?(x=1)', '/b/**?(x=1)',
+                                    '/c/**?(x=1)'])
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual([[e.get_path() for e in r] for r in results],
+                         [['/a/x'], ['/b/y'], []])
+        self.assertEqual(results[0][0].get_value().get_value(), '2')
+
+    def test_get_many_merge(self):
+        results = self.ws.get_many(['/a/**?(x=1)', '/**?(x=1)'], merge=True)
+        self.assertEqual(sorted(e.get_path() for e in results),
+                         ['/a/x', '/b/y'])
+
+    def test_get_timeout(self):
+        start = time.time()
+        with self.assertRaises(QueryTimeoutError) as ctx:
+            self.ws.get('/a/**?(x=1)', timeout=0.05)
+        self.assertLess(time.time() - start, 0.15)
+        self.assertTrue(ctx.exception.results.partial)
+        self.assertEqual(ctx.exception.results, [])
+
+    def test_get_partial(self):
+        results = self.ws.get('/a/**?(x=1)', timeout=0.05, partial=True)
+        self.assertTrue(results.partial)
+        results = self.ws.get('/a/**?(x=1)', deadline=time.monotonic() + 1)
+        self.assertFalse(results.partial)
+        self.assertEqual([e.get_path() for e in results], ['/a/x'])
+
+    def test_get_many_partial(self):
+        self.rt.delays['/b/'] = 1
+        results = self.ws.get_many(['/a/**?(x=1)', '/b/**?(x=1)'],
+                                   timeout=0.5, partial=True)
+        self.assertEqual([r.partial for r in results], [False, True])
+        self.assertEqual([[e.get_path() for e in r] for r in results],
+                         [['/a/x'], []])
+
+    def test_get_iter_timeout(self):
+        self.assertEqual(list(self.ws.get_iter('/a/**?(x=1)', timeout=0.05,
+                                               partial=True)), [])
+        with self.assertRaises(QueryTimeoutError):
+            list(self.ws.get_iter('/a/**?(x=1)', timeout=0.05))
@@ -12,12 +12,10 @@
 #
 # Contributors: Gabriele Baldoni, ADLINK Technology Inc. - Yaks API
 
-import re
-import json
 import zenoh
 from enum import Enum
 from yaks.exceptions import ValidationError
-from yaks.encoding import Encoding
+from yaks.encoding import Encoding, get_codec
 
 
 class ChangeKind(Enum):
@@ -26,7 +24,25 @@ class ChangeKind(Enum):
     REMOVE = zenoh.Z_REMOVE
 
 
+# marks a Value whose payload has not been decoded yet
+_UNDECODED = object()
+
+
 class Value(object):
+    '''
+
+    A value and its encoding.
+
+    The value is encoded with the :class:`~yaks.encoding.Codec` registered
+    for its encoding on its first put, and the payload is kept for the
+    following puts: a value must thus not be modified once created.
+    Likewise, the payload of a received value is decoded on the first
+    :func:`get_value` only.
+
+    '''
+
+    __slots__ = ('encoding', 'raw_format', '_obj', '_payload')
+
     def __init__(self, value, encoding=Encoding.RAW, raw_format=""):
         if encoding is None:
             encoding = Encoding.RAW
@@ -35,38 +51,79 @@ class Value(object):
         if encoding == Encoding.PROTOBUF:
             raise ValueError('PROTOBUF Encoding not implemented')
         self.encoding = encoding
+        self._payload = None
         if self.encoding == Encoding.JSON:
             if not (isinstance(value, dict) or isinstance(value, str)):
                 raise ValidationError("Value is not a valid JSON")
-            self.value = json.dumps(value)
         elif self.encoding == Encoding.RAW and isinstance(value, str):
-            self.value = value.encode()
-        else:
-            self.value = value
+            value = value.encode()
+            self._payload = value
+        self._obj = value
         self.raw_format = raw_format
 
+    @property
+    def value(self):
+        # the JSON values are exposed as their text, the other ones as
+        # returned by get_value
+        if self.encoding == Encoding.JSON:
+            return str(self.as_z_payload(), 'utf-8')
+        return self.get_value()
+
+    @value.setter
+    def value(self, value):
+        if self.encoding == Encoding.JSON:
+            self._obj = _UNDECODED
+            self._payload = value.encode()
+        else:
+            self._obj = value
+            self._payload = None
+
     def as_z_payload(self):
-        if self.encoding == Encoding.RAW:
-            return self.value
-        if self.encoding == Encoding.PROPERTY:
-            s = ';'.join(map('='.join, map(list, self.value.items())))
-            return s.encode()
-        return self.value.encode()
+        if self._payload is None:
+            self._payload = get_codec(self.encoding).encode(self._obj)
+        return self._payload
 
     def get_encoding(self):
         return self.encoding
 
     def get_value(self):
-        if self.encoding is Encoding.JSON:
-            return json.loads(self.value)
-        return self.value
+        if self._obj is _UNDECODED:
+            self._obj = get_codec(self.encoding).decode(self._payload)
+        return self._obj
+
+    def copy(self):
+        '''
+
+        Returns a copy of this value owning its data. A received value
+        shares the buffer it was received in, a RAW one as a
+        :py:class:`memoryview`.
+
+        '''
+        v = Value.__new__(Value)
+        v.encoding = self.encoding
+        v.raw_format = self.raw_format
+        v._payload = None if self._payload is None else bytes(self._payload)
+        if self._obj is _UNDECODED:
+            v._obj = _UNDECODED
+        elif self.encoding == Encoding.RAW:
+            v._obj = v._payload if v._payload is not None \
+                else bytes(self._obj)
+        else:
+            v._obj = self._obj
+        return v
 
     def __eq__(self, second_value):
         if isinstance(second_value, self.__class__):
+            if self.encoding == Encoding.JSON \
+                    and second_value.encoding == Encoding.JSON:
+                # the text of equal values depends on the JSON codec
+                return self.get_value() == second_value.get_value()
             return self.value == second_value.value
         return False
 
     def __str__(self):
+        if isinstance(self.value, memoryview):
+            return str(self.value.tobytes())
         return str(self.value)
 
     def __repr__(self):
@@ -74,32 +131,45 @@ class Value(object):
 
     @staticmethod
     def from_z_resource(buf, info):
-        encoding = Encoding.from_z_encoding(info.encoding)
-        data = None
-        if(encoding == Encoding.RAW):
-            data = bytearray(buf)
+        '''
+
+        Creates a Value from a received payload, without copying it. A RAW
+        value is a :py:class:`memoryview` on the payload, other values are
+        decoded on first access. Use :func:`copy` to get a value owning
+        its data.
+
+        '''
+        v = Value.__new__(Value)
+        v.encoding = Encoding.from_z_encoding(info.encoding) \
+            or Encoding.RAW
+        v.raw_format = ""
+        v._payload = memoryview(buf)
+        if(v.encoding == Encoding.RAW):
+            v._obj = v._payload
         else:
-            data = buf.decode()
-        return Value(data, encoding)
+            v._obj = _UNDECODED
+        return v
 
 
 class Change(object):
+    __slots__ = ('path', 'kind', 'time', 'value')
+
     kind_map = {
             zenoh.Z_PUT: ChangeKind.PUT,
             zenoh.Z_UPDATE: ChangeKind.UPDATE,
             zenoh.Z_REMOVE: ChangeKind.REMOVE
     }
 
+    # maps zenoh kinds, ChangeKinds and None to a ChangeKind in one lookup
+    __kinds = dict(kind_map)
+    __kinds.update({k: k for k in ChangeKind})
+    __kinds[None] = ChangeKind.PUT
+
     def __init__(self, path, kind, time, value=None):
         self.path = path
+        self.kind = Change.__kinds[kind]
         self.time = time
         self.value = value
-        if kind is None:
-            self.kind = ChangeKind.PUT
-        elif isinstance(kind, ChangeKind):
-            self.kind = kind
-        else:
-            self.kind = Change.kind_map[kind]
 
     def get_path(self):
         return self.path
@@ -113,6 +183,23 @@ class Change(object):
     def get_value(self):
         return self.value
 
+    def apply_to(self, value):
+        '''
+
+        Applies this change to the previous value of its path.
+
+        :param value: the previous :class:`Value` of the path.
+        :returns: the new :class:`Value` of the path, ``None`` if it has
+            been removed.
+
+        '''
+        if self.kind == ChangeKind.PUT:
+            return self.value
+        if self.kind == ChangeKind.REMOVE:
+            return None
+        from yaks.delta import apply
+        return apply(value, self.value)
+
     def __str__(self):
         return 'Path: {} Kind: {} Time: {} Value: {}'.format(
             self.path,
@@ -12,16 +12,79 @@
 #
 # Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
 
-from queue import Queue
+import asyncio
+import inspect
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from queue import Queue, Empty
 from yaks.encoding import Encoding, TranscodingFallback
 from yaks.path import Path
 from yaks.selector import Selector
 from yaks.value import Value, Change
 from yaks.entry import Entry
+from yaks.results import ResultSet
+from yaks.exceptions import QueryTimeoutError
+from yaks.batch import WriteBatch, ChangeBatcher
+from yaks.eval import EvalCache, EvalDispatcher
+import yaks.columns
+import yaks.metrics
+import yaks.series
+import yaks.delta
 import zenoh
 from zenoh import *
 
 
+def _reply(path, value):
+    info = z_data_info_t()
+    info.flags = 0x60
+    info.encoding = Encoding.to_z_encoding(value.get_encoding())
+    info.kind = Z_PUT
+    return (path, (value.as_z_payload(), info))
+
+
+def _send_value(send_replies, path, result):
+    # the result of an eval is a Value, None, or a list of Values and of
+    # (path, Value) tuples. zenoh sends all the replies of an eval at once.
+    if result is None:
+        send_replies([])
+    elif isinstance(result, Value):
+        send_replies([_reply(path, result)])
+    else:
+        send_replies([_reply(path, r) if isinstance(r, Value) else _reply(*r)
+                      for r in result])
+
+
+async def _collect(agen):
+    # without an asynchronous comprehension, which requires Python 3.6
+    values = []
+    async for r in agen:
+        values.append(r)
+    return values
+
+
+def _run(coroutine):
+    # asyncio.run, which requires Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def _eval_result(result):
+    # runs the coroutines and gathers the values of the asynchronous
+    # generators returned by an eval, so that they can be cached
+    if inspect.iscoroutine(result):
+        result = _run(result)
+    elif hasattr(result, '__aiter__'):
+        result = _run(_collect(result))
+    if result is None or isinstance(result, Value):
+        return result
+    return list(result)
+
+
 class Workspace(object):
     '''
 
@@ -29,13 +92,31 @@ class Workspace(object):
 
     '''
 
-    def __init__(self, runtime, path, executor=None):
+    DEFAULT_QUEUE_SIZE = 1024
+    # the number of paths whose last updated value is kept by update
+    MAX_UPDATE_BASES = 1024
+
+    def __init__(self, runtime, path, executor=None, metrics=None):
         self.rt = runtime
+        self.metrics = yaks.metrics.DISABLED if metrics is None else metrics
         self.path = Path.to_path(path)
         self.evals = []
         self.executor = executor
+        self.batchers = {}
+        # path -> the last value given to update, or put since, least
+        # recently updated first
+        self.update_bases = OrderedDict()
+        # path -> EvalCache of the evals registered with a cache_ttl
+        self.eval_caches = {}
+        # path -> EvalDispatcher of the registered evals
+        self.eval_dispatchers = {}
+        # the yaks.shm.SharedMemoryWriter of the puts, if enabled
+        self.shm = None
+        # subscription id -> id of its subscription to the handles of the
+        # shared payloads
+        self.shared_subscribers = {}
 
-    def __to_absolute(self, path):
+    def _to_absolute(self, path):
         if path.startswith('/'):
             return path
         else:
@@ -51,24 +132,212 @@ class Workspace(object):
 
         '''
 
-        self.rt.write_data(
-            self.__to_absolute(path),
-            value.as_z_payload(),
-            Encoding.to_z_encoding(value.get_encoding()),
-            zenoh.Z_PUT)
+        m = self.metrics
+        if not m.enabled and self.shm is None:
+            rname = self._to_absolute(path)
+            self.rt.write_data(
+                rname,
+                value.as_z_payload(),
+                Encoding.to_z_encoding(value.get_encoding()),
+                zenoh.Z_PUT)
+            if self.update_bases:
+                self.__rebase(rname, value)
+            return True
+
+        start = time.perf_counter()
+        rname = self._to_absolute(path)
+        payload = value.as_z_payload()
+        encoding = Encoding.to_z_encoding(value.get_encoding())
+        if self.shm is not None \
+                and self.shm.shares(value.encoding, payload):
+            self.__share(rname, payload)
+        encoded = time.perf_counter()
+        self.rt.write_data(rname, payload, encoding, zenoh.Z_PUT)
+        if self.update_bases:
+            self.__rebase(rname, value)
+        if m.enabled:
+            m.record_put(len(payload), encoded - start)
+            m.record('put', time.perf_counter() - start)
         return True
 
-    def update(self, path, value):
+    def __rebase(self, rname, value):
+        # the value put is the base of the next update of the path
+        if rname in self.update_bases:
+            self.update_bases[rname] = value
+
+    def __share(self, rname, payload):
+        # writes the handle on a segment holding the payload for the
+        # shared subscriptions, before the value (see yaks.shm)
+        import yaks.shm
+        self.rt.write_data(yaks.shm.SHARED_PREFIX + rname,
+                           self.shm.handle(rname, payload),
+                           yaks.shm.Z_SHARED_ENC, zenoh.Z_PUT)
+
+    def put_many(self, entries):
+        '''
+
+        Put several path/value into Yaks.
+
+        Each distinct path is resolved only once and each distinct
+        :class:`~yaks.value.Value` object is encoded only once, so putting
+        the same value on many paths or many values on the same path avoids
+        the per-call overhead of :func:`put`.
+
+        :param entries: an iterable of (path, value) tuples. Paths can be
+            absolute or relative to the workspace.
+        :returns: the number of path/value put.
+
+        '''
+
+        m = self.metrics
+        measured = m.enabled
+        if measured:
+            start = time.perf_counter()
+        write_data = self.rt.write_data
+        shm = self.shm
+        paths = {}
+        payloads = {}
+        count = 0
+        for (path, value) in entries:
+            rname = paths.get(path)
+            if rname is None:
+                rname = self._to_absolute(path)
+                paths[path] = rname
+            encoded = payloads.get(id(value))
+            if encoded is None:
+                # keeps a reference on value so that its id is not reused
+                encoded = (value,
+                           value.as_z_payload(),
+                           Encoding.to_z_encoding(value.get_encoding()))
+                payloads[id(value)] = encoded
+            payload = encoded[1]
+            if shm is not None and shm.shares(value.encoding, payload):
+                self.__share(rname, payload)
+            write_data(rname, payload, encoded[2], zenoh.Z_PUT)
+            if self.update_bases:
+                self.__rebase(rname, value)
+            count += 1
+            if measured:
+                m.record_put(len(payload))
+        if measured:
+            m.record('put_many', time.perf_counter() - start)
+        return count
+
+    def enable_shared_memory(self, enabled=True, threshold=None, keep=None,
+                             max_segments=None):
+        '''
+
+        Enables or disables the shared-memory payloads of the puts of this
+        workspace (see :mod:`yaks.shm`), which requires Python 3.8 or
+        later. When enabled, the RAW payloads of at least ``threshold``
+        bytes are also copied into shared-memory segments, and a handle on
+        the segment is published before the value. The values are put as
+        usual, while the shared subscriptions of the same host map the
+        segments instead of receiving the copies (see :func:`subscribe`).
+
+        :param enabled: ``True`` to enable the shared payloads. Disabling
+            them unlinks all the segments.
+        :param threshold: the minimum size of the shared payloads, in
+            bytes, ``yaks.shm.DEFAULT_THRESHOLD`` (64 KiB) if ``None``.
+        :param keep: the number of segments kept per path,
+            ``yaks.shm.DEFAULT_KEEP`` if ``None``: a shared subscriber
+            lagging more than ``keep`` puts behind on a path receives the
+            copies of the values.
+        :param max_segments: the number of segments kept over all the
+            paths, the oldest ones being unlinked first,
+            ``yaks.shm.DEFAULT_MAX_SEGMENTS`` if ``None``.
+
+        '''
+
+        import yaks.shm
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+        if enabled:
+            self.shm = yaks.shm.SharedMemoryWriter(
+                yaks.shm.DEFAULT_THRESHOLD if threshold is None
+                else threshold,
+                yaks.shm.DEFAULT_KEEP if keep is None else keep,
+                yaks.shm.DEFAULT_MAX_SEGMENTS if max_segments is None
+                else max_segments)
+
+    def batch(self, max_size=WriteBatch.DEFAULT_MAX_SIZE, max_delay=None):
+        '''
+
+        Creates a :class:`~yaks.batch.WriteBatch` on this workspace, to be
+        used as a context manager::
+
+            with ws.batch(max_size=256, max_delay=0.01) as b:
+                for i in range(0, n):
+                    b.put('/ylatp/sample', v)
+
+        :param max_size: the number of puts that triggers a flush.
+        :param max_delay: the maximum time (in seconds) a put can stay in the
+            batch before being flushed. If ``None``, only the size and the
+            end of the ``with`` block trigger a flush.
+        :returns: a :class:`~yaks.batch.WriteBatch`.
+
         '''
 
-        Update a path/value into Yaks.
+        return WriteBatch(self, max_size, max_delay)
+
+    def update(self, path, value, base=None, client_deltas=False):
+        '''
+
+        Update a path/value into Yaks, sending only the delta between the
+        previous value and the new one (see :mod:`yaks.delta`).
+
+        The subscribers receive a :class:`~yaks.value.Change` of kind
+        ``UPDATE`` whose value is the delta, to be applied with
+        :func:`~yaks.value.Change.apply_to`. When the previous value is
+        unknown, or when no delta can express the change, the value is put.
+        Only the JSON values are sent as deltas by default, the storages of
+        a Yaks service applying JSON merge patches only.
 
         :param path: the Path. Can be absolute or relative to the workspace.
-        :param value: a delta to be applied on the existing value.
+        :param value: the new value.
+        :param base: the previous value. If ``None``, the value of the
+            previous :func:`update` or :func:`put` of this path in this
+            workspace, for the :attr:`MAX_UPDATE_BASES` paths most
+            recently updated.
+        :param client_deltas: if ``True``, the RAW and PROPERTY values are
+            sent as deltas too. Only this API and the storages of the
+            ``mem://`` services apply them: the storages of a Yaks service
+            would store the delta itself rather than the updated value.
 
         '''
 
-        raise NotImplementedError("Update not yet implemented ...")
+        m = self.metrics
+        measured = m.enabled
+        if measured:
+            start = time.perf_counter()
+        path = self._to_absolute(path)
+        if base is None:
+            base = self.update_bases.get(path)
+        if base is None or not client_deltas and \
+                value.get_encoding() not in yaks.delta.STORAGE_ENCODINGS:
+            delta = None
+        else:
+            delta = yaks.delta.diff(base, value)
+        if delta is None or \
+                len(delta.as_z_payload()) >= len(value.as_z_payload()):
+            self.put(path, value)
+        else:
+            self.rt.write_data(
+                path,
+                delta.as_z_payload(),
+                Encoding.to_z_encoding(delta.get_encoding()),
+                zenoh.Z_UPDATE)
+            if measured:
+                m.record_put(len(delta.as_z_payload()))
+        bases = self.update_bases
+        bases[path] = value
+        bases.move_to_end(path)
+        if len(bases) > self.MAX_UPDATE_BASES:
+            bases.popitem(last=False)
+        if measured:
+            m.record('update', time.perf_counter() - start)
+        return True
 
     def __isSelectorForSeries(self, selector):
         props = selector.get_properties()
@@ -79,61 +348,381 @@ class Workspace(object):
                 return True
         return False
 
+    def __replies(self, selectors, queue_size=0, deadline=None, status=None,
+                  completed=None):
+        # Issues one query per selector, all at once, and yields an
+        # (index of the selector, Entry) per data reply, as they arrive
+        # through a single queue. With a bounded queue the zenoh callbacks
+        # block when the consumer lags behind. When the deadline (a
+        # time.monotonic() value) expires, status['timeout'] is set and the
+        # generator ends. When the generator ends before the final replies,
+        # the late replies are dropped without being decoded.
+        q = Queue(queue_size)
+        cancelled = threading.Event()
+
+        def query(index, selector):
+            def callback(reply_value):
+                if not cancelled.is_set():
+                    q.put((index, reply_value))
+            self.rt.query(
+                selector.get_path(),
+                selector.get_optional_part(),
+                callback)
+
+        for index, selector in enumerate(selectors):
+            query(index, selector)
+        try:
+            pending = len(selectors)
+            while pending > 0:
+                if deadline is None:
+                    (index, reply) = q.get()
+                else:
+                    try:
+                        (index, reply) = q.get(
+                            timeout=max(deadline - time.monotonic(), 0))
+                    except Empty:
+                        status['timeout'] = True
+                        return
+                if(reply.kind == zenoh.Z_STORAGE_DATA
+                   or reply.kind == zenoh.Z_EVAL_DATA):
+                    if self.metrics.enabled:
+                        self.metrics.record_received('reply', len(reply.data))
+                    yield (index,
+                           Entry(reply.rname,
+                                 Value.from_z_resource(reply.data, reply.info),
+                                 reply.info.tstamp))
+                elif(reply.kind == zenoh.Z_REPLY_FINAL):
+                    pending -= 1
+                    if completed is not None:
+                        completed.add(index)
+        finally:
+            cancelled.set()
+            try:
+                while True:
+                    q.get_nowait()
+            except Empty:
+                pass
+
+    def __rows(self, selector, deadline=None, status=None):
+        # Issues a query and returns the list of the (path, timestamp,
+        # Encoding, payload) of its data replies, appended by the zenoh
+        # callback without going through a queue. When the deadline
+        # expires, status['timeout'] is set and the replies received so far
+        # are returned.
+        rows = []
+        done = threading.Event()
+        cancelled = [False]
+        metrics = self.metrics
+
+        def callback(reply):
+            if cancelled[0]:
+                return
+            if(reply.kind == zenoh.Z_STORAGE_DATA
+               or reply.kind == zenoh.Z_EVAL_DATA):
+                if metrics.enabled:
+                    metrics.record_received('reply', len(reply.data))
+                rows.append((reply.rname, reply.info.tstamp,
+                             Encoding.from_z_encoding(reply.info.encoding)
+                             or Encoding.RAW, reply.data))
+            elif(reply.kind == zenoh.Z_REPLY_FINAL):
+                done.set()
+
+        self.rt.query(selector.get_path(), selector.get_optional_part(),
+                      callback)
+        if deadline is None:
+            done.wait()
+        elif not done.wait(max(deadline - time.monotonic(), 0)):
+            cancelled[0] = True
+            status['timeout'] = True
+            return list(rows)
+        return rows
+
+    def __entries(self, selector, queue_size=0, deadline=None,
+                  status=None):
+        for (_, entry) in self.__replies([selector], queue_size, deadline,
+                                         status):
+            yield entry
+
+    @staticmethod
+    def __deadline(timeout, deadline):
+        if timeout is not None:
+            timeout = time.monotonic() + timeout
+            return timeout if deadline is None else min(timeout, deadline)
+        return deadline
+
+    @staticmethod
+    def __result_set(results, status, partial):
+        if not status.get('timeout', False):
+            return ResultSet(results)
+        if partial:
+            return ResultSet(results, partial=True)
+        raise QueryTimeoutError('Query timed out',
+                                ResultSet(results, partial=True))
+
+    @staticmethod
+    def __latest(entries):
+        latestMap = {}
+        for entry in entries:
+            current = latestMap.get(entry.path)
+            if current is None or current < entry:
+                latestMap[entry.path] = entry
+        return latestMap
+
     def get(self, selector, encoding=Encoding.RAW,
-                fallback=TranscodingFallback.KEEP):
+                fallback=TranscodingFallback.KEEP, timeout=None,
+                deadline=None, partial=False):
         '''
 
         Get a selection of path/value from Yaks.
 
         :param selector: the selector expressing the selection.
-        :returns: a list of entry.
+        :param timeout: the maximum time (in seconds) to wait for the
+            replies. If ``None``, wait for all the replies.
+        :param deadline: the :py:func:`time.monotonic` time after which to
+            stop waiting for the replies. If ``None``, wait for all the
+            replies.
+        :param partial: if ``True``, the entries received before the
+            timeout are returned in a
+            :class:`~yaks.results.ResultSet` flagged as ``partial``.
+            Otherwise a :class:`~yaks.exceptions.QueryTimeoutError`
+            holding these entries is raised. In both cases the replies
+            received later are dropped.
+        :returns: a :class:`~yaks.results.ResultSet` (a list of entry).
 
         '''
 
-        q = Queue()
+        m = self.metrics
+        measured = m.enabled
+        if measured:
+            start = time.perf_counter()
+        selector = Selector.to_selector(self._to_absolute(selector))
+        status = {}
+        results = self._results(selector, self.__entries(
+            selector, 0, self.__deadline(timeout, deadline), status))
+        if measured:
+            m.record('get', time.perf_counter() - start)
+        return self.__result_set(results, status, partial)
+
+    def _results(self, selector, entries):
+        if(not self.__isSelectorForSeries(selector)):
+            # return only the latest entry for each path
+            return list(self.__latest(entries).values())
+
+        # return all entries
+        resultsMap = {}
+        for entry in entries:
+            if entry.path not in resultsMap:
+                resultsMap[entry.path] = set()
+            resultsMap[entry.path].add(entry)
+        results = []
+        for path, entrySet in resultsMap.items():
+            results.extend(sorted(entrySet))
+        return results
+
+    def get_iter(self, selector, latest=False,
+                 queue_size=DEFAULT_QUEUE_SIZE, timeout=None, deadline=None,
+                 partial=False):
+        '''
 
-        def callback(reply_value):
-            q.put(reply_value)
+        Get a selection of path/value from Yaks as a generator of entries.
 
-        def contains_key(kvs, key):
-            for (k, _) in kvs:
-                if(k == key):
-                    return True
-            return False
+        Unlike :func:`get`, the entries are yielded as the replies arrive,
+        in arrival order and without removing the duplicates returned by
+        several storages. The query is issued on the first iteration.
+        Closing the generator before its end drops the remaining replies.
 
-        selector = Selector.to_selector(self.__to_absolute(selector))
+        :param selector: the selector expressing the selection.
+        :param latest: if ``True``, only the latest entry for each path is
+            yielded, once all the replies have been received.
+        :param queue_size: the maximum number of replies received but not
+            yet consumed. When reached, the reception is suspended until the
+            consumer catches up. If ``0``, the queue is unbounded.
+        :param timeout: see :func:`get`.
+        :param deadline: see :func:`get`.
+        :param partial: if ``True``, the generator ends when the timeout
+            expires. Otherwise it raises a
+            :class:`~yaks.exceptions.QueryTimeoutError`.
+        :returns: a generator of entry.
 
-        self.rt.query(
-            selector.get_path(),
-            selector.get_optional_part(),
-            callback)
-        resultsMap = {}
-        reply = q.get()
-        while(reply.kind != zenoh.Z_REPLY_FINAL):
-            if(reply.kind == zenoh.Z_STORAGE_DATA
-               or reply.kind == zenoh.Z_EVAL_DATA):
-                entry = Entry(reply.rname,
-                              Value.from_z_resource(reply.data, reply.info),
-                              reply.info.tstamp)
-                if reply.rname not in resultsMap:
-                    resultsMap[reply.rname] = set()
-                resultsMap[reply.rname].add(entry)
-            reply = q.get()
-        q.task_done()
+        '''
 
-        results = []
-        if(self.__isSelectorForSeries(selector)):
-            # return all entries
-            for path, entrySet in resultsMap.items():
-                for entry in sorted(entrySet):
-                    results.append(entry)
+        selector = Selector.to_selector(self._to_absolute(selector))
+        deadline = self.__deadline(timeout, deadline)
+
+        def entries():
+            status = {}
+            received = self.__entries(selector, queue_size, deadline, status)
+            if latest:
+                received = self.__latest(received).values()
+            for entry in received:
+                yield entry
+            if status.get('timeout', False) and not partial:
+                raise QueryTimeoutError('Query timed out')
+        return entries()
+
+    def get_many(self, selectors, merge=False, timeout=None, deadline=None,
+                 partial=False):
+        '''
+
+        Get several selections of path/value from Yaks at once.
+
+        All the queries are issued before waiting for any reply, so the
+        total latency is close to the one of the slowest query instead of
+        the sum of the latencies of successive :func:`get`.
+
+        :param selectors: a list of selectors.
+        :param merge: if ``True``, a single list of entry is returned, with
+            the entries matched by several selectors returned only once.
+        :param timeout: see :func:`get`.
+        :param deadline: see :func:`get`.
+        :param partial: see :func:`get`. The result of each query that did
+            not complete in time is flagged as ``partial``.
+        :returns: a :class:`~yaks.results.ResultSet` per selector, as
+            returned by :func:`get`, or a single
+            :class:`~yaks.results.ResultSet` if ``merge`` is ``True``.
+
+        '''
+
+        m = self.metrics
+        measured = m.enabled
+        if measured:
+            start = time.perf_counter()
+        selectors = [Selector.to_selector(self._to_absolute(s))
+                     for s in selectors]
+        entries = [[] for _ in selectors]
+        completed = set()
+        status = {}
+        for (index, entry) in self.__replies(
+                selectors, 0, self.__deadline(timeout, deadline), status,
+                completed):
+            entries[index].append(entry)
+        results = [ResultSet(self._results(selector, entries[index]),
+                             index not in completed)
+                   for index, selector in enumerate(selectors)]
+        if measured:
+            m.record('get_many', time.perf_counter() - start)
+        if status.get('timeout', False) and not partial:
+            raise QueryTimeoutError('Query timed out', results)
+        if not merge:
+            return results
+
+        merged = ResultSet(partial=status.get('timeout', False))
+        seen = {}
+        for result in results:
+            for entry in result:
+                if entry.path not in seen:
+                    seen[entry.path] = set()
+                if entry not in seen[entry.path]:
+                    seen[entry.path].add(entry)
+                    merged.append(entry)
+        return merged
+
+    def get_columns(self, selector, dtype=None, timeout=None,
+                    deadline=None, partial=False):
+        '''
+
+        Get a selection of path/value from Yaks as NumPy columns, built
+        from the replies without creating an entry per reply. NumPy must be
+        installed.
+
+        :param selector: the selector expressing the selection. The
+            entries are selected as by :func:`get`.
+        :param dtype: the NumPy dtype of the values, ``float64`` if
+            ``None``. The RAW payloads must be exactly of its size, and are
+            viewed with :py:func:`numpy.frombuffer`. The STRING payloads
+            are parsed as numbers.
+        :param timeout: see :func:`get`.
+        :param deadline: see :func:`get`.
+        :param partial: see :func:`get`.
+        :returns: a :class:`~yaks.columns.Columns`.
+
+        '''
+
+        m = self.metrics
+        measured = m.enabled
+        if measured:
+            start = time.perf_counter()
+        selector = Selector.to_selector(self._to_absolute(selector))
+        status = {}
+        replies = self.__rows(selector, self.__deadline(timeout, deadline),
+                              status)
+        if not self.__isSelectorForSeries(selector):
+            latest = {}
+            for row in replies:
+                current = latest.get(row[0])
+                if current is None or current[1] < row[1]:
+                    latest[row[0]] = row
+            rows = list(latest.values())
         else:
-            # return only the latest entry for each path
-            for path, entrySet in resultsMap.items():
-                entries = sorted(entrySet)
-                results.append(entries[-1])
+            # all the rows, without the duplicates, by path and timestamp
+            paths = {}
+            for row in replies:
+                if row[0] not in paths:
+                    paths[row[0]] = {}
+                paths[row[0]][row[1]] = row
+            rows = []
+            for (path, timestamps) in paths.items():
+                rows.extend(timestamps[t] for t in sorted(timestamps))
+        timedout = status.get('timeout', False)
+        columns = yaks.columns.to_columns(rows, dtype, timedout)
+        if measured:
+            m.record('get', time.perf_counter() - start)
+        if timedout and not partial:
+            raise QueryTimeoutError('Query timed out', columns)
+        return columns
 
-        return results
+    def get_series(self, selector, start=None, stop=None, step=1,
+                   agg=('mean',), value=yaks.series.sample_value,
+                   timeout=None, deadline=None, partial=False):
+        '''
+
+        Get the time series of a selection of path/value from Yaks,
+        downsampled to one sample per window of ``step`` seconds.
+
+        The window is passed to the storages as the ``starttime``,
+        ``stoptime``, ``step`` and ``agg`` properties of the selector. The
+        storages supporting them reply with one sample per window, the
+        others with all their samples, which are then aggregated as they
+        are received instead of being returned as entries.
+
+        :param selector: the selector expressing the selection.
+        :param start: the start of the first window, in seconds since the
+            epoch. If ``None``, the windows are aligned on multiples of
+            ``step``.
+        :param stop: the end of the last window, in seconds since the
+            epoch. If ``None``, the windows end with the latest sample.
+        :param step: the duration of the windows, in seconds.
+        :param agg: the aggregations computed for each window, among
+            ``min``, ``max``, ``mean``, ``last`` and ``count``.
+        :param value: the function converting a
+            :class:`~yaks.value.Value` to a number. The entries whose value
+            it fails to convert (raising ``ValueError`` or ``TypeError``)
+            are ignored.
+        :param timeout: see :func:`get`.
+        :param deadline: see :func:`get`.
+        :param partial: see :func:`get_iter`.
+        :returns: a dictionary associating to each path a
+            :class:`~yaks.series.Series`, whose ``time`` column holds the
+            start of the windows having samples and whose other columns
+            hold the aggregations.
+
+        '''
+        if isinstance(agg, str):
+            agg = (agg,)
+        downsampler = yaks.series.Downsampler(start, stop, step, agg)
+        selector = yaks.series.window_selector(
+            Selector.to_selector(self._to_absolute(selector)),
+            start, stop, step, agg)
+        for entry in self.get_iter(selector.to_string(), timeout=timeout,
+                                   deadline=deadline, partial=partial):
+            try:
+                v = value(entry.value)
+            except (ValueError, TypeError):
+                continue
+            downsampler.add(entry.path,
+                            yaks.series.timestamp_seconds(entry.timestamp),
+                            v, entry.timestamp)
+        return downsampler.series()
 
     def remove(self, path):
         '''
@@ -145,100 +734,282 @@ class Workspace(object):
 
         '''
 
+        m = self.metrics
+        measured = m.enabled
+        if measured:
+            start = time.perf_counter()
+        path = self._to_absolute(path)
+        self.update_bases.pop(path, None)
         self.rt.write_data(
-            self.__to_absolute(path),
+            path,
             "".encode(),
             Encoding.Z_RAW_ENC,
             zenoh.Z_REMOVE)
+        if measured:
+            m.record('remove', time.perf_counter() - start)
         return True
 
-    def subscribe(self, selector, listener):
+    def subscribe(self, selector, listener, max_batch=None, max_delay=None,
+                  conflate=False, shared=False):
         '''
 
         Subscribe to a selection of path/value from Yaks.
 
+        By default, the listener is called with a list containing a single
+        change for each received change. If ``max_batch`` or ``max_delay``
+        is set, the changes are accumulated and the listener is called with
+        lists of changes (see :class:`~yaks.batch.ChangeBatcher`).
+
         :param selector: the selector expressing the selection.
         :param listener: the Listener that will be called for each change of
             a path/value matching the selection.
+        :param max_batch: the maximum number of changes per list.
+        :param max_delay: the maximum time (in seconds) a change is kept
+            before being delivered.
+        :param conflate: if ``True``, only the latest change of each path
+            is delivered. Requires ``max_batch`` or ``max_delay``.
+        :param shared: if ``True``, the RAW values put with shared memory
+            enabled (see :func:`enable_shared_memory`) by the clients of
+            the same host are delivered as read-only
+            :py:class:`memoryview` on their segment rather than as copies.
+            The subscription then also subscribes to their handles.
         :returns: a subscription id.
 
         '''
 
-        selector = self.__to_absolute(selector)
-        if(listener is not None):
+        selector = self._to_absolute(selector)
+        if(listener is None):
             def callback(rname, data, info):
-                if self.executor is None:
-                    listener([Change(
-                        rname,
-                        info.kind,
-                        info.tstamp.time if info.tstamp is not None else None,
-                        Value.from_z_resource(data, info))])
-                else:
-                    self.executor.submit(listener, [Change(
-                        rname,
-                        info.kind,
-                        info.tstamp.time if info.tstamp is not None else None,
-                        Value.from_z_resource(data, info))])
+                pass
             return self.rt.declare_subscriber(
                 selector,
                 zenoh.SubscriberMode.push(),
                 callback)
+
+        m = self.metrics
+
+        def measured_listener(changes, delivered):
+            listener(changes)
+            m.listener_seconds.observe(time.perf_counter() - delivered)
+
+        if self.executor is None:
+            def deliver(changes):
+                if m.enabled:
+                    measured_listener(changes, time.perf_counter())
+                else:
+                    listener(changes)
         else:
+            def deliver(changes):
+                if m.enabled:
+                    self.executor.submit(measured_listener, changes,
+                                         time.perf_counter())
+                else:
+                    self.executor.submit(listener, changes)
+
+        if max_batch is None and max_delay is None and not conflate:
             def callback(rname, data, info):
-                pass
-            return self.rt.declare_subscriber(
-                selector,
-                zenoh.SubscriberMode.push(),
-                callback)
+                if m.enabled:
+                    m.record_received('change', len(data))
+                deliver([Change(
+                    rname,
+                    info.kind,
+                    info.tstamp.time if info.tstamp is not None else None,
+                    Value.from_z_resource(data, info))])
+            return self.__declare_subscriber(selector, callback, shared)
+
+        batcher = ChangeBatcher(
+            deliver, max_batch, max_delay, conflate,
+            None if self.executor is None else self.executor.submit)
+
+        def callback(rname, data, info):
+            if m.enabled:
+                m.record_received('change', len(data))
+            batcher.add(Change(
+                rname,
+                info.kind,
+                info.tstamp.time if info.tstamp is not None else None,
+                Value.from_z_resource(data, info)))
+        subscription_id = self.__declare_subscriber(selector, callback,
+                                                    shared)
+        self.batchers[subscription_id] = batcher
+        return subscription_id
+
+    def __declare_subscriber(self, selector, callback, shared):
+        # a shared subscription also subscribes to the handles of the shared
+        # payloads of its selection (see yaks.shm), delivered with the path
+        # of their value
+        import yaks.shm
+        mode = zenoh.SubscriberMode.push()
+        prefix = yaks.shm.SHARED_PREFIX
+        deliver = callback
+        if yaks.shm.covers_shared(selector):
+            def callback(rname, data, info):
+                if not rname.startswith(prefix + '/'):
+                    deliver(rname, data, info)
+        if not shared:
+            return self.rt.declare_subscriber(selector, mode, callback)
+
+        receiver = yaks.shm.SharedReceiver()
+        receive = callback
+
+        def callback(rname, data, info):
+            with receiver.lock:
+                if info.encoding != Encoding.Z_RAW_ENC \
+                        or receiver.receive_copy(rname, data):
+                    receive(rname, data, info)
+
+        def shared_callback(rname, data, info):
+            rname = rname[len(prefix):]
+            with receiver.lock:
+                view = receiver.receive_handle(rname, data)
+                if view is not None:
+                    deliver(rname, view, info)
+        subscription_id = self.rt.declare_subscriber(selector, mode,
+                                                     callback)
+        self.shared_subscribers[subscription_id] = \
+            self.rt.declare_subscriber(prefix + selector, mode,
+                                       shared_callback)
+        return subscription_id
 
     def unsubscribe(self, subscription_id):
         '''
 
-        Unregisters a previous subscription.
+        Unregisters a previous subscription. The changes accumulated by the
+        subscription are delivered.
 
         :param subscription_id: the subscription id to unregister.
 
         '''
 
         self.rt.undeclare_subscriber(subscription_id)
+        shared = self.shared_subscribers.pop(subscription_id, None)
+        if shared is not None:
+            self.rt.undeclare_subscriber(shared)
+        batcher = self.batchers.pop(subscription_id, None)
+        if batcher is not None:
+            batcher.flush()
         return True
 
-    def register_eval(self, path, callback):
+    def register_eval(self, path, callback, cache_ttl=None,
+                      cache_size=EvalCache.DEFAULT_MAX_ENTRIES,
+                      max_concurrency=None, max_pending=None):
         '''
 
         Registers an evaluation function under the provided path.
 
         :param path: the Path where the function can be triggered using
             :func:`~yaks.workspace.Workspace.get`.
-        :param callback: the evaluation function.
+        :param callback: the evaluation function, taking the path and the
+            properties of the query. It returns a
+            :class:`~yaks.value.Value`, or an iterable of values or of
+            (path, value) tuples for several replies. It can be a
+            generator function, a coroutine function or an asynchronous
+            generator function, whose coroutines are run to completion on
+            the thread evaluating the query (use
+            :class:`~yaks.asyncworkspace.AsyncWorkspace` to run them on an
+            event loop).
+        :param cache_ttl: if not ``None``, the values returned by the
+            function are reused during ``cache_ttl`` seconds for the queries
+            with the same path and properties, and the identical queries
+            received while the function is running wait for its value.
+            See :class:`~yaks.eval.EvalCache`.
+        :param cache_size: the maximum number of values kept when
+            ``cache_ttl`` is set.
+        :param max_concurrency: the maximum number of queries evaluated at
+            once. If ``None``, one per thread of the workspace executor, or
+            1 without executor.
+        :param max_pending: the maximum number of queries waiting for
+            ``max_concurrency``. The queries received beyond are replied
+            at once without any value. If ``None``, unbounded.
+            See :class:`~yaks.eval.EvalDispatcher`.
+
+        A query whose evaluation raises an exception is replied without
+        any value, and the exception is printed.
 
         '''
 
+        def evaluate(path_selector, content_selector):
+            args = Selector.dict_from_properties(
+                Selector("{}?{}".format(path_selector, content_selector)))
+            return _eval_result(callback(path_selector, args))
+
+        if cache_ttl is None:
+            compute = evaluate
+        else:
+            cache = EvalCache(cache_ttl, cache_size)
+
+            def compute(path_selector, content_selector):
+                return cache.get(
+                    (path_selector, content_selector),
+                    lambda: evaluate(path_selector, content_selector))
+
+        if max_concurrency is None:
+            max_concurrency = 1 if self.executor is None \
+                else getattr(self.executor, '_max_workers', None)
+        dispatcher = EvalDispatcher(
+            None if self.executor is None else self.executor.submit,
+            max_concurrency, max_pending)
+
+        m = self.metrics
+
         def query_handler(path_selector, content_selector, send_replies):
-            def query_handler_p(path_selector, content_selector, send_replies):
-                args = Selector.dict_from_properties(
-                    Selector("{}?{}".format(path_selector, content_selector)))
-                value = callback(path_selector, args)
-                info = z_data_info_t()
-                info.flags = 0x60
-                info.encoding = Encoding.to_z_encoding(value.get_encoding())
-                info.kind = Z_PUT
-                send_replies([(path_selector, (value.as_z_payload(), info))])
-            if self.executor is None:
-                query_handler_p(path_selector,
-                                content_selector,
-                                send_replies)
-            else:
-                self.executor.submit(query_handler_p,
-                                     path_selector,
-                                     content_selector,
-                                     send_replies)
-
-        path = self.__to_absolute(path)
+            received = None
+            if m.enabled:
+                m.evals.inc()
+                received = time.perf_counter()
+
+            def query_handler_p():
+                try:
+                    value = compute(path_selector, content_selector)
+                    _send_value(send_replies, path_selector, value)
+                except Exception:
+                    # the query is replied without value rather than left
+                    # waiting for its final reply
+                    traceback.print_exc()
+                    send_replies([])
+                if received is not None:
+                    m.eval_seconds.observe(time.perf_counter() - received)
+            dispatcher.dispatch(query_handler_p,
+                                lambda: send_replies([]))
+
+        path = self._to_absolute(path)
         zeval = self.rt.declare_eval(path,
                                      query_handler)
 
         self.evals.append((path, zeval))
+        self.eval_dispatchers[path] = dispatcher
+        if cache_ttl is not None:
+            self.eval_caches[path] = cache
+
+    def eval_stats(self, path):
+        '''
+
+        Get the load of an evaluation function.
+
+        :param path: the path where the function has been registered.
+        :returns: a dictionary as returned by
+            :func:`~yaks.eval.EvalDispatcher.stats`, or ``None`` if no
+            function is registered at this path.
+
+        '''
+
+        dispatcher = self.eval_dispatchers.get(self._to_absolute(path))
+        return None if dispatcher is None else dispatcher.stats()
+
+    def eval_cache_stats(self, path):
+        '''
+
+        Get the statistics of the cache of an evaluation function.
+
+        :param path: the path where the function has been registered.
+        :returns: a dictionary as returned by
+            :func:`~yaks.eval.EvalCache.stats`, or ``None`` if the function
+            has been registered without ``cache_ttl``.
+
+        '''
+
+        cache = self.eval_caches.get(self._to_absolute(path))
+        return None if cache is None else cache.stats()
 
     def unregister_eval(self, path):
         '''
@@ -249,7 +1020,9 @@ class Workspace(object):
 
         '''
 
-        path = self.__to_absolute(path)
+        path = self._to_absolute(path)
+        self.eval_caches.pop(path, None)
+        self.eval_dispatchers.pop(path, None)
         for (evalpath, zeval) in self.evals:
             if evalpath == path:
                 self.rt.undeclare_eval(zeval)
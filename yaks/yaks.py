@@ -13,8 +13,14 @@
 # Contributors: Angelo Corsaro, ADLINK Technology Inc. - Yaks API refactoring
 
 from yaks.workspace import Workspace
+from yaks.asyncworkspace import AsyncWorkspace
+from yaks.cache import CachedWorkspace
 from yaks.admin import *
+from yaks.loopback import LoopbackRuntime, LOCATOR_SCHEME
+from yaks.metrics import Metrics
+from yaks.pool import RuntimePool, BALANCE_PATH
 import threading
+import zenoh
 from zenoh import Zenoh, Z_INFO_PEER_PID_KEY
 
 
@@ -29,31 +35,63 @@ class Yaks(object):
 
     def __init__(self, rt):
         self.rt = rt
+        self.registry = Metrics(enabled=False)
 
     @staticmethod
-    def login(locator, properties=None):
+    def login(locator, properties=None, sessions=1,
+              balance=BALANCE_PATH):
         '''
 
         Establish a session with the Yaks instance reachable via provided
         Zenoh locator. If the provided locator is ``None``, :func:`login`
         will perform some dynamic discovery and try to establish the session
         automatically. When not ``None``, the locator must have the format:
-        ``tcp/<ip>:<port>``.
+        ``tcp/<ip>:<port>``, or ``mem://[<name>]`` for an in-process Yaks
+        service shared by the sessions opened with the same locator (see
+        :mod:`yaks.loopback`).
 
-        :param locator: a Zenoh locator or ``None``.
+        :param locator: a Zenoh locator or ``None``, or a list of locators
+            to open a pool of sessions to several routers.
         :param properties: the Properties to be used for this session
             (e.g. "user", "password", ...). Can be ``None``.
+        :param sessions: the number of sessions to open, at least one per
+            locator. With more than one session, the sessions are opened in
+            turn with the locators and used as a
+            :class:`~yaks.pool.RuntimePool`, spreading the load over their
+            I/O threads.
+        :param balance: how the operations are spread over the sessions:
+            ``'path'`` or ``'workspace'`` (see
+            :class:`~yaks.pool.RuntimePool`).
         :returns: a Yaks object.
 
         '''
+        locators = locator if isinstance(locator, (list, tuple)) \
+            else [locator]
         zprops = {} if properties is None else {
             zenoh.Z_USER_KEY if k == "user" else zenoh.Z_PASSWORD_KEY: val
             for k, val in properties.items()
-            if k == "user" or key == "password"}
-
-        return Yaks(Zenoh.open(locator, zprops))
-
-    def workspace(self, path, executor=None):
+            if k == "user" or k == "password"}
+
+        def open_session(locator):
+            if locator is not None and locator.startswith(LOCATOR_SCHEME):
+                return LoopbackRuntime.open(locator)
+            return Zenoh.open(locator, zprops)
+
+        count = max(sessions, len(locators))
+        if count == 1:
+            return Yaks(open_session(locators[0]))
+        runtimes = []
+        try:
+            for i in range(count):
+                runtimes.append(open_session(locators[i % len(locators)]))
+        except Exception:
+            for rt in runtimes:
+                rt.close()
+            raise
+        return Yaks(RuntimePool(runtimes, balance))
+
+    def workspace(self, path, executor=None, asyncio=False, loop=None,
+                  cache_size=None):
         '''
 
         Creates a :class:`~yaks.workspace.Workspace` using the
@@ -68,10 +106,53 @@ class Yaks(object):
             executed by the provided executor. This is useful when listeners
             and/or callbacks need to perform long operations or need to call
             operations like :func:`~yaks.workspace.Workspace.get`.
+        :param asyncio: if ``True``, an
+            :class:`~yaks.asyncworkspace.AsyncWorkspace` is returned instead,
+            whose operations are coroutines. The executor is not used.
+        :param loop: the asyncio event loop used by the
+            :class:`~yaks.asyncworkspace.AsyncWorkspace`. If ``None``, the
+            loop running each of its coroutines.
+        :param cache_size: if not ``None``, a
+            :class:`~yaks.cache.CachedWorkspace` keeping a local copy of at
+            most ``cache_size`` path/values is returned instead.
         :returns: a :class:`~yaks.workspace.Workspace`.
 
         '''
-        return Workspace(self.rt, path, executor)
+        rt = self.rt
+        if isinstance(rt, RuntimePool):
+            rt = rt.workspace_runtime()
+        if asyncio:
+            return AsyncWorkspace(rt, path, loop, self.registry)
+        if cache_size is not None:
+            return CachedWorkspace(rt, path, executor, cache_size,
+                                   metrics=self.registry)
+        return Workspace(rt, path, executor, self.registry)
+
+    def enable_metrics(self, enabled=True):
+        '''
+
+        Enables or disables the recording of the metrics of the operations
+        of the workspaces of this session (see :mod:`yaks.metrics`).
+
+        :param enabled: ``True`` to enable the recording.
+        :returns: the :class:`~yaks.metrics.Metrics`, to be given to an
+            exporter, e.g.
+            ``PrometheusExporter(y.enable_metrics()).serve(9100)``.
+
+        '''
+        self.registry.enabled = enabled
+        return self.registry
+
+    def metrics(self):
+        '''
+
+        Get the metrics recorded since :func:`enable_metrics`.
+
+        :returns: a snapshot, as returned by
+            :func:`~yaks.metrics.Metrics.snapshot`.
+
+        '''
+        return self.registry.snapshot()
 
     def logout(self):
         '''
@@ -81,15 +162,19 @@ class Yaks(object):
         '''
         self.rt.close()
 
-    def admin(self):
+    def admin(self, cache_size=None):
         '''
 
         Creates an admin workspace that provides helper operations to
         administer Yaks.
 
+        :param cache_size: if not ``None``, the backends and storages are
+            kept in a :class:`~yaks.cache.CachedWorkspace` of at most
+            ``cache_size`` path/values, refreshed by subscriptions.
+        :returns: an :class:`~yaks.admin.Admin`.
+
         '''
-        return Admin(self.workspace(
-            '/{}/{}'.format(
-                Admin.PREFIX,
-                ''.join('{:02x}'.format(x) for x in
-                        self.rt.info()[Z_INFO_PEER_PID_KEY]))))
+        local = ''.join('{:02x}'.format(x) for x in
+                        self.rt.info()[Z_INFO_PEER_PID_KEY])
+        return Admin(self.workspace('/{}/{}'.format(Admin.PREFIX, local),
+                                    cache_size=cache_size), local)